@@ -0,0 +1,273 @@
+"""Generate the PeTI-style maps used to benchmark the VBSP hook.
+
+The maps mimic what the Puzzlemaker exports - a room of 128-unit blocks with
+white/black tiles, item instances, goo and antlines. Instance filenames are
+looked up in the instances.cfg of the config folder, so they match the
+conditions in the accompanying vbsp_config.
+
+Usage: python gen_maps.py <config folder> [output folder]
+"""
+import os
+import random
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.normpath(SRC))
+
+from srctools import Property, Vec, Output, VMF
+import srctools.vmf as VLib
+import comp_consts as consts
+import instanceLocs
+
+from typing import Dict, List, Tuple
+
+# The maps which are generated - name -> options.
+# 'size' is the interior of the room in blocks, the outer shell adds one
+# more on each side.
+MAP_SPECS = {
+    'small': {'size': (6, 6, 4)},
+    'medium': {'size': (14, 14, 8), 'lights': 4},
+    # The largest map the Puzzlemaker allows - 26 blocks including the shell.
+    'max': {'size': (24, 24, 24), 'lights': 6},
+    'goo': {'size': (14, 14, 6), 'goo': 0.6},
+    'antline': {'size': (14, 14, 6), 'antlines': 40},
+    'cutout': {'size': (14, 14, 6), 'cutout': 0.5},
+}  # type: Dict[str, dict]
+
+# Instances placed in the maps. These are resolved when generating.
+INST_ENTRY = '<ITEM_ENTRY_DOOR:0>'
+INST_EXIT = '<ITEM_EXIT_DOOR:0>'
+INST_LIGHT = '<ITEM_POINT_LIGHT>'
+INST_BUTTON = '<ITEM_BUTTON_FLOOR:0>'
+INST_LIGHT_STRIP = '<ITEM_LIGHT_PANEL>'
+INST_TOGGLE = '[indToggle]'
+# The style's cutout tile marker - override with the BENCH_CUTOUT_MARKER
+# environment variable if the style uses a different item.
+INST_CUTOUT = os.environ.get('BENCH_CUTOUT_MARKER', '<ITEM_CUTOUT_TILE>')
+
+# Normal of the room surface -> prism face which points into the room.
+FACE_FOR_NORMAL = {
+    (0, 0, 1): 'top',
+    (0, 0, -1): 'bottom',
+    (1, 0, 0): 'east',
+    (-1, 0, 0): 'west',
+    (0, 1, 0): 'north',
+    (0, -1, 0): 'south',
+}
+
+
+def load_instances(config_dir: str):
+    """Load instances.cfg from the config folder."""
+    path = os.path.join(config_dir, 'instances.cfg')
+    with open(path) as f:
+        instanceLocs.load_conf(Property.parse(f, path))
+
+
+def inst_file(path: str) -> str:
+    """Resolve an instance, or return '' if the config doesn't have it."""
+    return instanceLocs.resolve_one(path, default='')
+
+
+def add_inst(
+    vmf: VMF,
+    name: str,
+    file: str,
+    origin: Vec,
+    angles: str='0 0 0',
+    **fixups
+) -> VLib.Entity:
+    """Add an item instance in the same way as the Puzzlemaker."""
+    inst = vmf.create_ent(
+        classname='func_instance',
+        targetname=name,
+        file=file,
+        origin=origin,
+        angles=angles,
+    )
+    inst.fixup['$connectioncount'] = '0'
+    for var, value in fixups.items():
+        inst.fixup['$' + var] = value
+    return inst
+
+
+def make_tile(
+    vmf: VMF,
+    rand: random.Random,
+    pos: Tuple[int, int, int],
+    normal: Tuple[int, int, int],
+) -> VLib.Side:
+    """Add a solid block at this grid position, with a tile facing normal."""
+    origin = Vec(pos) * 128 + (64, 64, 64)
+    prism = vmf.make_prism(origin - 64, origin + 64, consts.Tools.NODRAW)
+    vmf.add_brush(prism.solid)
+
+    face = getattr(prism, FACE_FOR_NORMAL[normal])
+    is_white = rand.random() < 0.5
+    if normal[2] != 0:
+        face.mat = (
+            consts.WhitePan.WHITE_FLOOR
+            if is_white else
+            consts.BlackPan.BLACK_FLOOR
+        )
+    else:
+        face.mat = (
+            consts.WhitePan.WHITE_1x1
+            if is_white else
+            consts.BlackPan.BLACK_1
+        )
+    return face
+
+
+def make_goo(vmf: VMF, pos: Tuple[int, int, int]):
+    """Add a goo brush filling the lower part of this block."""
+    origin = Vec(pos) * 128 + (64, 64, 64)
+    prism = vmf.make_prism(
+        origin - 64,
+        origin + (64, 64, 32),
+        consts.Tools.NODRAW,
+    )
+    prism.top.mat = consts.Goo.CHEAP
+    vmf.add_brush(prism.solid)
+
+
+def make_antline(
+    vmf: VMF,
+    name: str,
+    start: Tuple[int, int],
+    length: int,
+    floor: Dict[Tuple[int, int], VLib.Side],
+):
+    """Add a straight antline along the X axis, one overlay per block."""
+    x, y = start
+    for off in range(length):
+        face = floor.get((x + off, y))
+        if face is None:
+            break
+        over = VLib.make_overlay(
+            vmf,
+            normal=Vec(0, 0, 1),
+            origin=Vec((x + off) * 128 + 64, y * 128 + 64, 128),
+            uax=Vec(128, 0, 0),
+            vax=Vec(0, 16, 0),
+            material=consts.Antlines.STRAIGHT,
+            surfaces=[face],
+            u_repeat=4,
+        )
+        over['targetname'] = name
+
+
+def generate(name: str, spec: dict) -> VMF:
+    """Build the map with this name."""
+    rand = random.Random(name)
+    vmf = VMF()
+    size_x, size_y, size_z = spec['size']
+
+    floor = {}  # type: Dict[Tuple[int, int], VLib.Side]
+    goo_chance = spec.get('goo', 0)
+
+    for x in range(1, size_x + 1):
+        for y in range(1, size_y + 1):
+            # Keep a border of floor for the entry and exit.
+            if 1 < x < size_x and rand.random() < goo_chance:
+                make_goo(vmf, (x, y, 1))
+                make_tile(vmf, rand, (x, y, -1), (0, 0, 1))
+            else:
+                floor[x, y] = make_tile(vmf, rand, (x, y, 0), (0, 0, 1))
+            make_tile(vmf, rand, (x, y, size_z + 1), (0, 0, -1))
+        for z in range(1, size_z + 1):
+            make_tile(vmf, rand, (x, 0, z), (0, 1, 0))
+            make_tile(vmf, rand, (x, size_y + 1, z), (0, -1, 0))
+    for y in range(1, size_y + 1):
+        for z in range(1, size_z + 1):
+            make_tile(vmf, rand, (0, y, z), (1, 0, 0))
+            make_tile(vmf, rand, (size_x + 1, y, z), (-1, 0, 0))
+
+    mid_y = (size_y // 2) * 128 + 64
+    add_inst(
+        vmf, 'entry', inst_file(INST_ENTRY),
+        Vec(0, mid_y, 192), '0 0 0',
+        no_player_start='0',
+    )
+    add_inst(
+        vmf, 'exit', inst_file(INST_EXIT),
+        Vec((size_x + 1) * 128, mid_y, 192), '0 180 0',
+    )
+
+    light_file = inst_file(INST_LIGHT)
+    light_spacing = spec.get('lights', 0)
+    if light_file and light_spacing:
+        for x in range(1, size_x + 1, light_spacing):
+            for y in range(1, size_y + 1, light_spacing):
+                add_inst(
+                    vmf, 'light_{}_{}'.format(x, y), light_file,
+                    Vec(x * 128 + 64, y * 128 + 64, (size_z + 1) * 128),
+                    '0 0 180',
+                )
+
+    button_file = inst_file(INST_BUTTON)
+    strip_file = inst_file(INST_LIGHT_STRIP)
+    toggle_file = inst_file(INST_TOGGLE)
+    if button_file and strip_file and toggle_file:
+        for ind in range(spec.get('antlines', 0)):
+            # Fill each row, then move the buttons and strips inwards.
+            y = 1 + ind % size_y
+            button_x = 1 + ind // size_y
+            strip_x = size_x - ind // size_y
+            if strip_x - button_x < 2:
+                break
+            button = add_inst(
+                vmf, 'button_{}'.format(ind), button_file,
+                Vec(button_x * 128 + 64, y * 128 + 64, 128),
+            )
+            add_inst(
+                vmf, 'strip_{}'.format(ind), strip_file,
+                Vec(strip_x * 128 + 64, y * 128 + 64, 128),
+            )
+            add_inst(
+                vmf, 'toggle_{}'.format(ind), toggle_file,
+                Vec((button_x + 1) * 128 + 64, y * 128 + 64, 128),
+                indicator_name='@button_{}_indicator'.format(ind),
+            )
+            button.add_out(
+                Output('OnPressed', 'strip_{}'.format(ind), 'Activate'),
+                Output('OnPressed', 'toggle_{}'.format(ind), 'Activate'),
+            )
+            make_antline(
+                vmf, '@button_{}_indicator'.format(ind),
+                (button_x + 1, y), strip_x - button_x - 1, floor,
+            )
+
+    cutout_file = inst_file(INST_CUTOUT)
+    cutout_chance = spec.get('cutout', 0)
+    if cutout_file and cutout_chance:
+        for (x, y) in sorted(floor):
+            if rand.random() < cutout_chance:
+                add_inst(
+                    vmf, 'cutout_{}_{}'.format(x, y), cutout_file,
+                    Vec(x * 128 + 64, y * 128 + 64, 128),
+                )
+    return vmf
+
+
+def main(argv: List[str]):
+    if not argv:
+        print(__doc__)
+        sys.exit(1)
+    config_dir = argv[0]
+    if len(argv) > 1:
+        out_dir = argv[1]
+    else:
+        out_dir = os.path.join(os.path.dirname(__file__), 'maps')
+    os.makedirs(out_dir, exist_ok=True)
+
+    load_instances(config_dir)
+    for name, spec in MAP_SPECS.items():
+        vmf = generate(name, spec)
+        path = os.path.join(out_dir, name + '.vmf')
+        with open(path, 'w') as f:
+            vmf.export(dest_file=f, inc_version=True)
+        print('Wrote "{}"'.format(path))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,320 @@
+"""Benchmark the VBSP hook on the generated maps.
+
+Each map is converted in a fresh process, inside a temporary folder holding a
+copy of the config. This runs everything VBSP does except the compile
+itself - vbsp.convert_map() is called directly so the original VBSP is never
+launched. The time for each phase and the peak memory use are recorded.
+The Python memory use is measured in a separate run, since tracing it slows
+everything down.
+
+Usage:
+    python run_bench.py <config folder> [options]
+
+The config folder is an exported 'bee2/' folder from a game - it needs
+vbsp_config.cfg, instances.cfg, templates.vmf and pack_list.cfg.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import gen_maps
+
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.normpath(os.path.join(BENCH_DIR, '..', 'src'))
+
+# Differences smaller than this (in seconds) are treated as noise.
+MIN_DIFF = 0.005
+
+
+def run_once(
+    config_dir: str,
+    map_path: str,
+    quiet: bool,
+    trace_memory: bool=False,
+    top_allocs: int=0,
+) -> dict:
+    """Convert a map, returning the timings.
+
+    If trace_memory is set, tracemalloc records the peak Python memory use,
+    which makes the timings much slower. If top_allocs is also set, the
+    lines holding the most memory once the map is converted are returned.
+    This runs in the child process.
+    """
+    import logging
+    import tracemalloc
+
+    temp_dir = tempfile.mkdtemp(prefix='bee2_bench_')
+    try:
+        shutil.copytree(config_dir, os.path.join(temp_dir, 'bee2'))
+        os.makedirs(os.path.join(temp_dir, 'maps', 'styled'))
+        map_name = os.path.basename(map_path)
+        path = os.path.join(temp_dir, 'maps', map_name)
+        shutil.copy(map_path, path)
+        os.chdir(temp_dir)
+
+        sys.path.insert(0, SRC_DIR)
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+
+        import utils
+        import vbsp
+        import conditions
+        if quiet:
+            utils.stdout_loghandler.setLevel(logging.WARNING)
+
+        conditions.import_conditions()
+        import_time = time.perf_counter() - start
+
+        phases = vbsp.convert_map(
+            path,
+            os.path.join(temp_dir, 'maps', 'styled', map_name),
+        )
+        total = time.perf_counter() - start
+        allocs = []
+        if trace_memory:
+            peak_mem = tracemalloc.get_traced_memory()[1]
+            if top_allocs:
+                stats = tracemalloc.take_snapshot().statistics('lineno')
+                allocs = [
+                    (str(stat.traceback), stat.size, stat.count)
+                    for stat in stats[:top_allocs]
+                ]
+            tracemalloc.stop()
+        else:
+            peak_mem = 0
+    finally:
+        os.chdir(BENCH_DIR)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    result = {
+        'phases': dict([('import', import_time)] + phases),
+        'total': total,
+        'peak_mem': peak_mem,
+        'peak_rss': peak_rss(),
+    }
+    if allocs:
+        result['allocs'] = allocs
+    return result
+
+
+def peak_rss() -> int:
+    """Return the peak memory used by this process, or 0 if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows.
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gives kilobytes, Mac bytes.
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def bench_map(
+    config_dir: str,
+    map_path: str,
+    repeat: int,
+    quiet: bool,
+    top_allocs: int=0,
+) -> dict:
+    """Benchmark a map, using the median of each run.
+
+    The timed runs don't trace memory, an extra run afterward does.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    runs = []
+    for _ in range(repeat):
+        # Use a new process each time, so the module state is fresh.
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(
+                run_once,
+                (config_dir, map_path, quiet),
+            ))
+    with ctx.Pool(1) as pool:
+        mem_run = pool.apply(
+            run_once,
+            (config_dir, map_path, quiet, True, top_allocs),
+        )
+
+    result = {
+        'phases': {
+            phase: statistics.median(run['phases'][phase] for run in runs)
+            for phase in runs[0]['phases']
+        },
+        'total': statistics.median(run['total'] for run in runs),
+        'peak_mem': mem_run['peak_mem'],
+        # tracemalloc uses memory too, so don't include that run.
+        'peak_rss': max(run['peak_rss'] for run in runs),
+    }
+    if top_allocs:
+        result['allocs'] = mem_run['allocs']
+    return result
+
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    threshold: float,
+) -> List[str]:
+    """Find phases which are slower than the baseline."""
+    regressions = []
+    for map_name, result in sorted(results.items()):
+        try:
+            base = baseline[map_name]
+        except KeyError:
+            continue
+        timings = [('total', result['total'], base['total'])]
+        for phase, value in result['phases'].items():
+            if phase in base['phases']:
+                timings.append((phase, value, base['phases'][phase]))
+
+        for phase, value, base_value in timings:
+            if (
+                value - base_value > MIN_DIFF and
+                value > base_value * (1 + threshold)
+            ):
+                regressions.append('{}/{}: {:.3f}s -> {:.3f}s'.format(
+                    map_name, phase, base_value, value,
+                ))
+        for key in ['peak_mem', 'peak_rss']:
+            if result.get(key, 0) > base.get(key, 0) * (1 + threshold) > 0:
+                regressions.append('{}/{}: {:.1f}MB -> {:.1f}MB'.format(
+                    map_name,
+                    key,
+                    base[key] / 2**20,
+                    result[key] / 2**20,
+                ))
+    return regressions
+
+
+def print_results(results: Dict[str, dict], baseline: Dict[str, dict]):
+    """Display a table of the phase times."""
+    for map_name, result in sorted(results.items()):
+        base = baseline.get(map_name, {'phases': {}})
+        print('{}: {:.3f}s, peak {:.1f}MB, RSS {:.1f}MB'.format(
+            map_name,
+            result['total'],
+            result['peak_mem'] / 2**20,
+            result['peak_rss'] / 2**20,
+        ))
+        for phase, value in result['phases'].items():
+            try:
+                base_value = base['phases'][phase]
+            except KeyError:
+                diff = ''
+            else:
+                diff = '({:+.3f}s)'.format(value - base_value)
+            print('  {:<20} {:8.3f}s {}'.format(phase, value, diff))
+        if 'allocs' in result:
+            print('  Largest allocations:')
+            for line, size, count in result['allocs']:
+                print('    {:8.1f}KB {:7} blocks  {}'.format(
+                    size / 1024,
+                    count,
+                    line,
+                ))
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('config', help='The exported bee2/ config folder.')
+    parser.add_argument(
+        '--maps',
+        default=os.path.join(BENCH_DIR, 'maps'),
+        help='Folder of maps to use. These are generated if missing.',
+    )
+    parser.add_argument(
+        '--only',
+        action='append',
+        default=[],
+        help='Only benchmark this map. Can be repeated.',
+    )
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--output',
+        default=os.path.join(BENCH_DIR, 'results', 'latest.json'),
+        help='Write the results to this JSON file.',
+    )
+    parser.add_argument(
+        '--baseline',
+        default=os.path.join(BENCH_DIR, 'results', 'baseline.json'),
+        help='Compare against this JSON file.',
+    )
+    parser.add_argument(
+        '--save-baseline',
+        action='store_true',
+        help='Replace the baseline with these results.',
+    )
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='Fraction slower than the baseline counted as a regression.',
+    )
+    parser.add_argument(
+        '--memory',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Show the N lines holding the most memory after converting.',
+    )
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    config_dir = os.path.abspath(args.config)
+
+    map_names = args.only or list(gen_maps.MAP_SPECS)
+    missing = [
+        name for name in map_names
+        if not os.path.isfile(os.path.join(args.maps, name + '.vmf'))
+    ]
+    if missing:
+        gen_maps.main([config_dir, args.maps])
+
+    results = {}
+    for name in map_names:
+        print('Running "{}"...'.format(name))
+        results[name] = bench_map(
+            config_dir,
+            os.path.abspath(os.path.join(args.maps, name + '.vmf')),
+            args.repeat,
+            not args.verbose,
+            args.memory,
+        )
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    print_results(results, baseline)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print('Baseline saved to "{}".'.format(args.baseline))
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print('Regressions:')
+        for line in regressions:
+            print('  ' + line)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -98,7 +98,7 @@ pack_data, package_sys = packageLoader.load_packages(
 )
 
 # Load filesystems into various modules
-img.load_filesystems(package_sys)
+img.load_filesystems(packageLoader.PACKAGE_SYS)
 gameMan.load_filesystems(package_sys)
 
 UI.load_packages(pack_data, package_sys)
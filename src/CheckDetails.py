@@ -15,7 +15,7 @@ from tooltip import add_tooltip
 import utils
 import tk_tools
 
-from typing import List, Iterator
+from typing import List, Iterator, Optional, Tuple, Set
 
 
 UP_ARROW = '\u25B3'
@@ -74,15 +74,19 @@ class Item:
         self.values = values
         self.state_var = tk.IntVar(value=bool(state))
         self.master = None  # type: CheckDetails
-        self.check = None  # type: ttk.Checkbutton
+        # The widgets displaying this item, if it's scrolled into view.
+        self.row = None  # type: Optional[Row]
         self.locked = lock_check
         self.hover_text = hover_text
-        self.val_widgets = []
 
     def copy(self):
         return Item(self.values)
 
     def make_widgets(self, master: 'CheckDetails'):
+        """Add this item to a list.
+
+        The widgets are only created when the item is scrolled into view.
+        """
         if self.master is not None:
             # If we let items move between lists, the old widgets will become
             # orphaned!
@@ -91,51 +95,91 @@ class Item:
             )
 
         self.master = master
+
+    @property
+    def check(self) -> Optional[ttk.Checkbutton]:
+        """The checkbox for this item, if visible."""
+        if self.row is None:
+            return None
+        return self.row.check
+
+    def destroy(self):
+        """Remove this from the window."""
+        if self.row is not None:
+            self.master.release_row(self)
+
+    @property
+    def state(self) -> bool:
+        return self.state_var.get()
+
+    @state.setter
+    def state(self, value: bool):
+        self.state_var.set(value)
+        self.master.update_allcheck()
+
+
+class Row:
+    """The widgets used to display an item.
+
+    Only items which are scrolled into view have a row, these are reused
+    when items scroll in and out.
+    """
+    def __init__(self, master: 'CheckDetails'):
+        self.master = master
+        self.item = None  # type: Optional[Item]
         self.check = ttk.Checkbutton(
             master.wid_frame,
-            variable=self.state_var,
             onvalue=1,
             offvalue=0,
             takefocus=False,
             width=0,
             style='CheckDetails.TCheckbutton',
-            command=self.master.update_allcheck,
+            command=master.update_allcheck,
         )
-        if self.locked:
-            self.check.state(['disabled'])
 
-        self.val_widgets = []
-        for value in self.values:
+        self.val_widgets = []  # type: List[tk.Label]
+        for _ in master.headers:
             wid = tk.Label(
                 master.wid_frame,
-                text=value,
                 justify=tk.LEFT,
                 anchor=tk.W,
                 background='white',
             )
             add_tooltip(wid)
-            if self.hover_text:
-                wid.tooltip_text = self.hover_text
-                wid.hover_override = True
-            else:
-                wid.tooltip_text = ''
-                wid.hover_override = False
+            wid.tooltip_text = ''
+            wid.hover_override = False
 
-            if not self.locked:
-                # Allow clicking on the row to toggle the checkbox
-                wid.bind('<Enter>', self.hover_start, add='+')
-                wid.bind('<Leave>', self.hover_stop, add='+')
-                utils.bind_leftclick(wid, self.row_click, add='+')
-                wid.bind(utils.EVENTS['LEFT_RELEASE'], self.row_unclick, add='+')
+            # Allow clicking on the row to toggle the checkbox
+            wid.bind('<Enter>', self.hover_start, add='+')
+            wid.bind('<Leave>', self.hover_stop, add='+')
+            utils.bind_leftclick(wid, self.row_click, add='+')
+            wid.bind(utils.EVENTS['LEFT_RELEASE'], self.row_unclick, add='+')
 
             self.val_widgets.append(wid)
 
         utils.add_mousewheel(
-            self.master.wid_canvas,
+            master.wid_canvas,
             self.check,
             *self.val_widgets
         )
 
+    def set_item(self, item: Item):
+        """Display the given item in this row."""
+        self.item = item
+        self.check['variable'] = item.state_var
+        if item.locked:
+            self.check.state(['disabled'])
+        else:
+            self.check.state(['!disabled'])
+
+        for wid in self.val_widgets:
+            if item.hover_text:
+                wid.tooltip_text = item.hover_text
+                wid.hover_override = True
+            else:
+                wid.tooltip_text = ''
+                wid.hover_override = False
+
     def place(self, check_width, head_pos, y):
         """Position the widgets on the frame."""
         self.check.place(
@@ -145,7 +189,7 @@ class Item:
             height=ROW_HEIGHT,
         )
         for text, widget, (x, width) in zip(
-                self.values,
+                self.item.values,
                 self.val_widgets,
                 head_pos
                 ):
@@ -164,33 +208,29 @@ class Item:
                     widget.tooltip_text = ''
             x += width
 
-    def destroy(self):
-        """Remove this from the window."""
+    def hide(self):
+        """Remove the widgets from the window."""
+        self.item = None
         self.check.place_forget()
         for wid in self.val_widgets:
             wid.place_forget()
 
-    @property
-    def state(self) -> bool:
-        return self.state_var.get()
-
-    @state.setter
-    def state(self, value: bool):
-        self.state_var.set(value)
-        self.master.update_allcheck()
-
     def hover_start(self, e):
-        self.check.state(['active'])
+        if self.item is not None and not self.item.locked:
+            self.check.state(['active'])
 
     def hover_stop(self, e):
-        self.check.state(['!active'])
+        if self.item is not None and not self.item.locked:
+            self.check.state(['!active'])
 
     def row_click(self, e):
-        self.state = not self.state
-        self.check.state(['pressed'])
+        if self.item is not None and not self.item.locked:
+            self.item.state = not self.item.state
+            self.check.state(['pressed'])
 
     def row_unclick(self, e):
-        self.check.state(['!pressed'])
+        if self.item is not None and not self.item.locked:
+            self.check.state(['!pressed'])
 
 
 class CheckDetails(ttk.Frame):
@@ -207,6 +247,13 @@ class CheckDetails(ttk.Frame):
         self.parent = parent
         self.headers = list(headers)
         self.items = []  # type: List[Item]
+        # Rows for items which aren't visible, which can be reused.
+        self.row_pool = []  # type: List[Row]
+        # The items which currently have a row.
+        self.shown_items = set()  # type: Set[Item]
+        # The column positions and checkbox width, set in refresh().
+        self.header_sizes = []  # type: List[Tuple[int, int]]
+        self.check_width = 0
         self.sort_ind = None
         self.rev_sort = False  # Should we sort in reverse?
 
@@ -225,12 +272,14 @@ class CheckDetails(ttk.Frame):
         def checkbox_enter(e):
             """When hovering over the 'all' checkbox, highlight the others."""
             for item in self.items:
-                item.check.state(['active'])
+                if item.row is not None:
+                    item.check.state(['active'])
         self.wid_head_check.bind('<Enter>', checkbox_enter)
 
         def checkbox_leave(e):
             for item in self.items:
-                item.check.state(['!active'])
+                if item.row is not None:
+                    item.check.state(['!active'])
         self.wid_head_check.bind('<Leave>', checkbox_leave)
 
         self.wid_header = tk.PanedWindow(
@@ -264,7 +313,7 @@ class CheckDetails(ttk.Frame):
             command=self.wid_canvas.yview,
         )
         self.wid_canvas['xscrollcommand'] = self.horiz_scroll.set
-        self.wid_canvas['yscrollcommand'] = self.vert_scroll.set
+        self.wid_canvas['yscrollcommand'] = self.scroll_changed
 
         self.horiz_scroll.grid(row=2, column=0, columnspan=2, sticky='EWS')
         self.vert_scroll.grid(row=1, column=2, sticky='NSE')
@@ -404,18 +453,15 @@ class CheckDetails(ttk.Frame):
         Must be called when self.items is changed,
         or when window is resized.
         """
-        header_sizes = [
+        self.header_sizes = header_sizes = [
             (head.winfo_x(), head.winfo_width())
             for head in
             self.wid_head_frames
         ]
 
         self.wid_head_check.update_idletasks()
-        check_width = self.wid_head_check.winfo_width()
-        pos = ROW_PADDING
-        for item in self.items:
-            item.place(check_width, header_sizes, pos)
-            pos += ROW_HEIGHT + ROW_PADDING
+        self.check_width = check_width = self.wid_head_check.winfo_width()
+        pos = ROW_PADDING + len(self.items) * (ROW_HEIGHT + ROW_PADDING)
 
         # Disable checkbox if no items are present
         if self.items:
@@ -474,6 +520,53 @@ class CheckDetails(ttk.Frame):
         self.wid_frame.update_idletasks()
 
         self.wid_canvas['scrollregion'] = (0, 0, width, height)
+        self.place_visible()
+
+    def scroll_changed(self, first, last):
+        """Called when the list is scrolled, to update visible rows."""
+        self.vert_scroll.set(first, last)
+        self.place_visible()
+
+    def release_row(self, item: Item):
+        """Remove the row from an item, so it can be reused."""
+        item.row.hide()
+        self.row_pool.append(item.row)
+        item.row = None
+        self.shown_items.discard(item)
+
+    def place_visible(self):
+        """Position rows for the items which are scrolled into view.
+
+        Rows for items outside the view are reused.
+        """
+        if not self.items:
+            return
+        try:
+            height = int(self.wid_frame['height'])
+        except ValueError:
+            return
+        first, last = self.wid_canvas.yview()
+        row_size = ROW_HEIGHT + ROW_PADDING
+        start = max(0, int(first * height) // row_size - 1)
+        end = min(len(self.items), int(last * height) // row_size + 1)
+        visible = self.items[start:end]
+
+        for item in self.shown_items.difference(visible):
+            self.release_row(item)
+
+        for ind, item in enumerate(visible, start):
+            if item.row is None:
+                try:
+                    item.row = self.row_pool.pop()
+                except IndexError:
+                    item.row = Row(self)
+                item.row.set_item(item)
+                self.shown_items.add(item)
+            item.row.place(
+                self.check_width,
+                self.header_sizes,
+                ROW_PADDING + ind * row_size,
+            )
 
     def sort(self, index, e=None):
         """Click event for headers."""
@@ -161,6 +161,7 @@ class Item:
         self.filter_tags.add(
             tagsPane.add_tag(Section.PACK, self.pak_id, pretty=self.pak_name)
         )
+        tagsPane.invalidate_index()
 
     def get_icon(self, subKey, allow_single=False, single_num=1):
         """Get an icon for the given subkey.
@@ -289,6 +290,8 @@ class PalItem(Label):
         self.id = item.id
         # Toggled according to filter settings
         self.visible = True
+        # The position on the picker, or None if not placed there.
+        self.picker_pos = None
         # Used to distinguish between picker and palette items
         self.is_pre = is_pre
         self.needs_unlock = item.item.needs_unlock
@@ -458,6 +461,17 @@ def load_settings():
     optionWindow.load()
 
 
+def apply_images():
+    """Paste in images as they finish decoding in the background.
+
+    This reschedules itself, since icons can be requested at any time.
+    """
+    TK_ROOT.after(
+        50 if img.apply_pending() else 250,
+        apply_images,
+    )
+
+
 def load_packages(data, package_systems: Iterable[FileSystem]):
     """Import in the list of items and styles from the packages.
 
@@ -471,6 +485,10 @@ def load_packages(data, package_systems: Iterable[FileSystem]):
     for item in data['Item']:
         it = Item(item)
         item_list[it.id] = it
+        # Start decoding the palette icons now, so they're ready
+        # by the time the UI is shown.
+        for icon in it.data.icons.values():
+            img.preload_icon(icon)
         loader.step("IMG")
 
     StyleVarPane.add_vars(data['StyleVar'], data['Style'])
@@ -699,6 +717,9 @@ def load_packages(data, package_systems: Iterable[FileSystem]):
             GEN_OPTS.get_val('Last_Selected', opt_name, default)
         )
 
+    # Once the mainloop starts, fill in the icons as they're decoded.
+    apply_images()
+
 
 def reposition_panes():
     """Position all the panes in the default places around the main window."""
@@ -1509,6 +1530,8 @@ def init_picker(f):
     for item in items:
         for i in range(0, item.num_sub):
             pal_items.append(PalItem(frmScroll, item, sub=i, is_pre=False))
+    # The tag bitsets refer to pal_items indexes.
+    tagsPane.invalidate_index()
 
     f.bind("<Configure>", flow_picker)
 
@@ -1539,15 +1562,18 @@ def flow_picker(e=None):
         width = 1  # we got way too small, prevent division by zero
     vis_items = [it for it in pal_items if it.visible]
     num_items = len(vis_items)
+    # Only move items which have actually changed position.
     for i, item in enumerate(vis_items):
         item.is_pre = False
-        item.place(
-            x=((i % width) * 65 + 1),
-            y=((i // width) * 65 + 1),
-            )
-
-    for item in (it for it in pal_items if not it.visible):
-        item.place_forget()
+        pos = ((i % width) * 65 + 1), ((i // width) * 65 + 1)
+        if item.picker_pos != pos:
+            item.place(x=pos[0], y=pos[1])
+            item.picker_pos = pos
+
+    for item in pal_items:
+        if not item.visible and item.picker_pos is not None:
+            item.place_forget()
+            item.picker_pos = None
     height = (num_items // width + 1) * 65 + 2
     pal_canvas['scrollregion'] = (
         0,
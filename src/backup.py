@@ -18,16 +18,21 @@ from tkinter import messagebox
 
 from tk_tools import TK_ROOT
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO, TextIOWrapper
+import hashlib
+import lzma
 import time
 import os
 import shutil
 import string
+import tempfile
+from stat import S_ISREG
 import atexit
 
 from FakeZip import FakeZip, zip_names, zip_open_bin
-from zipfile import ZipFile, ZIP_LZMA
+from zipfile import ZipFile, ZIP_LZMA, ZIP_STORED
 
 from tooltip import add_tooltip
 from srctools import Property, KeyValError
@@ -38,7 +43,7 @@ import tk_tools
 import gameMan
 import srctools
 
-from typing import List
+from typing import List, Dict, Tuple
 
 # The backup window - either a toplevel, or TK_ROOT.
 window = None  # type: tk.Toplevel
@@ -54,6 +59,12 @@ AUTO_BACKUP_STAGE = 'BACKUP_ZIP'
 BACKUP_CHARS = set(string.ascii_letters + string.digits + '_-.')
 # Format for the backup filename
 AUTO_BACKUP_FILE = 'back_{game}{ind}.zip'
+# For incremental backups, each generation is a manifest listing the hash
+# of each file. The LZMA-compressed files are stored once in the blob folder.
+AUTO_BACKUP_MANIFEST = 'back_{game}{ind}.bee2_backup'
+AUTO_BACKUP_BLOBS = 'blobs_{game}'
+# The puzzle files incremental backups store - maps and their screenshots.
+INCREMENTAL_EXTS = ('.p2c', '.jpg')
 
 HEADERS = ['Name', 'Mode', 'Date']
 
@@ -390,33 +401,18 @@ def auto_backup(game: 'gameMan.Game', loader: LoadScreen):
 
     loader.set_length(AUTO_BACKUP_STAGE, len(to_backup))
 
-    if extra_back_count:
-        back_files = [
-            AUTO_BACKUP_FILE.format(game=safe_name, ind='')
-        ] + [
-            AUTO_BACKUP_FILE.format(game=safe_name, ind='_'+str(i+1))
-            for i in range(extra_back_count)
-        ]
-        # Move each file over by 1 index, ignoring missing ones
-        # We need to reverse to ensure we don't overwrite any zips
-        for old_name, new_name in reversed(
-                list(zip(back_files, back_files[1:]))
-                ):
-            LOGGER.info(
-                'Moving: {old} -> {new}',
-                old=old_name,
-                new=new_name,
-            )
-            old_name = os.path.join(backup_dir, old_name)
-            new_name = os.path.join(backup_dir, new_name)
-            try:
-                os.remove(new_name)
-            except FileNotFoundError:
-                pass  # We're overwriting this anyway
-            try:
-                os.rename(old_name, new_name)
-            except FileNotFoundError:
-                pass
+    if GEN_OPTS.get_bool('General', 'auto_backup_incremental'):
+        auto_backup_incremental(
+            folder,
+            to_backup,
+            backup_dir,
+            safe_name,
+            extra_back_count,
+            loader,
+        )
+        return
+
+    rotate_backups(backup_dir, AUTO_BACKUP_FILE, safe_name, extra_back_count)
 
     final_backup = os.path.join(
         backup_dir,
@@ -434,6 +430,242 @@ def auto_backup(game: 'gameMan.Game', loader: LoadScreen):
                 loader.step(AUTO_BACKUP_STAGE)
 
 
+def backup_filenames(name_format: str, safe_name: str, count: int) -> List[str]:
+    """Return the filenames for each generation of an automatic backup."""
+    return [
+        name_format.format(game=safe_name, ind='')
+    ] + [
+        name_format.format(game=safe_name, ind='_'+str(i+1))
+        for i in range(count)
+    ]
+
+
+def rotate_backups(backup_dir: str, name_format: str, safe_name: str, count: int):
+    """Move each previous automatic backup over by 1 index."""
+    if not count:
+        return
+    back_files = backup_filenames(name_format, safe_name, count)
+    # Move each file over by 1 index, ignoring missing ones
+    # We need to reverse to ensure we don't overwrite any zips
+    for old_name, new_name in reversed(
+            list(zip(back_files, back_files[1:]))
+            ):
+        LOGGER.info(
+            'Moving: {old} -> {new}',
+            old=old_name,
+            new=new_name,
+        )
+        old_name = os.path.join(backup_dir, old_name)
+        new_name = os.path.join(backup_dir, new_name)
+        try:
+            os.remove(new_name)
+        except FileNotFoundError:
+            pass  # We're overwriting this anyway
+        try:
+            os.rename(old_name, new_name)
+        except FileNotFoundError:
+            pass
+
+
+def read_manifest(path: str) -> Dict[str, Tuple[str, int, int]]:
+    """Read an incremental backup manifest.
+
+    This returns a filename -> (hash, size, mtime) dict.
+    Missing or invalid manifests are treated as empty.
+    """
+    try:
+        with open(path, encoding='utf8') as f:
+            props = Property.parse(f, path)
+    except FileNotFoundError:
+        return {}
+    except KeyValError:
+        LOGGER.warning('Invalid backup manifest "{}"!', path, exc_info=True)
+        return {}
+
+    files = {}
+    for file in props.find_all('Backup', 'File'):
+        try:
+            files[file['name']] = (
+                file['hash'],
+                file.int('size'),
+                file.int('mtime'),
+            )
+        except LookupError:
+            LOGGER.warning('Invalid file in manifest "{}"!', path)
+    return files
+
+
+def write_manifest(
+    path: str,
+    blob_folder: str,
+    files: Dict[str, Tuple[str, int, int]],
+):
+    """Write out an incremental backup manifest.
+
+    blob_folder is the name of the folder next to the manifest holding
+    the data.
+    """
+    props = Property('Backup', [Property('Blobs', blob_folder)] + [
+        Property('File', [
+            Property('name', name),
+            Property('hash', file_hash),
+            Property('size', str(size)),
+            Property('mtime', str(mtime)),
+        ])
+        for name, (file_hash, size, mtime) in sorted(files.items())
+    ])
+    with open(path + '.tmp', 'w', encoding='utf8') as f:
+        for line in props.export():
+            f.write(line)
+    os.replace(path + '.tmp', path)
+
+
+def store_blob(path: str, blob_dir: str) -> str:
+    """Compress a file into the blob folder, and return its hash.
+
+    If the same data is already stored, it's reused.
+    This runs in a worker thread - LZMA releases the GIL while compressing.
+    Each write uses its own temporary file, since several threads may be
+    storing identical files at once.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    file_hash = hashlib.sha1(data).hexdigest()
+    blob_path = os.path.join(blob_dir, file_hash + '.xz')
+    if not os.path.exists(blob_path):
+        fd, temp_path = tempfile.mkstemp(
+            suffix='.tmp',
+            prefix=file_hash,
+            dir=blob_dir,
+        )
+        try:
+            with open(fd, 'wb') as f:
+                f.write(lzma.compress(data))
+            os.replace(temp_path, blob_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    return file_hash
+
+
+def auto_backup_incremental(
+    folder: str,
+    to_backup: List[str],
+    backup_dir: str,
+    safe_name: str,
+    extra_back_count: int,
+    loader: LoadScreen,
+):
+    """Perform an automatic backup, only storing new or changed files.
+
+    Only .p2c and .jpg files are stored. Unmodified files (with the same
+    size and modification time as in the last backup) aren't read at all.
+    Other files are hashed and compressed on a thread pool, if the data
+    isn't already stored.
+    """
+    blob_folder = AUTO_BACKUP_BLOBS.format(game=safe_name)
+    blob_dir = os.path.join(backup_dir, blob_folder)
+    os.makedirs(blob_dir, exist_ok=True)
+
+    manifest_path = os.path.join(
+        backup_dir,
+        AUTO_BACKUP_MANIFEST.format(game=safe_name, ind=''),
+    )
+    # Read before rotating, so we can reuse the hashes.
+    prev_files = read_manifest(manifest_path)
+    rotate_backups(
+        backup_dir,
+        AUTO_BACKUP_MANIFEST,
+        safe_name,
+        extra_back_count,
+    )
+
+    LOGGER.info('Writing incremental backup to "{}"', manifest_path)
+    files = {}  # type: Dict[str, Tuple[str, int, int]]
+    jobs = []
+    with ThreadPoolExecutor() as pool:
+        for file in to_backup:
+            path = os.path.join(folder, file)
+            if not file.casefold().endswith(INCREMENTAL_EXTS):
+                loader.step(AUTO_BACKUP_STAGE)
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                loader.step(AUTO_BACKUP_STAGE)
+                continue
+            if not S_ISREG(stat.st_mode):
+                # A folder or similar, which store_blob() can't read.
+                loader.step(AUTO_BACKUP_STAGE)
+                continue
+            mtime = stat.st_mtime_ns
+            try:
+                file_hash, size, old_mtime = prev_files[file]
+            except KeyError:
+                pass
+            else:
+                if (
+                    size == stat.st_size and
+                    old_mtime == mtime and
+                    os.path.exists(os.path.join(blob_dir, file_hash + '.xz'))
+                ):
+                    files[file] = file_hash, size, mtime
+                    loader.step(AUTO_BACKUP_STAGE)
+                    continue
+            jobs.append((
+                file, stat.st_size, mtime,
+                pool.submit(store_blob, path, blob_dir),
+            ))
+
+        for file, size, mtime, job in jobs:
+            files[file] = job.result(), size, mtime
+            loader.step(AUTO_BACKUP_STAGE)
+
+    LOGGER.info(
+        'Backed up {} files, {} new or changed.',
+        len(files),
+        len(jobs),
+    )
+    write_manifest(manifest_path, blob_folder, files)
+
+    # Remove blobs which no generation refers to anymore.
+    used_blobs = set()
+    for manifest in backup_filenames(
+        AUTO_BACKUP_MANIFEST,
+        safe_name,
+        extra_back_count,
+    ):
+        for file_hash, size, mtime in read_manifest(
+            os.path.join(backup_dir, manifest)
+        ).values():
+            used_blobs.add(file_hash + '.xz')
+    for blob in os.listdir(blob_dir):
+        if blob not in used_blobs:
+            try:
+                os.remove(os.path.join(blob_dir, blob))
+            except OSError:
+                LOGGER.warning('Could not remove "{}"!', blob)
+
+
+def load_manifest_zip(path: str) -> BytesIO:
+    """Extract an incremental backup into an in-memory zip file.
+
+    This allows it to be opened in the backup window.
+    """
+    with open(path, encoding='utf8') as f:
+        props = Property.parse(f, path)
+    blob_dir = os.path.join(
+        os.path.dirname(path),
+        props.find_key('Backup').find_key('Blobs').value,
+    )
+    zip_data = BytesIO()
+    with ZipFile(zip_data, 'w', compression=ZIP_STORED) as zip_file:
+        for name, (file_hash, size, mtime) in read_manifest(path).items():
+            with open(os.path.join(blob_dir, file_hash + '.xz'), 'rb') as f:
+                zip_file.writestr(name, lzma.decompress(f.read()))
+    return zip_data
+
+
 def save_backup():
     """Save the backup file."""
     # We generate it from scratch, since that's the only way to remove
@@ -570,16 +802,24 @@ def ui_load_backup():
     """Prompt and load in a backup file."""
     file = filedialog.askopenfilename(
         title=_('Load Backup'),
-        filetypes=[(_('Backup zip'), '.zip')],
+        filetypes=[
+            (_('Backup zip'), '.zip'),
+            (_('Incremental backup'), '.bee2_backup'),
+        ],
     )
     if not file:
         return
 
+    if file.endswith('.bee2_backup'):
+        # Extract it into a zip, and save as that.
+        BACKUPS['unsaved_file'] = unsaved = load_manifest_zip(file)
+        file = file[:-len('.bee2_backup')] + '.zip'
+    else:
+        with open(file, 'rb') as f:
+            # Read the backup zip into memory!
+            data = f.read()
+            BACKUPS['unsaved_file'] = unsaved = BytesIO(data)
     BACKUPS['backup_path'] = file
-    with open(file, 'rb') as f:
-        # Read the backup zip into memory!
-        data = f.read()
-        BACKUPS['unsaved_file'] = unsaved = BytesIO(data)
 
     BACKUPS['backup_zip'] = zip_file = ZipFile(
         unsaved,
@@ -895,6 +1135,9 @@ def init_backup_settings():
     check_var = tk.IntVar(
         value=GEN_OPTS.get_bool('General', 'enable_auto_backup')
     )
+    incr_var = tk.IntVar(
+        value=GEN_OPTS.get_bool('General', 'auto_backup_incremental')
+    )
     count_value = GEN_OPTS.get_int('General', 'auto_backup_count', 0)
     back_dir = GEN_OPTS.get_val('Directories', 'backup_loc', 'backups/')
 
@@ -903,6 +1146,11 @@ def init_backup_settings():
             check_var.get()
         )
 
+    def incr_callback():
+        GEN_OPTS['General']['auto_backup_incremental'] = srctools.bool_as_int(
+            incr_var.get()
+        )
+
     def count_callback():
         GEN_OPTS['General']['auto_backup_count'] = str(count.value)
 
@@ -957,6 +1205,19 @@ def init_backup_settings():
     count.grid(row=1, column=0)
     count.value = count_value
 
+    UI['auto_incremental'] = incr_check = ttk.Checkbutton(
+        frame,
+        text=_('Only Store Changed Maps'),
+        variable=incr_var,
+        command=incr_callback,
+    )
+    incr_check.grid(row=1, column=0, columnspan=2)
+    add_tooltip(
+        incr_check,
+        _('Instead of a zip, each backup lists the maps it contains. '
+          'Maps are compressed once, and shared between backups.'),
+    )
+
 
 def init_toplevel():
     """Initialise the window as part of the BEE2."""
@@ -1,11 +1,10 @@
 """Generates Bottomless Pits."""
-import random
-
 from srctools import Vec, Property, VMF, Solid, Side, Output
 import srctools
 import utils
 import vbsp
 import brushLoc
+import conditions
 import vbsp_options
 
 
@@ -287,9 +286,12 @@ def make_bottomless_pit(vmf: VMF, max_height):
             # Middle of the pit...
             continue
 
-        random.seed('pit_' + str(pos.x) + str(pos.y) + 'sides')
+        rng = conditions.rand(
+            'pit_' + str(pos.x) + str(pos.y) + 'sides',
+            'pit_sides', int(pos.x), int(pos.y),
+        )
 
-        file = random.choice(side_types[inst_type])
+        file = rng.choice(side_types[inst_type])
 
         if file != '':
             vmf.create_ent(
@@ -302,7 +304,7 @@ def make_bottomless_pit(vmf: VMF, max_height):
 
         # Straight uses two side-instances in parallel - "|o|"
         if inst_type is utils.CONN_TYPES.straight:
-            file = random.choice(side_types[inst_type])
+            file = rng.choice(side_types[inst_type])
             if file != '':
                 vmf.create_ent(
                     classname='func_instance',
@@ -1,8 +1,11 @@
 """Various constant values for use by VBSP. (Mainly texture names.)"""
+import sys
 from enum import Enum, EnumMeta
 
 from srctools import Side as _Side
 
+from typing import Dict, List
+
 __all__ = [
     'MaterialGroup',
 
@@ -10,6 +13,8 @@ __all__ = [
     'Signage', 'Antlines',
     'Goo', 'Fizzler',
     'Special', 'Tools',
+
+    'MatInfo', 'mat_info',
 ]
 
 class MaterialGroupMeta(EnumMeta):
@@ -197,3 +202,61 @@ class Fizzler(MaterialGroup):
     LEFT = "effects/fizzler_l"
     RIGHT = "effects/fizzler_r"
     SHORT = "effects/fizzler"
+
+
+class MatInfo:
+    """Information about a material, from mat_info().
+
+    name is the casefolded material, which is interned so it can be compared
+    and hashed quickly. id is a small integer unique to the material. The
+    remaining attributes say which of the groups above it's part of.
+    """
+    __slots__ = [
+        'name', 'id',
+        'is_white', 'is_black', 'is_tile',
+        'is_goo', 'is_glass', 'is_grating',
+        'is_tool', 'is_signage', 'is_antline', 'is_fizzler',
+    ]
+
+    def __init__(self, name: str, mat_id: int) -> None:
+        self.name = name
+        self.id = mat_id
+        self.is_white = name in WhitePan._value2member_map_
+        self.is_black = name in BlackPan._value2member_map_
+        self.is_tile = self.is_white or self.is_black
+        self.is_goo = name in Goo._value2member_map_
+        self.is_glass = name == Special.GLASS.value
+        self.is_grating = name == Special.GRATING.value
+        self.is_tool = name.startswith('tools/')
+        self.is_signage = name in Signage._value2member_map_
+        self.is_antline = name in Antlines._value2member_map_
+        self.is_fizzler = name in Fizzler._value2member_map_
+
+    def __repr__(self) -> str:
+        return '<MatInfo #{} "{}">'.format(self.id, self.name)
+
+
+# Every material name seen, in both the original and casefolded forms.
+_MAT_INFO = {}  # type: Dict[str, MatInfo]
+# The materials in order of ID.
+_MAT_BY_ID = []  # type: List[MatInfo]
+
+
+def mat_info(mat: str) -> MatInfo:
+    """Get the information for a material.
+
+    Each distinct material is casefolded and classified only once, so this
+    is much cheaper than checking the material groups directly.
+    """
+    try:
+        return _MAT_INFO[mat]
+    except KeyError:
+        pass
+    folded = sys.intern(mat.casefold())
+    try:
+        info = _MAT_INFO[folded]
+    except KeyError:
+        info = _MAT_INFO[folded] = MatInfo(folded, len(_MAT_BY_ID))
+        _MAT_BY_ID.append(info)
+    _MAT_INFO[mat] = info
+    return info
@@ -0,0 +1,165 @@
+"""Cache the results of compiles, so unchanged maps don't need recompiling.
+
+Entries are keyed by a hash of the map and all the configs which affect the
+output. Each is a folder holding copies of the files the compile produced,
+and a manifest of where they should be restored to. The least recently used
+entries are removed once the cache is too large.
+"""
+import hashlib
+import os
+import shutil
+import time
+from configparser import ConfigParser
+
+import utils
+
+from typing import Iterable, List, Optional, Set, Tuple
+
+LOGGER = utils.getLogger(__name__)
+
+# Lists the files in an entry - 'index<tab>destination' on each line.
+MANIFEST = 'manifest.txt'
+# The output from VBSP, so the entity counts can be read again.
+OUTPUT = 'output.txt'
+
+
+def hash_config(conf: Optional[ConfigParser], skip: Set[str]=frozenset()) -> str:
+    """Hash the values in a config file, ignoring some sections."""
+    if conf is None:
+        return ''
+    hasher = hashlib.blake2b(digest_size=16)
+    for section in sorted(conf.sections()):
+        if section in skip:
+            continue
+        hasher.update('[{}]\n'.format(section).encode('utf8'))
+        for key, value in sorted(conf.items(section, raw=True)):
+            hasher.update('{}={}\n'.format(key, value).encode('utf8'))
+    return hasher.hexdigest()
+
+
+def make_key(files: Iterable[str], extra: Iterable[str]=()) -> str:
+    """Compute the key for the contents of these files and other values.
+
+    Missing files are allowed, and hash differently to empty ones.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    for filename in files:
+        hasher.update(filename.encode('utf8') + b'\0')
+        try:
+            with open(filename, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 16), b''):
+                    hasher.update(block)
+        except FileNotFoundError:
+            hasher.update(b'<missing>')
+        hasher.update(b'\0')
+    for value in extra:
+        hasher.update(value.encode('utf8') + b'\0')
+    return hasher.hexdigest()
+
+
+class CompileCache:
+    """The cache folder."""
+    def __init__(self, folder: str, max_size: int) -> None:
+        self.folder = folder
+        self.max_size = max_size
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def restore(self, key: str) -> Optional[bytes]:
+        """Restore the files for this key.
+
+        If present, the VBSP output is returned. Otherwise this returns None.
+        """
+        entry = os.path.join(self.folder, key)
+        try:
+            with open(os.path.join(entry, MANIFEST)) as f:
+                files = [
+                    line.rstrip('\n').split('\t', 1)
+                    for line in f
+                ]
+            with open(os.path.join(entry, OUTPUT), 'rb') as f:
+                output = f.read()
+        except (OSError, ValueError):
+            return None
+
+        try:
+            for index, dest in files:
+                LOGGER.info('Restoring "{}"', dest)
+                os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+                shutil.copy(os.path.join(entry, index), dest)
+        except (OSError, ValueError):
+            LOGGER.warning('Could not restore cached compile!', exc_info=True)
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        # Mark it as recently used.
+        os.utime(os.path.join(entry, MANIFEST))
+        return output
+
+    def store(self, key: str, files: Iterable[str], output: bytes) -> None:
+        """Save these files and the VBSP output for this key.
+
+        Files which don't exist are skipped.
+        """
+        entry = os.path.join(self.folder, key)
+        temp_entry = entry + '.tmp'
+        shutil.rmtree(temp_entry, ignore_errors=True)
+        try:
+            os.makedirs(temp_entry)
+            manifest = []
+            for filename in files:
+                if not os.path.isfile(filename):
+                    continue
+                index = str(len(manifest))
+                shutil.copy(filename, os.path.join(temp_entry, index))
+                manifest.append('{}\t{}\n'.format(index, filename))
+            with open(os.path.join(temp_entry, OUTPUT), 'wb') as f:
+                f.write(output)
+            # Written last, so partial entries are never used.
+            with open(os.path.join(temp_entry, MANIFEST), 'w') as f:
+                f.writelines(manifest)
+
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(temp_entry, entry)
+        except OSError:
+            LOGGER.warning('Could not cache compile!', exc_info=True)
+            shutil.rmtree(temp_entry, ignore_errors=True)
+            return
+        LOGGER.info('Cached compile as {}', key)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until we fit."""
+        entries = []  # type: List[Tuple[float, int, str]]
+        total = 0
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return
+        for name in names:
+            entry = os.path.join(self.folder, name)
+            if not os.path.isdir(entry):
+                continue
+            try:
+                used = os.stat(os.path.join(entry, MANIFEST)).st_mtime
+            except OSError:
+                # Incomplete, or a leftover temporary folder.
+                used = 0
+            size = 0
+            for file in os.listdir(entry):
+                size += os.path.getsize(os.path.join(entry, file))
+            entries.append((used, size, entry))
+            total += size
+
+        entries.sort()
+        for used, size, entry in entries:
+            if total <= self.max_size:
+                break
+            LOGGER.info(
+                'Removing cached compile from {}',
+                time.ctime(used) if used else 'an incomplete compile',
+            )
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,441 @@
+"""A long-running server which keeps the compiler hooks loaded.
+
+Starting a hook is slow - srctools and every condition module need to be
+imported, and then vbsp_config, instances.cfg and the templates are parsed.
+The server keeps a worker process for each hook which has done all that in
+advance, so the hook executables only need to forward their arguments and
+print the log which is sent back.
+
+Each worker only runs a single compile, so no state carries over between
+maps. Once it's used, a replacement is started while the game runs the other
+compile tools. If the configs are rewritten by an export, the workers are
+restarted so they load the new versions.
+
+This is enabled by the `compile_server` option in vbsp_config.
+"""
+import binascii
+import hmac
+import io
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import utils
+
+from typing import Dict, List, Optional, Tuple
+
+LOGGER = utils.getLogger(__name__)
+
+# Stores the port and the token clients need to send.
+SERVER_FILE = 'bee2/compile_server.txt'
+
+# The configs read by the workers. If these change we restart them.
+CONFIG_FILES = [
+    'bee2/vbsp_config.cfg',
+    'bee2/instances.cfg',
+    'bee2/templates.vmf',
+]
+
+# The hooks the server can run.
+TOOLS = ('vbsp', 'vrad')
+
+# Time to wait when connecting to the server.
+CONNECT_TIMEOUT = 2.0
+# How often the server checks if the configs have changed.
+POLL_TIME = 2.0
+# Exit if no compiles have been run for this long.
+IDLE_TIMEOUT = 60 * 60
+
+# Set in the workers, so they don't try to launch another server.
+IN_SERVER = False
+
+
+def _server_file(folder: str) -> str:
+    return os.path.join(folder, SERVER_FILE)
+
+
+def read_server_file(folder: str='.') -> Optional[Tuple[int, str]]:
+    """Find the port and token for the server running in this bin/ folder.
+
+    If the file is missing or invalid, None is returned.
+    """
+    try:
+        with open(_server_file(folder)) as f:
+            port, token = f.read().split()[:2]
+        return int(port), token
+    except (OSError, ValueError):
+        return None
+
+
+def _send(conn: socket.socket, **message) -> None:
+    """Send a single JSON message."""
+    conn.sendall(json.dumps(message).encode('utf8') + b'\n')
+
+
+def _request(
+    folder: str,
+    tool: str,
+    timeout: Optional[float]=CONNECT_TIMEOUT,
+    **message
+):
+    """Connect to the server, and send a request.
+
+    This yields each reply. If the server isn't running, nothing is yielded.
+    """
+    info = read_server_file(folder)
+    if info is None:
+        return
+    port, token = info
+    try:
+        conn = socket.create_connection(
+            ('127.0.0.1', port),
+            timeout=CONNECT_TIMEOUT,
+        )
+    except OSError:
+        return
+
+    with conn:
+        try:
+            conn.settimeout(timeout)
+            _send(conn, token=token, tool=tool, **message)
+            for line in conn.makefile('rb'):
+                yield json.loads(line.decode('utf8'))
+        except (OSError, ValueError):
+            return
+
+
+def run_remote(tool: str, argv: List[str]) -> Optional[int]:
+    """Run a compile hook on the server, if one is running.
+
+    The output is copied to our stdout and stderr. This returns the exit
+    code, or None if the server couldn't run it and it needs to be done
+    locally.
+    """
+    started = False
+    for message in _request('.', tool, None, argv=argv, cwd=os.getcwd()):
+        if 'started' in message:
+            started = True
+        elif 'out' in message:
+            sys.stdout.write(message['out'])
+            sys.stdout.flush()
+        elif 'err' in message:
+            sys.stderr.write(message['err'])
+            sys.stderr.flush()
+        elif 'exit' in message:
+            return message['exit']
+        elif 'error' in message:
+            break
+    # If it died halfway through, we can't run it again.
+    return 1 if started else None
+
+
+def is_running(folder: str='.') -> bool:
+    """Check if the server for this bin/ folder is responding."""
+    for message in _request(folder, 'ping'):
+        return 'exit' in message
+    return False
+
+
+def shutdown(folder: str='.') -> None:
+    """Stop the server for this bin/ folder, if it's running.
+
+    The app does this before replacing the compiler executables.
+    """
+    for message in _request(folder, 'shutdown'):
+        if 'exit' in message:
+            LOGGER.info('Compile server stopped.')
+            return
+
+
+def ensure_running() -> None:
+    """Start the server for the current bin/ folder, if it isn't already."""
+    if IN_SERVER or is_running():
+        return
+
+    if getattr(sys, 'frozen', False):
+        # The server is frozen alongside the hooks.
+        exe_dir, exe_name = os.path.split(sys.executable)
+        args = [os.path.join(
+            exe_dir,
+            exe_name.replace('vbsp', 'compile_server', 1),
+        )]
+    else:
+        args = [sys.executable, os.path.abspath(__file__)]
+
+    if utils.WIN:
+        kwargs = {'creationflags': (
+            0x08000000 |  # CREATE_NO_WINDOW
+            subprocess.CREATE_NEW_PROCESS_GROUP
+        )}
+    else:
+        kwargs = {'start_new_session': True}
+
+    LOGGER.info('Starting compile server: {}', args)
+    try:
+        subprocess.Popen(
+            args,
+            cwd=os.getcwd(),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **kwargs
+        )
+    except OSError:
+        LOGGER.warning('Could not start the compile server!', exc_info=True)
+
+
+def config_stamp() -> List[Tuple[str, Optional[int]]]:
+    """Get the modification times of the configs."""
+    stamp = []
+    for filename in CONFIG_FILES:
+        try:
+            stamp.append((filename, os.stat(filename).st_mtime_ns))
+        except OSError:
+            stamp.append((filename, None))
+    return stamp
+
+
+class _PipeStream(io.TextIOBase):
+    """A text stream which sends everything written through a pipe."""
+    def __init__(self, pipe, channel: str) -> None:
+        super().__init__()
+        self.pipe = pipe
+        self.channel = channel
+
+    def write(self, text: str) -> int:
+        if text:
+            self.pipe.send((self.channel, text))
+        return len(text)
+
+    def writable(self) -> bool:
+        return True
+
+
+def _redirect_output(pipe) -> None:
+    """Send stdout, stderr and the console logs back through the pipe."""
+    sys.stdout = _PipeStream(pipe, 'out')
+    sys.stderr = _PipeStream(pipe, 'err')
+
+    logger = logging.getLogger('BEE2')
+    for name, stream, level in [
+        ('stdout_loghandler', sys.stdout, logging.INFO),
+        ('stderr_loghandler', sys.stderr, logging.WARNING),
+    ]:
+        handler = getattr(utils, name, None)
+        if handler is None:
+            # No console when we were started, so add the handler ourselves.
+            handler = logging.StreamHandler(stream)
+            handler.setLevel(level)
+            handler.setFormatter(utils.long_log_format)
+            if level < logging.WARNING:
+                handler.addFilter(
+                    lambda record: record.levelno < logging.WARNING
+                )
+            logger.addHandler(handler)
+            setattr(utils, name, handler)
+        else:
+            handler.stream = stream
+
+
+def _worker(tool: str, pipe) -> None:
+    """Prepare a compile hook, then wait for a compile to run.
+
+    This runs in a separate process.
+    """
+    global IN_SERVER
+    IN_SERVER = True
+
+    if tool == 'vbsp':
+        import vbsp
+        import conditions
+        conditions.import_conditions(lazy=False)
+        try:
+            vbsp.load_settings()
+        except Exception:
+            # It'll be tried again when the compile runs.
+            LOGGER.warning('Could not preload settings!', exc_info=True)
+
+        def run(argv: List[str]) -> None:
+            sys.argv = argv
+            vbsp.main()
+    else:
+        import vrad
+        run = vrad.main
+
+    try:
+        pipe.send(('ready', None))
+        argv, cwd = pipe.recv()
+    except (EOFError, OSError):
+        return  # Server quit.
+
+    _redirect_output(pipe)
+    code = 0
+    try:
+        os.chdir(cwd)
+        run(argv)
+    except SystemExit as exc:
+        if exc.code is None:
+            code = 0
+        elif isinstance(exc.code, int):
+            code = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        LOGGER.exception('Compile failed!')
+        code = 1
+    finally:
+        logging.shutdown()
+        pipe.send(('exit', code))
+
+
+class Worker:
+    """A process ready to run a compile."""
+    def __init__(self, tool: str) -> None:
+        ctx = multiprocessing.get_context('spawn')
+        self.tool = tool
+        self.pipe, child_pipe = ctx.Pipe()
+        self.proc = ctx.Process(
+            target=_worker,
+            args=(tool, child_pipe),
+            name='compile_' + tool,
+            daemon=True,
+        )
+        self.proc.start()
+        child_pipe.close()
+
+    def run(self, conn: socket.socket, argv: List[str], cwd: str) -> int:
+        """Run the compile, sending the output to the client.
+
+        If the worker failed to start, -1 is returned.
+        """
+        try:
+            # Wait for it to finish loading, if it hasn't already.
+            self.pipe.recv()
+            self.pipe.send((argv, cwd))
+        except (EOFError, OSError):
+            self.stop()
+            return -1
+        _send(conn, started=True)
+
+        client_alive = True
+        while True:
+            try:
+                channel, value = self.pipe.recv()
+            except (EOFError, OSError):
+                # The worker crashed.
+                channel, value = 'exit', 1
+            if channel == 'exit':
+                if client_alive:
+                    _send(conn, exit=value)
+                self.proc.join(5)
+                return value
+            if client_alive:
+                try:
+                    _send(conn, **{channel: value})
+                except OSError:
+                    # The game stopped the compile - abort it.
+                    LOGGER.warning('Client disconnected!')
+                    client_alive = False
+                    self.stop()
+
+    def stop(self) -> None:
+        """Terminate the process."""
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self.proc.join(5)
+        self.pipe.close()
+
+
+def serve(idle_timeout: float=IDLE_TIMEOUT) -> None:
+    """Run the server, until it's idle or shut down."""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(4)
+    sock.settimeout(POLL_TIME)
+    port = sock.getsockname()[1]
+    token = binascii.hexlify(os.urandom(16)).decode('ascii')
+
+    os.makedirs(os.path.dirname(SERVER_FILE), exist_ok=True)
+    with open(SERVER_FILE + '.tmp', 'w') as f:
+        f.write('{} {}\n'.format(port, token))
+    os.replace(SERVER_FILE + '.tmp', SERVER_FILE)
+    LOGGER.info('Compile server listening on port {}', port)
+
+    workers = {}  # type: Dict[str, Worker]
+    stamp = config_stamp()
+    last_used = time.monotonic()
+
+    try:
+        while True:
+            for tool in TOOLS:
+                if tool not in workers or not workers[tool].proc.is_alive():
+                    workers[tool] = Worker(tool)
+
+            try:
+                conn, addr = sock.accept()
+            except socket.timeout:
+                if read_server_file() != (port, token):
+                    LOGGER.info('Replaced by another server, quitting.')
+                    break
+                if time.monotonic() - last_used > idle_timeout:
+                    LOGGER.info('Idle, quitting.')
+                    break
+                new_stamp = config_stamp()
+                if new_stamp != stamp:
+                    LOGGER.info('Configs changed, restarting workers.')
+                    stamp = new_stamp
+                    for worker in workers.values():
+                        worker.stop()
+                    workers.clear()
+                continue
+
+            with conn:
+                conn.settimeout(None)
+                try:
+                    request = json.loads(
+                        conn.makefile('rb').readline().decode('utf8')
+                    )
+                    tool = request['tool']
+                    valid = hmac.compare_digest(request['token'], token)
+                except (OSError, ValueError, KeyError, TypeError):
+                    LOGGER.warning('Invalid request!', exc_info=True)
+                    continue
+                if not valid:
+                    _send(conn, error='Invalid token!')
+                    continue
+
+                if tool == 'ping':
+                    _send(conn, exit=0)
+                    continue
+                elif tool == 'shutdown':
+                    _send(conn, exit=0)
+                    break
+                elif tool not in workers:
+                    _send(conn, error='Unknown tool "{}"!'.format(tool))
+                    continue
+
+                last_used = time.monotonic()
+                LOGGER.info('Running {}: {}', tool, request['argv'])
+                worker = workers.pop(tool)
+                code = worker.run(conn, request['argv'], request['cwd'])
+                if code == -1:
+                    _send(conn, error='Worker failed to start!')
+                LOGGER.info('{} finished ({})', tool, code)
+    finally:
+        sock.close()
+        for worker in workers.values():
+            worker.stop()
+        if read_server_file() == (port, token):
+            os.remove(SERVER_FILE)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    utils.init_logging('bee2/compile_server.log')
+    serve()
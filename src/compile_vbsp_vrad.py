@@ -43,17 +43,8 @@ EXCLUDES = [
     'smtplib',
     'http',
 ]
-# These also aren't required by logging really, but by default
-# they're imported unconditionally. Check to see if it's modified first.
-import logging.handlers
-if not hasattr(logging.handlers, 'socket'):
-    EXCLUDES.append('socket')
-    # Subprocess uses this in UNIX-style OSes, but not Windows.
-    if utils.WIN:
-        EXCLUDES += ['selectors', 'select']
-if not hasattr(logging.handlers, 'pickle'):
-    EXCLUDES.append('pickle')
-del logging
+# Logging handlers also import socket and pickle, but those are required
+# for the compile server.
 
 if utils.MAC or utils.LINUX:
     EXCLUDES += ['grp', 'pwd']  # Unix authentication modules, optional
@@ -81,6 +72,11 @@ INCLUDES += [
     condition_modules
 ]
 
+# Import everything, so we can record which module defines each condition.
+# The compiler then only imports modules when they are used.
+conditions.import_conditions(lazy=False)
+condition_manifest = conditions.build_manifest()
+
 bee_version = input('BEE2 Version (or blank for dev): ')
 
 setup(
@@ -92,11 +88,16 @@ setup(
             'excludes': EXCLUDES,
             'includes': INCLUDES,
             # These values are added to the generated BUILD_CONSTANTS module.
-            'constants': 'BEE_VERSION={ver!r},cond_modules={cond!r}'.format(
+            'constants': (
+                'BEE_VERSION={ver!r},'
+                'cond_modules={cond!r},'
+                'cond_manifest={manifest!r}'
+            ).format(
                 ver=bee_version,
                 # Pass on the list of frozen constants so we can import them
                 # later.
                 cond=';'.join(condition_modules),
+                manifest=condition_manifest,
             ),
 
             # Include all modules in the zip..
@@ -114,11 +115,17 @@ setup(
             targetName='vbsp' + suffix,
         ),
         Executable(
-            'vrad.py',
+            'vrad_launch.py',
             base='Console',
             icon=ico_path,
             targetName='vrad' + suffix,
         ),
+        Executable(
+            'compile_server.py',
+            base='Console',
+            icon=ico_path,
+            targetName='compile_server' + suffix,
+        ),
     ]
 )
 
@@ -3,13 +3,14 @@ import inspect
 import itertools
 import math
 import random
+import re
 from collections import namedtuple, defaultdict
 from decimal import Decimal
 from enum import Enum
 
 from typing import (
-    Callable, Any, Iterable, Optional,
-    Dict, List, Tuple, NamedTuple, )
+    Callable, Any, Iterable, Iterator, Optional,
+    Dict, List, Tuple, Set, NamedTuple, )
 
 import comp_consts as consts
 import srctools
@@ -31,19 +32,141 @@ GLOBAL_INSTANCES = set()
 ALL_INST = set()
 VMF = None  # type: srctools.VMF
 
+
+class _LazyLookup(dict):
+    """A lookup dict, which imports condition modules on demand.
+
+    If a name is missing, the module which registers it (according to the
+    manifest) is imported, then the lookup is retried.
+    """
+    def __init__(self, kind: str) -> None:
+        super().__init__()
+        self.kind = kind
+
+    def __missing__(self, name: str):
+        try:
+            module = _LAZY_NAMES[self.kind, name]
+        except KeyError:
+            raise KeyError(name) from None
+        _import_cond_module(module)
+        return dict.__getitem__(self, name)
+
+    def get(self, name: str, default=None):
+        """Return the value for this name, or the default if not present."""
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+
 conditions = []
-FLAG_LOOKUP = {}
-RESULT_LOOKUP = {}
-RESULT_SETUP = {}
+FLAG_LOOKUP = _LazyLookup('f')
+RESULT_LOOKUP = _LazyLookup('r')
+RESULT_SETUP = _LazyLookup('s')
+
+# (kind, name) -> condition module, for modules not yet imported.
+_LAZY_NAMES = {}  # type: Dict[Tuple[str, str], str]
+# The lazy value import_conditions() last ran with, or None if not yet run.
+_IMPORTED_LAZY = None  # type: Optional[bool]
 
 # Used to dump a list of the flags, results, meta-conditions
 ALL_FLAGS = []
 ALL_RESULTS = []
 ALL_META = []
+# Used to build the lazy-import manifest.
+ALL_SETUP = []
 
 GOO_LOCS = {}  # A mapping from blocks containing goo to the top face
 GOO_FACE_LOC = {}  # A mapping from face origin -> face for top faces.
 
+
+class OverlayIndex:
+    """Indexes the info_overlays in the map.
+
+    Overlays can be looked up by targetname, material and the face IDs
+    they're placed on. These are the values when the overlay was added,
+    so the name and material lookups check overlays still match and are in
+    the map. by_side may contain removed overlays, and overlays which have
+    since been moved to other faces.
+    """
+    def __init__(self) -> None:
+        self.vmf = None  # type: srctools.VMF
+        self.by_name = defaultdict(set)  # type: Dict[str, Set[Entity]]
+        # Casefolded material -> overlays.
+        self.by_mat = defaultdict(set)  # type: Dict[str, Set[Entity]]
+        # Face IDs (as strings) -> overlays.
+        self.by_side = defaultdict(set)  # type: Dict[str, Set[Entity]]
+
+    def build(self, vmf: srctools.VMF) -> None:
+        """Index all the overlays in this map."""
+        self.vmf = vmf
+        self.by_name.clear()
+        self.by_mat.clear()
+        self.by_side.clear()
+        for overlay in vmf.by_class['info_overlay']:
+            self.add(overlay)
+
+    def add(self, overlay: Entity) -> None:
+        """Add an overlay to the index.
+
+        This must be called for overlays added to the map, and again if
+        their sides, name or material are changed.
+        """
+        self.by_name[overlay['targetname']].add(overlay)
+        self.by_mat[overlay['material'].casefold()].add(overlay)
+        for side in overlay['sides', ''].split():
+            self.by_side[side].add(overlay)
+
+    def remove(self, overlay: Entity) -> None:
+        """Remove an overlay from the map and the index."""
+        self.vmf.remove_ent(overlay)
+        self.by_name[overlay['targetname']].discard(overlay)
+        self.by_mat[overlay['material'].casefold()].discard(overlay)
+
+    def named(self, name: str) -> List[Entity]:
+        """Return the overlays in the map with this targetname.
+
+        These are in the order they were added to the map.
+        """
+        map_overlays = self.vmf.by_class['info_overlay']
+        return sorted(
+            [
+                overlay for overlay in self.by_name.get(name, ())
+                if overlay in map_overlays
+                if overlay['targetname'] == name
+            ],
+            key=_ent_id,
+        )
+
+    def with_mats(self, *mats: str) -> List[Entity]:
+        """Return the overlays in the map with any of these materials.
+
+        These are in the order they were added to the map.
+        """
+        map_overlays = self.vmf.by_class['info_overlay']
+        folded = {mat.casefold() for mat in mats}
+        return sorted(
+            {
+                overlay
+                for mat in folded
+                for overlay in self.by_mat.get(mat, ())
+                if overlay in map_overlays
+                if overlay['material'].casefold() in folded
+            },
+            key=_ent_id,
+        )
+
+
+def _ent_id(ent: Entity) -> int:
+    return ent.id
+
+
+OVERLAYS = OverlayIndex()
+
+# A mapping from face IDs (as strings) to the overlays placed on them.
+# This may contain removed overlays, check they're still in the map.
+OVERLAY_SIDES = OVERLAYS.by_side
+
 # A template shaped like embeddedVoxel blocks
 TEMP_EMBEDDED_VOXEL = 'BEE2_EMBEDDED_VOXEL'
 
@@ -63,7 +186,147 @@ solidGroup = NamedTuple('solidGroup', [
     ('normal', Vec),  # The normal of the face.
     ('color', template_brush.MAT_TYPES),
 ])
-SOLIDS = {}  # type: Dict[Vec_tuple, solidGroup]
+
+
+class SolidDict(dict):
+    """The dictionary mapping face origins to their solidGroup.
+
+    This additionally indexes the faces by the 128-unit grid cell containing
+    them, allowing quick neighbour and bounding box queries.
+    Only modify this via item assignment, del, pop() and clear() (or the
+    remove_*() methods), so the index stays in sync.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        # Grid cell -> face origins inside it.
+        self._cells = defaultdict(set)  # type: Dict[Tuple[int, int, int], Set[Vec_tuple]]
+
+    @staticmethod
+    def _cell(pos: Vec_tuple) -> Tuple[int, int, int]:
+        """Return the grid cell a position is in."""
+        return int(pos[0] // 128), int(pos[1] // 128), int(pos[2] // 128)
+
+    def __setitem__(self, key: Vec_tuple, value: solidGroup) -> None:
+        key = Vec_tuple(*key)
+        super().__setitem__(key, value)
+        self._cells[self._cell(key)].add(key)
+
+    def __delitem__(self, key: Vec_tuple) -> None:
+        super().__delitem__(key)
+        self._uncell(key)
+
+    def pop(self, key: Vec_tuple, *default):
+        """Remove the given key, returning the solidGroup."""
+        if key in self:
+            self._uncell(key)
+        return super().pop(key, *default)
+
+    def clear(self) -> None:
+        """Remove all the faces."""
+        super().clear()
+        self._cells.clear()
+
+    def _uncell(self, key: Vec_tuple) -> None:
+        """Remove a key from the cell index."""
+        cell = self._cell(key)
+        try:
+            keys = self._cells[cell]
+        except KeyError:
+            return
+        keys.discard(Vec_tuple(*key))
+        if not keys:
+            del self._cells[cell]
+
+    def at_offset(
+        self,
+        inst: Entity,
+        offset: Vec,
+        normal: Vec=None,
+    ) -> Optional[solidGroup]:
+        """Return the face at an offset from an instance, if present.
+
+        The offset (and normal if given) are in the instance's local space.
+        If normal is given, the face must also point in that direction.
+        """
+        angles = inst['angles', '0 0 0']
+        pos = Vec(offset).rotate_by_str(angles)
+        pos += Vec.from_str(inst['origin'])
+        group = self.get(pos.as_tuple())
+        if group is None:
+            return None
+        if normal is not None:
+            if group.normal != Vec(normal).rotate_by_str(angles):
+                return None
+        return group
+
+    def neighbours(self, group: solidGroup) -> List[solidGroup]:
+        """Return the faces on the same plane, 128 units away from this one.
+
+        Only faces pointing in the same direction are included.
+        """
+        origin = group.face.get_origin()
+        found = []
+        for axis in 'xyz':
+            if group.normal[axis] != 0:
+                continue
+            for off in (-128, 128):
+                pos = origin.copy()
+                pos[axis] += off
+                other = self.get(pos.as_tuple())
+                if other is not None and other.normal == group.normal:
+                    found.append(other)
+        return found
+
+    def in_box(
+        self,
+        bbox_min: Vec,
+        bbox_max: Vec,
+        normal: Vec=None,
+    ) -> Iterator[solidGroup]:
+        """Yield all faces with origins inside the given box (inclusive).
+
+        If normal is given, only faces pointing that direction are produced.
+        """
+        bbox_min, bbox_max = Vec.bbox(bbox_min, bbox_max)
+        min_x, min_y, min_z = self._cell(bbox_min.as_tuple())
+        max_x, max_y, max_z = self._cell(bbox_max.as_tuple())
+        for cell in itertools.product(
+            range(min_x, max_x + 1),
+            range(min_y, max_y + 1),
+            range(min_z, max_z + 1),
+        ):
+            for key in self._cells.get(cell, ()):
+                if not (
+                    bbox_min.x <= key.x <= bbox_max.x and
+                    bbox_min.y <= key.y <= bbox_max.y and
+                    bbox_min.z <= key.z <= bbox_max.z
+                ):
+                    continue
+                group = self[key]
+                if normal is None or group.normal == normal:
+                    yield group
+
+    def remove_face(self, group: solidGroup, nodraw: bool=False) -> None:
+        """Remove a face from the dictionary.
+
+        If nodraw is set, the face is also changed to nodraw.
+        """
+        key = group.face.get_origin().as_tuple()
+        if self.get(key) is group:
+            del self[key]
+        if nodraw:
+            group.face.mat = consts.Tools.NODRAW
+
+    def remove_brush(self, solid: Solid) -> None:
+        """Remove a brush from the map, and any faces it has in the dict."""
+        VMF.remove_brush(solid)
+        for face in solid:
+            key = face.get_origin().as_tuple()
+            group = self.get(key)
+            if group is not None and group.face is face:
+                del self[key]
+
+SOLIDS = SolidDict()  # type: Dict[Vec_tuple, solidGroup]
 
 # The input/output connection values defined for each item.
 # Each is a tuple of (inst_name, command) values, ready to be passed to
@@ -306,6 +569,51 @@ class Condition:
                 results.remove(res)
 
 
+class BatchCondition:
+    """A meta-condition which is passed all matching instances at once.
+
+    This avoids dispatching the condition to every instance individually.
+    """
+    __slots__ = ['func', 'priority', 'source', 'inst_filter', 'name_pattern']
+
+    def __init__(
+        self,
+        func: Callable[[srctools.VMF, List[Entity]], None],
+        priority=Decimal('0'),
+        source=None,
+        inst_filter='',
+        name_pattern=None,
+    ):
+        self.func = func
+        self.priority = priority
+        self.source = source
+        self.inst_filter = inst_filter
+        self.name_pattern = name_pattern
+
+    def __repr__(self):
+        return 'BatchCondition({!r}, priority={!r})'.format(
+            self.func,
+            self.priority,
+        )
+
+    def run(self):
+        """Find the matching instances, and pass them to the function."""
+        insts = VMF.by_class['func_instance']
+        if self.inst_filter:
+            files = instanceLocs.resolve(self.inst_filter)
+            insts = [
+                inst for inst in insts
+                if inst['file'].casefold() in files
+            ]
+        if self.name_pattern is not None:
+            search = self.name_pattern.search
+            insts = [
+                inst for inst in insts
+                if search(inst['targetname'])
+            ]
+        self.func(VMF, list(insts))
+
+
 def annotation_caller(func, *parms):
     """Reorders callback arguments to the requirements of the callback.
 
@@ -351,16 +659,25 @@ def annotation_caller(func, *parms):
         # Matches already, don't need to do anything.
         return func
 
-    # Double function to make a closure, to allow reference to the function
-    # more directly.
-    # Lambdas are expressions, so we can return the result directly.
-    return eval(
-        '(lambda func: lambda {}: func({}))(func)'.format(
-            ', '.join(inputs),
-            ', '.join(outputs),
-        ),
-        {'func': func},
-    )
+    # Many functions share the same argument order, so only compile each
+    # wrapper once and reuse it.
+    key = (tuple(inputs), tuple(outputs))
+    try:
+        factory = _CALLER_FACTORIES[key]
+    except KeyError:
+        # Double function to make a closure, to allow reference to the
+        # function more directly.
+        # Lambdas are expressions, so we can return the result directly.
+        factory = _CALLER_FACTORIES[key] = eval(
+            'lambda func: lambda {}: func({})'.format(
+                ', '.join(inputs),
+                ', '.join(outputs),
+            ),
+        )
+    return factory(func)
+
+# (inputs, outputs) -> function producing the wrapper for annotation_caller().
+_CALLER_FACTORIES = {}  # type: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], Callable]
 
 
 def add_meta(func, priority, only_once=True):
@@ -402,8 +719,44 @@ def meta_cond(priority=0, only_once=True):
     return x
 
 
-def make_flag(orig_name, *aliases):
-    """Decorator to add flags to the lookup."""
+def add_batch_meta(func, priority, instances='', targetname=''):
+    """Add a metacondition which is passed all matching instances at once.
+
+    If instances is set, only instances matching that instanceLocs filename
+    are passed. If targetname is set, only instances whose name contains
+    a match for that regex are passed. The function should accept a VMF
+    and a List[Entity].
+    """
+    name = '"' + func.__qualname__ + '"'
+    LOGGER.debug(
+        "Adding batch metacondition ({}) with priority {!s}!",
+        name,
+        priority,
+    )
+    conditions.append(BatchCondition(
+        annotation_caller(func, srctools.VMF, List[Entity]),
+        priority=priority,
+        source='MetaCondition {}'.format(name),
+        inst_filter=instances,
+        name_pattern=re.compile(targetname) if targetname else None,
+    ))
+    ALL_META.append((name, priority, func))
+
+
+def meta_batch(priority=0, instances='', targetname=''):
+    """Decorator version of add_batch_meta."""
+    def x(func):
+        add_batch_meta(func, priority, instances, targetname)
+        return func
+    return x
+
+
+def make_flag(orig_name, *aliases, fast_call=False):
+    """Decorator to add flags to the lookup.
+
+    If fast_call is true, the function must take (vmf, inst, flag) in that
+    order, and is called directly without inspecting the signature.
+    """
     def x(func: Callable[[Entity, Property], bool]):
         try:
             func.group = func.__globals__['COND_MOD_NAME']
@@ -411,7 +764,10 @@ def make_flag(orig_name, *aliases):
             func.group = func.__globals__['__name__']
             LOGGER.info('No name for module "{}"!', func.group)
 
-        wrapper = annotation_caller(func, srctools.VMF, Entity, Property)
+        if fast_call:
+            wrapper = func
+        else:
+            wrapper = annotation_caller(func, srctools.VMF, Entity, Property)
         ALL_FLAGS.append(
             (orig_name, aliases, func)
         )
@@ -422,8 +778,12 @@ def make_flag(orig_name, *aliases):
     return x
 
 
-def make_result(orig_name, *aliases):
-    """Decorator to add results to the lookup."""
+def make_result(orig_name, *aliases, fast_call=False):
+    """Decorator to add results to the lookup.
+
+    If fast_call is true, the function must take (vmf, inst, res) in that
+    order, and is called directly without inspecting the signature.
+    """
     def x(func: Callable[..., Any]):
         try:
             func.group = func.__globals__['COND_MOD_NAME']
@@ -431,7 +791,10 @@ def make_result(orig_name, *aliases):
             func.group = func.__globals__['__name__']
             LOGGER.info('No name for module "{}"!', func.group)
 
-        wrapper = annotation_caller(func, srctools.VMF, Entity, Property)
+        if fast_call:
+            wrapper = func
+        else:
+            wrapper = annotation_caller(func, srctools.VMF, Entity, Property)
         ALL_RESULTS.append(
             (orig_name, aliases, func)
         )
@@ -446,6 +809,7 @@ def make_result_setup(*names):
     """Decorator to do setup for this result."""
     def x(func: Callable[..., Any]):
         wrapper = annotation_caller(func, srctools.VMF, Property)
+        ALL_SETUP.append((names, func))
         for name in names:
             RESULT_SETUP[name.casefold()] = wrapper
         return func
@@ -478,6 +842,14 @@ def check_all():
     """Check all conditions."""
     LOGGER.info('Checking Conditions...')
     for condition in conditions:
+        if isinstance(condition, BatchCondition):
+            try:
+                condition.run()
+            except:
+                LOGGER.exception('Error in {}:', condition.source)
+                utils.quit_app(1)
+            continue
+
         for inst in VMF.by_class['func_instance']:
             try:
                 condition.test(inst)
@@ -546,11 +918,19 @@ def check_flag(flag: Property, inst: Entity):
     return res == desired_result
 
 
-def import_conditions():
-    """Import all the components of the conditions package.
+def import_conditions(lazy=True):
+    """Import the components of the conditions package.
 
-    This ensures everything gets registered.
+    This ensures everything gets registered. If lazy is true and a manifest
+    was generated at build time, only modules with meta-conditions are
+    imported immediately. The others are imported when one of their flags
+    or results is first looked up.
+    Calling this again does nothing, unless lazy was true and now isn't.
     """
+    global _IMPORTED_LAZY
+    if _IMPORTED_LAZY is False or _IMPORTED_LAZY == lazy:
+        LOGGER.debug('Conditions modules already imported.')
+        return
     import importlib
     # Find the modules in the conditions package...
 
@@ -567,13 +947,99 @@ def import_conditions():
             pkgutil.iter_modules(['conditions'])
         ]
 
+    if lazy:
+        try:
+            # noinspection PyUnresolvedReferences
+            from BUILD_CONSTANTS import cond_manifest
+        except ImportError:
+            pass
+        else:
+            modules = parse_manifest(cond_manifest)
+    else:
+        # Everything is imported now.
+        _LAZY_NAMES.clear()
+
     for module in modules:
         # Import the module, then discard it. The module will run add_flag
         # or add_result() functions, which save the functions into our dicts.
         # We don't need a reference to the modules themselves.
         importlib.import_module('conditions.' + module)
         LOGGER.debug('Imported {} conditions module', module)
-    LOGGER.info('Imported all conditions modules!')
+    _IMPORTED_LAZY = lazy
+    if _LAZY_NAMES:
+        LOGGER.info(
+            'Imported {} conditions modules, {} deferred.',
+            len(modules),
+            len(set(_LAZY_NAMES.values())),
+        )
+    else:
+        LOGGER.info('Imported all conditions modules!')
+
+
+def _import_cond_module(module: str) -> None:
+    """Import a deferred conditions module."""
+    import importlib
+    # Remove the entries first, so a failing import doesn't loop.
+    for key, mod in list(_LAZY_NAMES.items()):
+        if mod == module:
+            del _LAZY_NAMES[key]
+    LOGGER.debug('Importing {} conditions module on demand', module)
+    importlib.import_module('conditions.' + module)
+
+
+def build_manifest() -> str:
+    """Produce the manifest of which modules register each condition.
+
+    All modules must be imported first. This is used by the compile script
+    to allow importing modules on demand. The format is
+    module:name:name;module:name..., where names are prefixed by
+    f, r or s for flags, results and setup functions. A '*' indicates the
+    module has meta-conditions, and so must always be imported.
+    """
+    modules = defaultdict(set)
+
+    def add(kind, func, names):
+        mod_name = func.__module__
+        if not mod_name.startswith('conditions.'):
+            return  # Always imported.
+        modules[mod_name[11:]].update(
+            kind + name.casefold()
+            for name in names
+        )
+
+    for orig_name, aliases, func in ALL_FLAGS:
+        add('f', func, (orig_name, ) + tuple(aliases))
+    for orig_name, aliases, func in ALL_RESULTS:
+        add('r', func, (orig_name, ) + tuple(aliases))
+    for names, func in ALL_SETUP:
+        add('s', func, names)
+    for name, priority, func in ALL_META:
+        add('', func, ['*'])
+
+    return ';'.join(
+        ':'.join([module] + sorted(names))
+        for module, names in
+        sorted(modules.items())
+    )
+
+
+def parse_manifest(manifest: str) -> List[str]:
+    """Read the manifest produced by build_manifest().
+
+    The deferred names are added to _LAZY_NAMES, and the modules which
+    must be imported immediately are returned.
+    """
+    always_import = []
+    for section in manifest.split(';'):
+        if not section:
+            continue
+        module, *names = section.split(':')
+        if '*' in names:
+            always_import.append(module)
+            continue
+        for name in names:
+            _LAZY_NAMES[name[:1], name[1:]] = module
+    return always_import
 
 
 def build_solid_dict():
@@ -582,16 +1048,11 @@ def build_solid_dict():
     This allows easily finding brushes that are at certain locations.
     """
     import vbsp
-    mat_types = {}
-    for mat in vbsp.BLACK_PAN:
-        mat_types[mat] = template_brush.MAT_TYPES.black
-
-    for mat in vbsp.WHITE_PAN:
-        mat_types[mat] = template_brush.MAT_TYPES.white
 
     for solid in VMF.brushes:
         for face in solid:
-            if face.mat.casefold in consts.Goo:
+            mat_info = consts.mat_info(face.mat)
+            if mat_info.is_goo:
                 # Record all locations containing goo.
                 bbox_min, bbox_max = solid.get_bbox()
                 x = bbox_min.x + 64
@@ -607,26 +1068,28 @@ def build_solid_dict():
                 vbsp.settings['has_attr']['goo'] = True
                 continue
 
-            try:
-                mat_type = mat_types[face.mat]
-            except KeyError:
-                continue
+            if mat_info.is_white:
+                mat_type = template_brush.MAT_TYPES.white
+            elif mat_info.is_black:
+                mat_type = template_brush.MAT_TYPES.black
             else:
-                origin = face.get_origin().as_tuple()
-                if origin in SOLIDS:
-                    # The only time two textures will be in the same
-                    # place is if they are covering each other -
-                    # nodraw them both and ignore them
-                    SOLIDS.pop(origin).face.mat = consts.Tools.NODRAW
-                    face.mat = consts.Tools.NODRAW
-                    continue
+                continue
 
-                SOLIDS[origin] = solidGroup(
-                    color=mat_type,
-                    face=face,
-                    solid=solid,
-                    normal=face.normal(),
-                )
+            origin = face.get_origin().as_tuple()
+            if origin in SOLIDS:
+                # The only time two textures will be in the same
+                # place is if they are covering each other -
+                # nodraw them both and ignore them
+                SOLIDS.remove_face(SOLIDS[origin], nodraw=True)
+                face.mat = consts.Tools.NODRAW
+                continue
+
+            SOLIDS[origin] = solidGroup(
+                color=mat_type,
+                face=face,
+                solid=solid,
+                normal=face.normal(),
+            )
 
 
 def build_connections_dict(prop_block: Property):
@@ -790,6 +1253,42 @@ def weighted_random(count: int, weights: str):
     return weight
 
 
+def rand(legacy_seed: Optional[str], *salt: Any):
+    """Get a random generator for a condition.
+
+    The salt values identify what it's for - usually the name of the result,
+    any user-specified seed and the instance's name and position. The same
+    values always give the same sequence, which doesn't depend on any other
+    conditions. This is combined with the map seed.
+
+    If legacy_tex_random is enabled, the random module is seeded with
+    legacy_seed and returned instead, like older versions. If that is None
+    it's left unseeded.
+    """
+    import vbsp
+    if vbsp.LEGACY_TEX_RANDOM:
+        if legacy_seed is not None:
+            random.seed(legacy_seed)
+        return random
+    return vbsp.seeded_rand(*[
+        val if isinstance(val, int) else vbsp.hash_str(str(val))
+        for val in salt
+    ])
+
+
+def inst_rand(inst: Entity, legacy_seed: Optional[str], *salt: Any):
+    """Get a random generator for a condition running on this instance.
+
+    This is rand() with the instance's name, position and angles added to
+    the salt.
+    """
+    return rand(
+        legacy_seed,
+        inst['targetname', ''], inst['origin'], inst['angles'],
+        *salt
+    )
+
+
 def add_output(inst, prop, target):
     """Add a customisable output to an instance."""
     inst.add_out(Output(
@@ -881,16 +1380,37 @@ def remove_ant_toggle(toggle_ent):
     # This will likely be called on the signs too, if present.
     overlay_name = toggle_ent.fixup['$indicator_name', '']
     if overlay_name != '':
-        for ent in VMF.by_target[overlay_name]:
-            ent.remove()
+        # Not just overlays - brush antlines and other entities too.
+        for ent in list(VMF.by_target[overlay_name]):
+            if ent['classname'] == 'info_overlay':
+                OVERLAYS.remove(ent)
+            else:
+                ent.remove()
+
+
+def index_overlay(overlay: Entity):
+    """Add an overlay to OVERLAYS.
+
+    This must be called for overlays added to the map, so they're
+    handled by reallocate_overlays() and found by lookups.
+    """
+    OVERLAYS.add(overlay)
 
 
 def reallocate_overlays(mapping: Dict[str, Optional[List[str]]]):
     """Replace one side ID with others in all overlays.
 
-    The IDs should be strings.
+    The IDs should be strings. Only the overlays on the given faces
+    are touched, using OVERLAY_SIDES.
     """
-    for overlay in VMF.by_class['info_overlay']:  # type: Entity
+    map_overlays = VMF.by_class['info_overlay']
+    changed = set()  # type: Set[Entity]
+    for face_id in mapping:
+        for overlay in OVERLAY_SIDES.pop(face_id, ()):
+            if overlay in map_overlays:
+                changed.add(overlay)
+
+    for overlay in changed:
         sides = overlay['sides', ''].split(' ')
         for side in sides[:]:
             try:
@@ -900,6 +1420,8 @@ def reallocate_overlays(mapping: Dict[str, Optional[List[str]]]):
             sides.remove(side)
             if new_ids is not None:
                 sides.extend(new_ids)
+                for new_id in new_ids:
+                    OVERLAY_SIDES[new_id].add(overlay)
         if not sides:
             # The overlay doesn't have any sides at all!
             VMF.remove_ent(overlay)
@@ -1013,8 +1535,7 @@ def hollow_block(solid_group: solidGroup, remove_orig_face=False):
     if 4 in (bbox_max - bbox_min):
         # If it's 4 units thick, skip hollowing - PeTI did it already.
         if remove_orig_face:
-            VMF.remove_brush(orig_solid)
-            del SOLIDS[solid_group.face.get_origin().as_tuple()]
+            SOLIDS.remove_brush(orig_solid)
         return
 
     VMF.remove_brush(orig_solid)
@@ -1277,7 +1798,7 @@ def res_switch(inst: Entity, res: Property):
 
     if method is SWITCH_TYPE.RANDOM:
         cases = cases[:]
-        random.shuffle(cases)
+        inst_rand(inst, None, 'switch', flag_name or '').shuffle(cases)
 
     for case in cases:
         if flag_name is not None:
@@ -1456,22 +1977,25 @@ def res_goo_debris(res: Property):
 
     suff = ''
     for loc in possible_locs:
-        random.seed('goo_debris_{}_{}_{}'.format(loc.x, loc.y, loc.z))
-        if random.random() > chance:
+        rng = rand(
+            'goo_debris_{}_{}_{}'.format(loc.x, loc.y, loc.z),
+            'goo_debris', int(loc.x), int(loc.y), int(loc.z),
+        )
+        if rng.random() > chance:
             continue
 
         if rand_list is not None:
-            suff = '_' + str(random.choice(rand_list) + 1)
+            suff = '_' + str(rng.choice(rand_list) + 1)
 
         if offset > 0:
-            loc.x += random.randint(-offset, offset)
-            loc.y += random.randint(-offset, offset)
+            loc.x += rng.randint(-offset, offset)
+            loc.y += rng.randint(-offset, offset)
         loc.z -= 32  # Position the instances in the center of the 128 grid.
         VMF.create_ent(
             classname='func_instance',
             file=file + suff + '.vmf',
             origin=loc.join(' '),
-            angles='0 {} 0'.format(random.randrange(0, 3600)/10)
+            angles='0 {} 0'.format(rng.randrange(0, 3600)/10)
         )
 
     return RES_EXHAUSTED
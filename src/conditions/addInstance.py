@@ -2,6 +2,7 @@
 
 """
 import conditions
+import connections
 import instanceLocs
 import srctools
 import vbsp
@@ -108,8 +109,7 @@ def res_add_overlay_inst(inst: Entity, res: Property):
     conditions.set_ent_keys(overlay_inst.fixup, inst, res, 'fixup')
 
     if res.bool('move_outputs', False):
-        overlay_inst.outputs = inst.outputs
-        inst.outputs = []
+        connections.move_outputs(inst, overlay_inst)
 
     if 'offset' in res:
         folded_off = res['offset'].casefold()
@@ -2,18 +2,21 @@
 import math
 import os
 
+import connections
 import srctools
 import instanceLocs
 import utils
 import vbsp_options
 import vbsp
 from conditions import (
-    meta_cond, make_result,
+    meta_cond, meta_batch, make_result,
     remove_ant_toggle,
     PETI_INST_ANGLE, RES_EXHAUSTED
 )
 from srctools import Vec, Property, VMF, Entity, Output
 
+from typing import List
+
 COND_MOD_NAME = None
 
 LOGGER = utils.getLogger(__name__)
@@ -154,22 +157,20 @@ def ap_tag_modifications(vmf: VMF):
             )
 
 
-@meta_cond(priority=-110, only_once=False)
-def res_find_potential_tag_fizzlers(vmf: VMF, inst: Entity):
+@meta_batch(priority=-110, instances='<ITEM_BARRIER_HAZARD:0>')
+def res_find_potential_tag_fizzlers(vmf: VMF, insts: List[Entity]):
     """We need to know which items are 'real' fizzlers.
 
     This is used for Aperture Tag paint fizzlers.
     """
     if vbsp_options.get(str, 'game_id') != utils.STEAM_IDS['TAG']:
-        return RES_EXHAUSTED
-
-    if inst['file'].casefold() not in instanceLocs.resolve('<ITEM_BARRIER_HAZARD:0>'):
         return
 
     # The key list in the dict will be a set of all fizzler items!
-    tag_fizzlers[inst['targetname']] = inst
+    for inst in insts:
+        tag_fizzlers[inst['targetname']] = inst
 
-    if tag_fizzler_locs:  # Only loop through fizzlers once.
+    if not insts or tag_fizzler_locs:  # Only loop through fizzlers once.
         return
 
     # Determine the origins by first finding the bounding box of the brushes,
@@ -239,7 +240,9 @@ def res_make_tag_fizzler(vmf: VMF, inst: Entity, res: Property):
             LOGGER.warning('Toggle: {}', targetname)
             for ent in vmf.by_target[targetname]:
                 remove_ant_toggle(ent)
-    inst.outputs.clear()  # Remove the outptuts now, they're not valid anyway.
+    # Remove the outputs now, they're not valid anyway. This also removes
+    # the sign from the fizzler's connection count.
+    connections.clear_outputs(inst)
 
     if fizz_base is None:
         # No fizzler - remove this sign
@@ -403,15 +406,8 @@ def res_make_tag_fizzler(vmf: VMF, inst: Entity, res: Property):
 
     if 'base_inst' in res:
         fizz_base['file'] = instanceLocs.resolve_one(res['base_inst'], error=True)
-    fizz_base.outputs.clear()  # Remove outputs, otherwise they break
-    # branch_toggle entities
-
-    # Subtract the sign from the list of connections, but don't go below
-    # zero
-    fizz_base.fixup['$connectioncount'] = str(max(
-        0,
-        srctools.conv_int(fizz_base.fixup['$connectioncount', ''], 0) - 1
-    ))
+    # Remove outputs, otherwise they break branch_toggle entities
+    connections.clear_outputs(fizz_base)
 
     if 'model_inst' in res:
         model_inst = instanceLocs.resolve_one(res['model_inst'], error=True)
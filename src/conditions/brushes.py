@@ -237,9 +237,10 @@ def res_set_texture(inst: Entity, res: Property):
         return
 
     tex = res['tex']
+    seed = vbsp.tex_seed(face_to_mod.get_origin())
 
     if tex.startswith('[') and tex.endswith(']'):
-        face_to_mod.mat = vbsp.get_tex(tex[1:-1])
+        face_to_mod.mat = vbsp.get_tex(tex[1:-1], seed)
     elif tex.startswith('<') and tex.endswith('>'):
         # Special texture names!
         tex = tex[1:-1].casefold()
@@ -279,11 +280,13 @@ def res_set_texture(inst: Entity, res: Property):
             orient = vbsp.get_face_orient(face_to_mod)
             if orient == vbsp.ORIENT.wall:
                 face_to_mod.mat = vbsp.get_tex(
-                    color + '.' + tex[-3:]
+                    color + '.' + tex[-3:],
+                    seed,
                 )
             else:
                 face_to_mod.mat = vbsp.get_tex(
-                    color + '.' + str(orient)
+                    color + '.' + str(orient),
+                    seed,
                 )
     else:
         face_to_mod.mat = tex
@@ -352,7 +355,14 @@ def res_add_brush(inst: Entity, res: Property):
     grid_offset = origin // 128  # type: Vec
 
     # All brushes in each grid have the same textures for each side.
-    random.seed(grid_offset.join(' ') + '-partial_block')
+    if vbsp.LEGACY_TEX_RANDOM:
+        random.seed(grid_offset.join(' ') + '-partial_block')
+        tex_seed = None
+    else:
+        tex_seed = vbsp.hash_seed(
+            vbsp.hash_str('partial_block'),
+            int(grid_offset.x), int(grid_offset.y), int(grid_offset.z),
+        )
 
     solids = vbsp.VMF.make_prism(point1, point2)
     ':type solids: VLib.PrismFace'
@@ -360,12 +370,21 @@ def res_add_brush(inst: Entity, res: Property):
     # Ensure the faces aren't re-textured later
     vbsp.IGNORED_FACES.update(solids.solid.sides)
 
-    solids.north.mat = vbsp.get_tex(tex_type + '.' + y_grid)
-    solids.south.mat = vbsp.get_tex(tex_type + '.' + y_grid)
-    solids.east.mat = vbsp.get_tex(tex_type + '.' + x_grid)
-    solids.west.mat = vbsp.get_tex(tex_type + '.' + x_grid)
-    solids.top.mat = vbsp.get_tex(tex_type + '.floor')
-    solids.bottom.mat = vbsp.get_tex(tex_type + '.ceiling')
+    def face_tex(slot: str, side: int) -> str:
+        """Pick a texture for one side, so each can differ."""
+        if tex_seed is None:
+            return vbsp.get_tex(tex_type + '.' + slot)
+        return vbsp.get_tex(
+            tex_type + '.' + slot,
+            vbsp.hash_seed(tex_seed, side),
+        )
+
+    solids.north.mat = face_tex(y_grid, 0)
+    solids.south.mat = face_tex(y_grid, 1)
+    solids.east.mat = face_tex(x_grid, 2)
+    solids.west.mat = face_tex(x_grid, 3)
+    solids.top.mat = face_tex('floor', 4)
+    solids.bottom.mat = face_tex('ceiling', 5)
 
     if srctools.conv_bool(res['detail', False], False):
         # Add the brush to a func_detail entity
@@ -459,18 +478,18 @@ def res_import_template_setup(res: Property):
 
     # Generate the function which picks which visgroups to add to the map.
     if visgroup_mode == 'none':
-        def visgroup_func(_):
+        def visgroup_func(_, rng):
             """none = don't add any visgroups."""
             return ()
     elif visgroup_mode == 'choose':
-        def visgroup_func(groups):
+        def visgroup_func(groups, rng):
             """choose = add one random group."""
-            return [random.choice(groups)]
+            return [rng.choice(groups)]
     else:
-        def visgroup_func(groups):
+        def visgroup_func(groups, rng):
             """Number = percent chance for each to be added"""
             for group in groups:
-                val = random.uniform(0, 100)
+                val = rng.uniform(0, 100)
                 if val <= visgroup_mode:
                     yield group
 
@@ -561,7 +580,7 @@ def res_import_template(inst: Entity, res: Property):
     temp_id = conditions.resolve_value(inst, orig_temp_id)
 
     if srctools.conv_bool(conditions.resolve_value(inst, visgroup_force_var)):
-        def visgroup_func(group):
+        def visgroup_func(group, rng):
             """Use all the groups."""
             yield from group
 
@@ -614,13 +633,14 @@ def res_import_template(inst: Entity, res: Property):
 
     origin = Vec.from_str(inst['origin'])
     angles = Vec.from_str(inst['angles', '0 0 0'])
+    rng = conditions.inst_rand(inst, None, 'template_visgroup', temp_id)
     temp_data = template_brush.import_template(
         template,
         origin,
         angles,
         targetname=inst['targetname', ''],
         force_type=force_type,
-        visgroup_choose=visgroup_func,
+        visgroup_choose=lambda groups: visgroup_func(groups, rng),
         add_to_map=True,
         additional_visgroups=visgroups,
     )
@@ -682,13 +702,13 @@ def res_hollow_brush(inst: Entity, res: Property):
     multiple items to embed thinly in the same block without affecting each
     other.
     """
-    loc = Vec(0, 0, -64).rotate_by_str(inst['angles'])
-    loc += Vec.from_str(inst['origin'])
-
-    try:
-        group = SOLIDS[loc.as_tuple()]
-    except KeyError:
-        LOGGER.warning('No brush for hollowing at ({})', loc)
+    group = SOLIDS.at_offset(inst, Vec(0, 0, -64))
+    if group is None:
+        LOGGER.warning(
+            'No brush for hollowing at ({})',
+            Vec(0, 0, -64).rotate_by_str(inst['angles']) +
+            Vec.from_str(inst['origin']),
+        )
         return  # No brush here?
 
     conditions.hollow_block(
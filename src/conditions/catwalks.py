@@ -6,6 +6,7 @@ from conditions import (
 import instanceLocs
 from srctools import Vec, Property
 import conditions
+import connections
 import utils
 import vbsp
 
@@ -110,7 +111,8 @@ def res_make_catwalk(res: Property):
         Support_Wall: A support extending from the East wall.
         Support_Ceil: A support extending from the ceiling.
         Support_Floor: A support extending from the floor.
-        Support_Goo: A floor support, designed for goo pits.
+        Support_Goo: A floor support, designed for goo pits. If not set,
+            Support_Floor is used.
         Single_Wall: A section connecting to an East wall.
     """
     LOGGER.info("Starting catwalk generator...")
@@ -132,8 +134,10 @@ def res_make_catwalk(res: Property):
     instances['NONE'] = ''
     if instances['end_wall'] == '':
         instances['end_wall'] = instances['end']
+    if instances['support_goo'] == '':
+        instances['support_goo'] = instances['support_floor']
 
-    connections = {}  # The directions this instance is connected by (NSEW)
+    directions = {}  # The directions this instance is connected by (NSEW)
     markers = {}
 
     # Find all our markers, so we can look them up by targetname.
@@ -141,7 +145,7 @@ def res_make_catwalk(res: Property):
         if inst['file'].casefold() not in marker:
             continue
         #                   [North, South, East,  West ]
-        connections[inst] = [False, False, False, False]
+        directions[inst] = [False, False, False, False]
         markers[inst['targetname']] = inst
 
         # Snap the markers to the grid. If on glass it can become offset...
@@ -160,20 +164,37 @@ def res_make_catwalk(res: Property):
     if not markers:
         return RES_EXHAUSTED
 
-    LOGGER.info('Connections: {}', connections)
+    LOGGER.info('Connections: {}', directions)
     LOGGER.info('Markers: {}', markers)
 
     # First loop through all the markers, adding connecting sections
     for inst in markers.values():
-        for conn in inst.outputs:
-            if conn.output != output_target or conn.input != output_target:
-                # Indicator toggles or similar, delete these entities.
-                # Find the associated overlays too.
-                for del_inst in vbsp.VMF.by_target[conn.target]:
-                    conditions.remove_ant_toggle(del_inst)
+        item = connections.get_item(inst)
+        if item is None:
+            continue
+        # Indicator toggles or similar, delete these entities.
+        # Find the associated overlays too.
+        for indicator in item.ind_panels:
+            conditions.remove_ant_toggle(indicator)
+        if item.ind_toggle is not None:
+            conditions.remove_ant_toggle(item.ind_toggle)
+
+        # Sort so the sections are always added in the same order.
+        for conn in sorted(item.outputs, key=lambda conn: conn.inp.name):
+            if not any(
+                out.output == output_target and out.input == output_target
+                for out in conn.outputs
+            ):
+                continue
+            try:
+                inst2 = markers[conn.inp.name]
+            except KeyError:
+                LOGGER.warning(
+                    'Catwalk "{}" connects to non-catwalk "{}"!',
+                    inst['targetname'],
+                    conn.inp.name,
+                )
                 continue
-
-            inst2 = markers[conn.target]
             LOGGER.debug('{} <-> {}', inst['targetname'], inst2['targetname'])
             origin1 = Vec.from_str(inst['origin'])
             origin2 = Vec.from_str(inst2['origin'])
@@ -201,8 +222,8 @@ def res_make_catwalk(res: Property):
                 place_catwalk_connections(instances, origin1, origin2)
 
             # Update the lists based on the directions that were set
-            conn_lst1 = connections[inst]
-            conn_lst2 = connections[inst2]
+            conn_lst1 = directions[inst]
+            conn_lst2 = directions[inst2]
             if origin1.x < origin2.x:
                 conn_lst1[2] = True  # E
                 conn_lst2[3] = True  # W
@@ -217,9 +238,10 @@ def res_make_catwalk(res: Property):
                 conn_lst1[1] = True  # S
                 conn_lst2[0] = True  # N
 
-        inst.outputs.clear()  # Remove the outputs now, they're useless
+        # Remove the outputs now, they're useless
+        connections.clear_outputs(inst)
 
-    for inst, dir_mask in connections.items():
+    for inst, dir_mask in directions.items():
         # Set the marker instances based on the attached walkways.
         normal = Vec(0, 0, 1).rotate_by_str(inst['angles'])
 
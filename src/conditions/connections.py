@@ -2,6 +2,7 @@
 import srctools
 import utils
 import instance_traits
+import connections
 from conditions import (
     make_flag, make_result, make_result_setup,
     resolve_value, local_name,
@@ -99,7 +100,7 @@ def res_add_output(inst: Entity, res: Property):
         output = resolve_value(inst, out_id)
         inst_out = resolve_value(inst, inst_out)
 
-    inst.add_out(Output(
+    connections.add_output(inst, Output(
         resolve_value(inst, output),
         local_name(inst, resolve_value(inst, targ)),
         resolve_value(inst, input_name),
@@ -4,6 +4,7 @@
 from collections import defaultdict
 
 import conditions
+import connections
 import srctools
 import template_brush
 import utils
@@ -238,10 +239,7 @@ def res_cust_antline(inst: Entity, res: Property):
 
     over_name = '@' + inst['targetname'] + '_indicator'
 
-    for over in (
-            vbsp.VMF.by_class['info_overlay'] &
-            vbsp.VMF.by_target[over_name]
-            ):
+    for over in conditions.OVERLAYS.named(over_name):
         folded_mat = over['material'].casefold()
         if folded_mat == straight_ant:
             vbsp.set_antline_mat(over, *straight_args)
@@ -292,7 +290,7 @@ def res_change_outputs(inst: Entity, res: Property):
         for (orig_name, orig_comm), rep in res.value:
             if output.inst_out == orig_name and output.output == orig_comm:
                 if rep == (None, ''):
-                    inst.outputs.remove(output)
+                    connections.remove_output(inst, output)
                 else:
                     output.inst_out, output.output = rep
 
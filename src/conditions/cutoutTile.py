@@ -1,5 +1,4 @@
 """Generate random quarter tiles, like in Destroyed or Retro maps."""
-import random
 from collections import defaultdict, namedtuple
 
 import conditions
@@ -140,8 +139,11 @@ def res_cutout_tile(res: Property):
         'quad_ceil': res['CeilingSize', '4x4'].casefold() == '2x2',
     }
 
-    random.seed(vbsp.MAP_RAND_SEED + '_CUTOUT_TILE_NOISE')
-    noise = SimplexNoise(period=4 * 40)  # 4 tiles/block, 50 blocks max
+    noise_rand = conditions.rand(
+        vbsp.MAP_RAND_SEED + '_CUTOUT_TILE_NOISE',
+        'cutout_tile_noise',
+    )
+    noise = make_noise(noise_rand, 4 * 40)  # 4 tiles/block, 50 blocks max
 
     # We want to know the number of neighbouring tile cutouts before
     # placing tiles - blocks away from the sides generate fewer tiles.
@@ -157,7 +159,7 @@ def res_cutout_tile(res: Property):
 
         # Since this uses random data for initialisation, the alpha and
         # regular will use slightly different patterns.
-        alpha_noise = SimplexNoise(period=4 * 50)
+        alpha_noise = make_noise(noise_rand, 4 * 50)
     else:
         alpha_noise = None
 
@@ -368,6 +370,18 @@ def res_cutout_tile(res: Property):
     return conditions.RES_EXHAUSTED
 
 
+def make_noise(rng, period: int) -> SimplexNoise:
+    """Make a noise generator, using rng to pick the permutation table.
+
+    This shuffles the same way as SimplexNoise.randomize().
+    """
+    perm = list(range(period))
+    for i in range(period):
+        j = rng.randint(0, period - 1)
+        perm[i], perm[j] = perm[j], perm[i]
+    return SimplexNoise(permutation_table=perm)
+
+
 def get_noise(loc: Vec, noise_func: SimplexNoise):
     """Generate a number between 0 and 1.
 
@@ -398,6 +412,8 @@ def convert_floor(
     except KeyError:
         return False  # No tile here!
 
+    rng = conditions.rand(None, 'cutout_floor', loc)
+
 
     if brush.normal == (0, 0, 1):
         # This is a pillar block - there isn't actually tiles here!
@@ -413,7 +429,7 @@ def convert_floor(
             loc,
             # Switch to use the configured squarebeams texture
             replace_tex={
-                consts.Special.SQUAREBEAMS: random.choice(
+                consts.Special.SQUAREBEAMS: rng.choice(
                     MATS['squarebeams']
                 ),
             }
@@ -427,7 +443,7 @@ def convert_floor(
     # Move the floor brush down and switch to the floorbase texture.
     for plane in brush.face.planes:
         plane.z -= FLOOR_DEPTH
-    brush.face.mat = random.choice(mats['floorbase'])
+    brush.face.mat = rng.choice(mats['floorbase'])
 
     loc.x -= 64
     loc.y -= 64
@@ -448,7 +464,7 @@ def convert_floor(
             rand *= 0.1 + 0.9 * (1 - noise_weight)
 
             should_make_tile = rand < settings['floor_chance']
-            if random.randint(0, 7) == 0:
+            if rng.randint(0, 7) == 0:
                 # Sometimes there'll be random holes/extra tiles
                 should_make_tile = not should_make_tile
 
@@ -457,9 +473,12 @@ def convert_floor(
             tile = make_tile(
                 p1=tile_loc - (16, 16, 0),
                 p2=tile_loc + (16, 16, -2),
-                top_mat=vbsp.get_tex(str(brush.color) + '.floor'),
+                top_mat=vbsp.get_tex(
+                    str(brush.color) + '.floor',
+                    vbsp.tex_seed(tile_loc),
+                ),
                 bottom_mat='tools/toolsnodraw',
-                beam_mat=random.choice(mats['squarebeams']),
+                beam_mat=rng.choice(mats['squarebeams']),
             )
             detail.solids.append(tile.solid)
             ant_locs.append(str(tile.top.id))
@@ -469,9 +488,9 @@ def convert_floor(
             tile = make_tile(
                 p1=tile_loc - (16, 16, 1),
                 p2=tile_loc + (16, 16, -2),
-                top_mat=random.choice(mats['tile_glue']),
+                top_mat=rng.choice(mats['tile_glue']),
                 bottom_mat='tools/toolsnodraw',
-                beam_mat=random.choice(mats['squarebeams']),
+                beam_mat=rng.choice(mats['squarebeams']),
             )
             detail.solids.append(tile.solid)
         else:
@@ -550,14 +569,15 @@ def gen_rotated_squarebeams(p1: Vec, p2: Vec, skin, max_rot: int):
     They will be rotated around their centers, not the model origin.
     """
     z = min(p1.z, p2.z) + 3  # The center of the beams
+    rng = conditions.rand(None, 'cutout_beams', p1, p2)
     for x, y in utils.iter_grid(
             min_x=int(p1.x),
             min_y=int(p1.y),
             max_x=int(p2.x),
             max_y=int(p2.y),
             stride=64):
-        rand_x = random.randint(-max_rot, max_rot) / BEAM_ROT_PRECISION
-        rand_z = random.randint(-max_rot, max_rot) / BEAM_ROT_PRECISION
+        rand_x = rng.randint(-max_rot, max_rot) / BEAM_ROT_PRECISION
+        rand_z = rng.randint(-max_rot, max_rot) / BEAM_ROT_PRECISION
         # Don't rotate around yaw - the vertical axis.
 
         # Squarebeams are offset 5 units from their real center
@@ -692,7 +712,10 @@ def make_alpha_base(bbox_min: Vec, bbox_max: Vec, noise: SimplexNoise):
                 Vec(x + x1, y + y1, z - FLOOR_DEPTH),
                 Vec(x + x2, y + y2, z - FLOOR_DEPTH - 1),
             )
-            brush.top.mat = random.choice(MATS['floorbase_disp'])
+            brush.top.mat = conditions.rand(
+                None,
+                'cutout_base', x + x1, y + y1, z,
+            ).choice(MATS['floorbase_disp'])
             make_displacement(
                 brush.top,
                 offset=-1,
@@ -775,8 +798,10 @@ def add_floor_sides(locs):
             continue
         loc = face.get_origin().as_tuple()
         if loc in added_locations:
-            random.seed('floor_side_{}_{}_{}'.format(*loc))
-            face.mat = random.choice(MATS['squarebeams'])
+            face.mat = conditions.rand(
+                'floor_side_{}_{}_{}'.format(*loc),
+                'floor_side', *map(int, loc)
+            ).choice(MATS['squarebeams'])
             added_locations[loc] = True
             # Swap these to flip the texture diagonally, so the beam is at top
             face.uaxis, face.vaxis = face.vaxis, face.uaxis
@@ -812,8 +837,9 @@ def add_floor_sides(locs):
             wall_loc,
             # Switch to use the configured squarebeams texture
             replace_tex={
-                consts.Special.SQUAREBEAMS: random.choice(
-                    MATS['squarebeams']
-                ),
+                consts.Special.SQUAREBEAMS: conditions.rand(
+                    None,
+                    'floor_side_temp', wall_loc,
+                ).choice(MATS['squarebeams']),
             }
         )
@@ -1,5 +1,4 @@
 """Conditions related to specific kinds of entities."""
-import random
 from collections import defaultdict
 
 import conditions
@@ -98,8 +97,11 @@ def res_insert_overlay(inst: Entity, res: Property):
     )
 
     for over in temp.overlay:  # type: Entity
-        random.seed('TEMP_OVERLAY_' + over['basisorigin'])
-        mat = random.choice(replace.get(
+        rng = conditions.rand(
+            'TEMP_OVERLAY_' + over['basisorigin'],
+            'temp_overlay', over['basisorigin'],
+        )
+        mat = rng.choice(replace.get(
             over['material'],
             (over['material'], ),
         ))
@@ -109,9 +111,11 @@ def res_insert_overlay(inst: Entity, res: Property):
             # Lookup in the style data.
             import vbsp
             LOGGER.info('Tex: {}', vbsp.settings['textures'].keys())
-            mat = vbsp.get_tex(mat[1:-1])
+            mat = vbsp.get_tex(mat[1:-1], vbsp.tex_seed(over['basisorigin']))
         over['material'] = mat
         over['sides'] = str(face_id)
+        # The template indexed it on the template's faces.
+        conditions.index_overlay(over)
 
     # Wipe the brushes from the map.
     if temp.detail is not None:
@@ -12,19 +12,19 @@ from conditions import (
     ALL_INST,
 )
 import instanceLocs
-from srctools import Property, Vec, Entity, Output
+from srctools import Property, Vec, Entity, Output, VMF
 
 COND_MOD_NAME = 'Instances'
 
 
-@make_flag('instance')
-def flag_file_equal(inst: Entity, flag: Property):
+@make_flag('instance', fast_call=True)
+def flag_file_equal(vmf: VMF, inst: Entity, flag: Property):
     """Evaluates True if the instance matches the given file."""
     return inst['file'].casefold() in instanceLocs.resolve(flag.value)
 
 
-@make_flag('instFlag', 'InstPart')
-def flag_file_cont(inst: Entity, flag: Property):
+@make_flag('instFlag', 'InstPart', fast_call=True)
+def flag_file_cont(vmf: VMF, inst: Entity, flag: Property):
     """Evaluates True if the instance contains the given portion."""
     return flag.value in inst['file'].casefold()
 
@@ -57,8 +57,8 @@ INSTVAR_COMP = {
 }
 
 
-@make_flag('instVar')
-def flag_instvar(inst: Entity, flag: Property):
+@make_flag('instVar', fast_call=True)
+def flag_instvar(vmf: VMF, inst: Entity, flag: Property):
     """Checks if the $replace value matches the given value.
 
     The flag value follows the form "$start_enabled == 1", with or without
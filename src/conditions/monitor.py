@@ -3,7 +3,7 @@ import os
 import math
 
 from conditions import (
-    make_result, make_result_setup, meta_cond, RES_EXHAUSTED,
+    make_result, make_result_setup, meta_cond, meta_batch,
     local_name
 )
 import instanceLocs
@@ -191,26 +191,27 @@ def res_camera(inst: Entity, res: Property):
     ALL_CAMERAS.append(Camera(inst, res.value, cam_pos, cam_angles))
 
 
-@meta_cond(priority=-5, only_once=False)
-def mon_remove_bullseyes(inst: Entity):
+@meta_batch(priority=-5, instances='<ITEM_CATAPULT_TARGET>')
+def mon_remove_bullseyes(insts: List[Entity]):
     """Remove bullsyes used for cameras."""
     if not BULLSYE_LOCS:
-        return RES_EXHAUSTED
-
-    if inst['file'].casefold() not in instanceLocs.resolve('<ITEM_CATAPULT_TARGET>'):
         return
 
     LOGGER.info('Bullseye {}', BULLSYE_LOCS)
 
-    origin = Vec(0, 0, -64)
-    origin.localise(Vec.from_str(inst['origin']), Vec.from_str(inst['angles']))
-    origin = origin.as_tuple()
+    for inst in insts:
+        origin = Vec(0, 0, -64)
+        origin.localise(
+            Vec.from_str(inst['origin']),
+            Vec.from_str(inst['angles']),
+        )
+        origin = origin.as_tuple()
 
-    LOGGER.info('Pos: {} -> ', origin, BULLSYE_LOCS[origin])
+        LOGGER.info('Pos: {} -> ', origin, BULLSYE_LOCS[origin])
 
-    if BULLSYE_LOCS[origin]:
-        BULLSYE_LOCS[origin] -= 1
-        inst.remove()
+        if BULLSYE_LOCS[origin]:
+            BULLSYE_LOCS[origin] -= 1
+            inst.remove()
 
 
 #  Note that we happen after voiceline adding!
@@ -83,7 +83,6 @@ def flag_brush_at_loc(inst: Entity, flag: Property):
       Only do this to EmbedFace brushes, since it will remove the other
       sides as well.
     """
-    from conditions import VMF
     pos = Vec.from_str(flag['pos', '0 0 0'])
     pos.z -= 64  # Subtract so origin is the floor-position
     pos = pos.rotate_by_str(inst['angles', '0 0 0'])
@@ -115,9 +114,7 @@ def flag_brush_at_loc(inst: Entity, flag: Property):
     else:
         br_type = str(brush.color)
         if should_remove:
-            VMF.remove_brush(
-                brush.solid,
-            )
+            SOLIDS.remove_brush(brush.solid)
 
     if result_var:
         inst.fixup[result_var] = br_type
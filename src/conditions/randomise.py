@@ -1,6 +1,4 @@
 """Conditions for randomising instances."""
-import random
-
 from srctools import Property, Vec, Entity
 import conditions
 import srctools
@@ -24,13 +22,17 @@ def flag_random(inst: Entity, res: Property):
     # Allow ending with '%' sign
     chance = srctools.conv_int(chance.rstrip('%'), 100)
 
-    random.seed('random_chance_{}:{}_{}_{}'.format(
-        seed,
-        inst['targetname', ''],
-        inst['origin'],
-        inst['angles'],
-    ))
-    return random.randrange(100) < chance
+    rng = conditions.inst_rand(
+        inst,
+        'random_chance_{}:{}_{}_{}'.format(
+            seed,
+            inst['targetname', ''],
+            inst['origin'],
+            inst['angles'],
+        ),
+        'random_chance', seed,
+    )
+    return rng.randrange(100) < chance
 
 
 @make_result_setup('random')
@@ -82,16 +84,20 @@ def res_random(inst: Entity, res: Property):
     # Instead they're replaced by 'dummy' results that don't execute.
     # Otherwise the chances would be messed up.
     seed, chance, weight, results = res.value
-    random.seed('random_case_{}:{}_{}_{}'.format(
-        seed,
-        inst['targetname', ''],
-        inst['origin'],
-        inst['angles'],
-    ))
-    if random.randrange(100) > chance:
+    rng = conditions.inst_rand(
+        inst,
+        'random_case_{}:{}_{}_{}'.format(
+            seed,
+            inst['targetname', ''],
+            inst['origin'],
+            inst['angles'],
+        ),
+        'random_case', seed,
+    )
+    if rng.randrange(100) > chance:
         return
 
-    ind = random.choice(weight)
+    ind = rng.choice(weight)
     choice = results[ind]  # type: Property
     if choice.name == 'group':
         for sub_res in choice.value:
@@ -153,12 +159,13 @@ def res_add_variant(inst: Entity, res: Property):
     if inst['targetname', ''] == '':
         # some instances don't get names, so use the global
         # seed instead for stuff like elevators.
-        random.seed(vbsp.MAP_RAND_SEED + inst['origin'] + inst['angles'])
+        legacy_seed = vbsp.MAP_RAND_SEED + inst['origin'] + inst['angles']
     else:
         # We still need to use angles and origin, since things like
         # fizzlers might not get unique names.
-        random.seed(inst['targetname'] + inst['origin'] + inst['angles'])
-    conditions.add_suffix(inst, "_var" + str(random.choice(res.value) + 1))
+        legacy_seed = inst['targetname'] + inst['origin'] + inst['angles']
+    rng = conditions.inst_rand(inst, legacy_seed, 'variant')
+    conditions.add_suffix(inst, "_var" + str(rng.choice(res.value) + 1))
 
 
 @make_result('RandomNum')
@@ -176,12 +183,15 @@ def res_rand_num(inst: Entity, res: Property):
     var = res['resultvar', '$random']
     seed = res['seed', 'random']
 
-    random.seed(inst['origin'] + inst['angles'] + 'random_' + seed)
+    rng = conditions.rand(
+        inst['origin'] + inst['angles'] + 'random_' + seed,
+        'random_num', inst['origin'], inst['angles'], seed,
+    )
 
     if is_float:
-        func = random.uniform
+        func = rng.uniform
     else:
-        func = random.randint
+        func = rng.randint
 
     inst.fixup[var] = str(func(min_val, max_val))
 
@@ -198,12 +208,15 @@ def res_rand_vec(inst: Entity, res: Property):
     var = res['resultvar', '$random']
     seed = res['seed', 'random']
 
-    random.seed(inst['origin'] + inst['angles'] + 'random_' + seed)
+    rng = conditions.rand(
+        inst['origin'] + inst['angles'] + 'random_' + seed,
+        'random_vec', inst['origin'], inst['angles'], seed,
+    )
 
     if is_float:
-        func = random.uniform
+        func = rng.uniform
     else:
-        func = random.randint
+        func = rng.randint
 
     value = Vec()
 
@@ -247,17 +260,18 @@ def res_rand_inst_shift(inst: Entity, res: Property):
         min_z, max_z,
     ) = res.value
 
-    random.seed(
+    rng = conditions.rand(
         vbsp.MAP_RAND_SEED +
         '_random_shift_' +
         inst['origin'] +
-        inst['angles']
+        inst['angles'],
+        'random_shift', inst['origin'], inst['angles'],
     )
 
     offset = Vec(
-        random.uniform(min_x, max_x),
-        random.uniform(min_y, max_y),
-        random.uniform(min_z, max_z),
+        rng.uniform(min_x, max_x),
+        rng.uniform(min_y, max_y),
+        rng.uniform(min_z, max_z),
     )
 
     offset.rotate_by_str(inst['angles'])
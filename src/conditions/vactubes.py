@@ -2,6 +2,7 @@
 """
 from collections import namedtuple
 
+import connections
 import srctools
 import template_brush
 import utils
@@ -182,14 +183,23 @@ def res_make_vactubes(res: Property):
         except KeyError:
             continue  # Not a marker
 
-        next_instances = {
-            out.target
-            for out in
-            inst.outputs
-        }
+        item = connections.get_item(inst)
+        if item is not None:
+            next_instances = {
+                next_item.name
+                for next_item in
+                item.output_items()
+            }
+            # Remove the indicators, along with their antlines.
+            for indicator in item.ind_panels:
+                remove_ant_toggle(indicator)
+            if item.ind_toggle is not None:
+                remove_ant_toggle(item.ind_toggle)
+        else:
+            next_instances = set()
 
         # Destroy these outputs, they're useless now!
-        inst.outputs.clear()
+        connections.clear_outputs(inst)
 
         # Remove the original instance from the level - we spawn entirely new
         # ones.
@@ -216,9 +226,8 @@ def res_make_vactubes(res: Property):
             try:
                 next_marker = markers[inst]
             except KeyError:
-                # Not a marker-instance, remove this (indicator_toggles, etc)
-                # We want to remove any them as well as the assoicated
-                # antlines!
+                # Not a marker-instance, remove this as well as any
+                # associated antlines!
                 for toggle in vbsp.VMF.by_target[inst]:
                     remove_ant_toggle(toggle)
             else:
@@ -8,7 +8,7 @@ import conditions
 import instance_traits
 import utils
 
-from typing import Iterable, Dict, List, Set, Tuple
+from typing import Iterable, Dict, List, Set, Tuple, Optional
 
 LOGGER = utils.getLogger(__name__)
 
@@ -54,6 +54,9 @@ SIGN_ORDER_LOOKUP = {
 # Targetname -> item
 ITEMS = {}  # type: Dict[str, Item]
 
+# (from item, to item) -> the connection between them.
+_CONN_PAIRS = {}  # type: Dict[Tuple[Item, Item], Connection]
+
 
 class ShapeSignage:
     """Represents a pair of signage shapes."""
@@ -137,6 +140,64 @@ class Item:
         """Set the targetname of the item."""
         self.inst['targetname'] = name
 
+    def connection_to(self, item: 'Item') -> Optional['Connection']:
+        """Return the connection from this item to another, if present."""
+        return _CONN_PAIRS.get((self, item))
+
+    def output_items(self) -> List['Item']:
+        """Return the items this one triggers."""
+        return [conn.inp for conn in self.outputs]
+
+    def add_output(self, out: Output) -> None:
+        """Add an output to the instance.
+
+        If this targets another item, the connection is updated to match.
+        """
+        self.inst.add_out(out)
+        try:
+            targ_item = ITEMS[out.target]
+        except KeyError:
+            return
+        conn = self.connection_to(targ_item)
+        if conn is None:
+            conn = Connection(targ_item, self)
+            conn.add()
+        conn.outputs.append(out)
+        if conn.type is ConnType.DEFAULT:
+            conn.type = _conn_type(targ_item, conn.outputs) or ConnType.DEFAULT
+        _update_conn_count(targ_item)
+
+    def remove_output(self, out: Output) -> None:
+        """Remove an output from the instance.
+
+        If this was the last output to another item, the connection is
+        removed also.
+        """
+        self.inst.outputs.remove(out)
+        try:
+            targ_item = ITEMS[out.target]
+        except KeyError:
+            return
+        conn = self.connection_to(targ_item)
+        if conn is None:
+            return
+        try:
+            conn.outputs.remove(out)
+        except ValueError:
+            pass
+        if conn.outputs:
+            conn.type = _conn_type(targ_item, conn.outputs) or ConnType.DEFAULT
+        else:
+            conn.remove()
+        _update_conn_count(targ_item)
+
+    def clear_outputs(self) -> None:
+        """Remove all the outputs from the instance, and its connections."""
+        self.inst.outputs.clear()
+        for conn in list(self.outputs):
+            conn.remove()
+            _update_conn_count(conn.inp)
+
 
 class Connection:
     """Represents a connection between two items.
@@ -171,11 +232,14 @@ class Connection:
         """Add this to the directories."""
         self.inp.inputs.add(self)
         self.out.outputs.add(self)
+        _CONN_PAIRS[self.out, self.inp] = self
 
     def remove(self):
         """Remove this from the directories."""
         self.inp.inputs.discard(self)
         self.out.outputs.discard(self)
+        if _CONN_PAIRS.get((self.out, self.inp)) is self:
+            del _CONN_PAIRS[self.out, self.inp]
 
     def set_item(self, input=None, output=None):
         """Set the input or output used for this item."""
@@ -187,6 +251,100 @@ class Connection:
         self.add()
 
 
+def _conn_type(to_item: Item, outputs: Iterable[Output]) -> Optional[ConnType]:
+    """Determine the type of a connection from the outputs it uses.
+
+    Funnels are either switched on and off or have their polarity swapped,
+    depending on the input. For those None is returned if no output uses
+    a valid input.
+    """
+    if 'tbeam_emitter' not in to_item.traits:
+        return ConnType.DEFAULT
+
+    tbeam_polarity = {
+        conditions.TBEAM_CONN_ACT,
+        conditions.TBEAM_CONN_DEACT,
+    }
+    tbeam_io = conditions.CONNECTIONS['item_tbeam']
+    tbeam_io = {tbeam_io.in_act, tbeam_io.in_deact}
+
+    for out in outputs:
+        input_tuple = (out.inst_in, out.input)
+        if input_tuple in tbeam_polarity:
+            return ConnType.TBEAM_DIR
+        elif input_tuple in tbeam_io:
+            return ConnType.TBEAM_IO
+    return None
+
+
+def _update_conn_count(item: Item) -> None:
+    """Set the connection count fixups of an item to match its inputs."""
+    if '$connectioncount' in item.inst.fixup:
+        # Don't count the polarity outputs...
+        item.inst.fixup['$connectioncount'] = sum(
+            1 for conn
+            in item.inputs
+            if conn.type is not ConnType.TBEAM_DIR
+        )
+    if '$connectioncount_polarity' in item.inst.fixup:
+        # Only count the polarity outputs...
+        item.inst.fixup['$connectioncount_polarity'] = sum(
+            1 for conn
+            in item.inputs
+            if conn.type is ConnType.TBEAM_DIR
+        )
+
+
+def get_item(inst: Entity) -> Optional[Item]:
+    """Return the item for this instance, if it has one."""
+    item = ITEMS.get(inst['targetname'])
+    if item is not None and item.inst is inst:
+        return item
+    return None
+
+
+def add_output(inst: Entity, out: Output) -> None:
+    """Add an output to an instance, updating connections if it's an item."""
+    item = get_item(inst)
+    if item is not None:
+        item.add_output(out)
+    else:
+        inst.add_out(out)
+
+
+def remove_output(inst: Entity, out: Output) -> None:
+    """Remove an output from an instance, updating connections if needed."""
+    item = get_item(inst)
+    if item is not None:
+        item.remove_output(out)
+    else:
+        inst.outputs.remove(out)
+
+
+def clear_outputs(inst: Entity) -> None:
+    """Remove all outputs from an instance, and any connections they made."""
+    item = get_item(inst)
+    if item is not None:
+        item.clear_outputs()
+    else:
+        inst.outputs.clear()
+
+
+def move_outputs(src: Entity, dest: Entity) -> None:
+    """Move all the outputs from one instance to another.
+
+    If src is an item, dest becomes the item's instance so the connections
+    are kept.
+    """
+    item = get_item(src)
+    dest.outputs.extend(src.outputs)
+    src.outputs.clear()
+    if item is not None:
+        del ITEMS[item.name]
+        item.inst = dest
+        ITEMS[item.name] = item
+
+
 def calc_connections(
     vmf: VMF,
     shape_frame_tex: List[str],
@@ -200,7 +358,6 @@ def calc_connections(
     """
     # First we want to match targetnames to item types.
     toggles = {}  # type: Dict[str, Entity]
-    overlays = defaultdict(set)  # type: Dict[str, Set[Entity]]
     # Accumulate all the signs into groups, so the list should be 2-long:
     # sign_shapes[name, material][0/1]
     sign_shape_overlays = defaultdict(list)  # type: Dict[Tuple[str, str], List[Entity]]
@@ -209,13 +366,6 @@ def calc_connections(
     panel_timer = instanceLocs.resolve_one('[indPanTimer]', error=True)
     panel_check = instanceLocs.resolve_one('[indPanCheck]', error=True)
 
-    tbeam_polarity = {
-        conditions.TBEAM_CONN_ACT,
-        conditions.TBEAM_CONN_DEACT,
-    }
-    tbeam_io = conditions.CONNECTIONS['item_tbeam']
-    tbeam_io = {tbeam_io.in_act, tbeam_io.in_deact}
-
     for inst in vmf.by_class['func_instance']:
         inst_name = inst['targetname']
         if not inst_name:
@@ -230,14 +380,15 @@ def calc_connections(
         else:
             ITEMS[inst_name] = Item(inst)
 
-    for over in vmf.by_class['info_overlay']:
-        name = over['targetname']
-        mat = over['material']
-        if mat in SIGN_ORDER_LOOKUP:
-            sign_shape_overlays[name, mat.casefold()].append(over)
-        else:
-            # Antlines
-            overlays[name].add(over)
+    # This is shared with conditions and the later overlay restyling.
+    overlay_index = conditions.OVERLAYS
+    overlay_index.build(vmf)
+
+    for over in overlay_index.with_mats(*SIGN_ORDER):
+        sign_shape_overlays[
+            over['targetname'],
+            over['material'].casefold(),
+        ].append(over)
 
     # Name -> signs pairs
     sign_shapes = defaultdict(list)  # type: Dict[str, List[ShapeSignage]]
@@ -267,8 +418,12 @@ def calc_connections(
                 continue
 
             if out_name in toggles:
-                inst_toggle = toggles[out_name]
-                item.antlines |= overlays[inst_toggle.fixup['indicator_name']]
+                inst_toggle = item.ind_toggle = toggles[out_name]
+                # Shape signs have had their names removed, so this
+                # is only the antlines.
+                item.antlines.update(overlay_index.named(
+                    inst_toggle.fixup['indicator_name']
+                ))
             elif out_name in panels:
                 pan = panels[out_name]
                 item.ind_panels.add(pan)
@@ -293,26 +448,14 @@ def calc_connections(
             pan.fixup['$is_timer'] = int(item.timer is not None)
 
         for inp_item in input_items:  # type: Item
-            # Default A/B type.
-            conn_type = ConnType.DEFAULT
             in_outputs = inputs[inp_item.name]
-
-            if 'tbeam_emitter' in inp_item.traits:
-                # It's a funnel - we need to figure out if this is polarity,
-                # or normal on/off.
-                for out in in_outputs:  # type: Output
-                    input_tuple = (out.inst_in, out.input)
-                    if input_tuple in tbeam_polarity:
-                        conn_type = ConnType.TBEAM_DIR
-                        break
-                    elif input_tuple in tbeam_io:
-                        conn_type = ConnType.TBEAM_IO
-                        break
-                else:
-                    raise ValueError(
-                        'Excursion Funnel "{}" has inputs, '
-                        'but no valid types!'.format(inp_item.name)
-                    )
+            # For funnels, this is either polarity or normal on/off.
+            conn_type = _conn_type(inp_item, in_outputs)
+            if conn_type is None:
+                raise ValueError(
+                    'Excursion Funnel "{}" has inputs, '
+                    'but no valid types!'.format(inp_item.name)
+                )
 
             conn = Connection(
                 inp_item,
@@ -325,20 +468,7 @@ def calc_connections(
     for item in ITEMS.values():
         # Copying items can fail to update the connection counts.
         # Make sure they're correct.
-        if '$connectioncount' in item.inst.fixup:
-            # Don't count the polarity outputs...
-            item.inst.fixup['$connectioncount'] = sum(
-                1 for conn
-                in item.inputs
-                if conn.type is not ConnType.TBEAM_DIR
-            )
-        if '$connectioncount_polarity' in item.inst.fixup:
-            # Only count the polarity outputs...
-            item.inst.fixup['$connectioncount_polarity'] = sum(
-                1 for conn
-                in item.inputs
-                if conn.type is ConnType.TBEAM_DIR
-            )
+        _update_conn_count(item)
 
     # Make signage frames
     shape_frame_tex = [mat for mat in shape_frame_tex if mat]
@@ -358,3 +488,4 @@ def calc_connections(
                     vmf.add_ent(frame)
                     frame['material'] = frame_mat
                     frame['renderorder'] = 1 # On top
+                    conditions.index_overlay(frame)
@@ -24,6 +24,7 @@ from srctools import (
     FileSystemChain,
 )
 import backup
+import compile_server
 import loadScreen
 import packageLoader
 import utils
@@ -613,9 +614,15 @@ class Game:
         with open(self.abs_path('bin/bee2/vbsp_config.cfg'), 'w', encoding='utf8') as vbsp_file:
             for line in vbsp_config.export():
                 vbsp_file.write(line)
+        # The instances may have changed, so cached compiles can't be used.
+        shutil.rmtree(self.abs_path('bin/bee2/compile_cache/'), ignore_errors=True)
         export_screen.step('EXP')
 
         if num_compiler_files > 0:
+            # The compile server has the old compiler open, and would
+            # prevent us from replacing it.
+            compile_server.shutdown(self.abs_path('bin/'))
+
             LOGGER.info('Copying Custom Compiler!')
             for file in os.listdir('../compiler'):
                 src_path = os.path.join('../compiler', file)
@@ -5,13 +5,17 @@ it could get deleted, which will make the rendered image vanish.
 """
 
 from PIL import ImageTk, Image, ImageDraw, ImageFont
+from concurrent.futures import ThreadPoolExecutor, Future
+import threading
+import hashlib
+import io
 import os.path
 
 from srctools import Vec
 from srctools.filesys import FileSystem, RawFileSystem, FileSystemChain
 import utils
 
-from typing import Iterable, Union, Dict, Tuple
+from typing import Iterable, Union, Dict, Tuple, List, Optional
 
 LOGGER = utils.getLogger('img')
 
@@ -22,16 +26,46 @@ cached_squares = {}  # type: Dict[Union[Tuple[float, float, float, int], Tuple[s
 # Colour of the palette item background
 PETI_ITEM_BG = Vec(229, 232, 233)
 
+# Resized images are decoded on this pool, then pasted into the PhotoImage
+# on the Tk thread by apply_pending().
+_decode_pool = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1),
+    thread_name_prefix='img_decode',
+)
+# The filesystem chain (and the zipfiles inside it) isn't threadsafe,
+# so only one thread reads the raw data at a time.
+_fsys_lock = threading.Lock()
+# (path, width, height, algo) -> decode job, for images requested by preload().
+_decode_jobs = {}  # type: Dict[Tuple[str, int, int, int], Future]
+# Placeholder images which need to have the real image pasted in.
+_pending = []  # type: List[Tuple[Future, ImageTk.PhotoImage]]
+
+# Resized images are saved here as raw RGBA data, so they don't need to be
+# decoded and resized on the next launch.
+THUMB_CACHE_DIR = os.path.join('..', 'cache', 'thumbnails')
+# When the cache is larger than this, the least recently used are deleted.
+THUMB_CACHE_SIZE = 64 * 1024 * 1024
+
+_inbuilt_sys = RawFileSystem(os.path.join(os.getcwd(), '../', 'images'))
+
 filesystem = FileSystemChain(
     # Highest priority is the in-built UI images.
-    RawFileSystem(os.path.join(os.getcwd(), '../', 'images')),
+    _inbuilt_sys,
 )
 
+# Filesystem -> (package ID, prefix), for the thumbnail cache keys.
+_sys_info = {
+    _inbuilt_sys: ('<inbuilt>', ''),
+}  # type: Dict[FileSystem, Tuple[str, str]]
 
-def load_filesystems(systems: Iterable[FileSystem]):
+
+def load_filesystems(systems: Dict[str, FileSystem]):
     """Load in the filesystems used in packages."""
-    for sys in systems:
+    for pak_id, sys in systems.items():
         filesystem.add_sys(sys, 'resources/BEE2/')
+        _sys_info[sys] = pak_id, 'resources/BEE2/'
+    # Trim the thumbnail cache while we load everything else.
+    _decode_pool.submit(prune_thumb_cache)
 
 
 def tuple_size(size: Union[Tuple[int, int], int]) -> Tuple[int, int]:
@@ -41,6 +75,191 @@ def tuple_size(size: Union[Tuple[int, int], int]) -> Tuple[int, int]:
     return size, size
 
 
+def _norm_path(path: str) -> str:
+    """Add the .png suffix and normalise slashes."""
+    if not path.casefold().endswith(".png"):
+        path += ".png"
+    return path.casefold().replace('\\', '/')
+
+
+def _thumb_filename(path: str, size: Tuple[int, int], algo: int) -> Optional[str]:
+    """Compute the location of this image in the thumbnail cache.
+
+    The name is a hash of the package, the source path, the source's
+    modification time and size, and the resize parameters. This must be
+    called with the filesystem lock held. None is returned if the source
+    can't be identified.
+    """
+    file = filesystem[path]
+    sys = filesystem.get_system(file)
+    try:
+        pak_id, prefix = _sys_info[sys]
+    except KeyError:
+        return None
+    try:
+        if isinstance(sys, RawFileSystem):
+            stat = os.stat(os.path.join(sys.path, prefix + path))
+        else:
+            # Zips and VPKs - use the package file itself.
+            stat = os.stat(sys.path)
+    except OSError:
+        return None
+    key = '{}|{}|{}|{}|{}|{}|{}'.format(
+        pak_id, path,
+        stat.st_mtime_ns, stat.st_size,
+        size[0], size[1], algo,
+    )
+    return os.path.join(
+        THUMB_CACHE_DIR,
+        hashlib.sha1(key.encode('utf8')).hexdigest() + '.rgba',
+    )
+
+
+def _read_thumb(filename: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+    """Read a resized image from the thumbnail cache, if present."""
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) != size[0] * size[1] * 4:
+        # Truncated somehow.
+        return None
+    try:
+        # Mark it as recently used.
+        os.utime(filename)
+    except OSError:
+        pass
+    return Image.frombytes('RGBA', size, data)
+
+
+def _write_thumb(filename: str, image: Image.Image) -> None:
+    """Save a resized image to the thumbnail cache."""
+    temp_name = '{}.{}.tmp'.format(filename, threading.get_ident())
+    try:
+        os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+        with open(temp_name, 'wb') as f:
+            f.write(image.tobytes())
+        os.replace(temp_name, filename)
+    except OSError:
+        LOGGER.warning('Could not write thumbnail "{}"!', filename)
+
+
+def prune_thumb_cache() -> None:
+    """Delete the least recently used thumbnails, if the cache is too large."""
+    try:
+        entries = [
+            entry for entry in
+            os.scandir(THUMB_CACHE_DIR)
+            if entry.is_file()
+        ]
+    except FileNotFoundError:
+        return
+    total = 0
+    stats = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        total += stat.st_size
+        stats.append((stat.st_mtime, stat.st_size, entry.path))
+    if total <= THUMB_CACHE_SIZE:
+        return
+    stats.sort()
+    for mtime, size, filename in stats:
+        try:
+            os.remove(filename)
+        except OSError:
+            continue
+        total -= size
+        if total <= THUMB_CACHE_SIZE:
+            break
+
+
+def _decode(path: str, size: Tuple[int, int], algo: int) -> Image.Image:
+    """Read, decode and resize an image. This runs on the decode pool.
+
+    Resized images are looked up in the thumbnail cache first.
+    """
+    thumb_name = None
+    if size != (0, 0):
+        with _fsys_lock, filesystem:
+            thumb_name = _thumb_filename(path, size, algo)
+        if thumb_name is not None:
+            image = _read_thumb(thumb_name, size)
+            if image is not None:
+                return image
+
+    with _fsys_lock, filesystem:
+        with filesystem[path].open_bin() as file:
+            data = file.read()
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if size != (0, 0):
+        image = image.resize(size, algo)
+    image = image.convert('RGBA')
+    if thumb_name is not None:
+        _write_thumb(thumb_name, image)
+    return image
+
+
+def _start_decode(path: str, size: Tuple[int, int], algo: int) -> Future:
+    """Get the decode job for this image, starting it if required."""
+    key = path, size[0], size[1], algo
+    try:
+        return _decode_jobs.pop(key)
+    except KeyError:
+        return _decode_pool.submit(_decode, path, size, algo)
+
+
+def _exists(path: str) -> bool:
+    """Check if the given image is present in the filesystem."""
+    with _fsys_lock, filesystem:
+        try:
+            filesystem[path]
+        except KeyError:
+            return False
+        return True
+
+
+def preload(path: str, resize_to=0, algo=Image.NEAREST) -> None:
+    """Begin decoding an image in the background.
+
+    The image can then be fetched with png() using the same arguments.
+    This is used during package loading, so decoding starts before the
+    UI needs the image.
+    """
+    path = _norm_path(path)
+    resize_to = tuple_size(resize_to)
+    if resize_to == (0, 0) or (path, *resize_to) in cached_img:
+        return
+    key = path, resize_to[0], resize_to[1], algo
+    if key not in _decode_jobs:
+        _decode_jobs[key] = _decode_pool.submit(_decode, path, resize_to, algo)
+
+
+def apply_pending() -> bool:
+    """Paste finished background images into their placeholders.
+
+    This must be called on the Tk thread. It returns True if some
+    images are still being decoded.
+    """
+    global _pending
+    still_pending = []
+    for future, tk_img in _pending:
+        if not future.done():
+            still_pending.append((future, tk_img))
+            continue
+        try:
+            tk_img.paste(future.result())
+        except Exception:
+            # Leave the placeholder there.
+            LOGGER.exception('Could not decode image!')
+    _pending = still_pending
+    return bool(_pending)
+
+
 def png(path: str, resize_to=0, error=None, algo=Image.NEAREST):
     """Loads in an image for use in TKinter.
 
@@ -48,14 +267,12 @@ def png(path: str, resize_to=0, error=None, algo=Image.NEAREST):
     - Images will be loaded from both the inbuilt files and the extracted
     zip cache.
     - If resize_to is set, the image will be resized to that size using the algo
-    algorithm.
+    algorithm. This is done in a background thread - a placeholder is
+    returned, which is filled in when apply_pending() is called.
     - This caches images, so it won't be deleted (Tk doesn't keep a reference
       to the Python object), and subsequent calls don't touch the hard disk.
     """
-    if not path.casefold().endswith(".png"):
-        path += ".png"
-    path = path.casefold().replace('\\', '/')
-    orig_path = path
+    path = orig_path = _norm_path(path)
 
     resize_width, resize_height = resize_to = tuple_size(resize_to)
 
@@ -64,7 +281,23 @@ def png(path: str, resize_to=0, error=None, algo=Image.NEAREST):
     except KeyError:
         pass
 
-    with filesystem:
+    if resize_to != (0, 0):
+        # We know the size, so we can decode in the background.
+        if not _exists(path):
+            _decode_jobs.pop((path, resize_width, resize_height, algo), None)
+            LOGGER.warning('ERROR: "images/{}" does not exist!', orig_path)
+            return error or img_error
+        tk_img = ImageTk.PhotoImage('RGBA', resize_to)
+        tk_img.paste(Image.new(
+            mode='RGBA',
+            size=resize_to,
+            color=(int(PETI_ITEM_BG.x), int(PETI_ITEM_BG.y), int(PETI_ITEM_BG.z), 255),
+        ))
+        _pending.append((_start_decode(path, resize_to, algo), tk_img))
+        cached_img[orig_path, resize_width, resize_height] = tk_img
+        return tk_img
+
+    with _fsys_lock, filesystem:
         try:
             img_file = filesystem[path]
         except KeyError:
@@ -74,9 +307,6 @@ def png(path: str, resize_to=0, error=None, algo=Image.NEAREST):
             image = Image.open(file)
             image.load()
 
-    if resize_to != (0, 0):
-        image = image.resize(resize_to, algo)
-
     tk_img = ImageTk.PhotoImage(image=image)
 
     cached_img[orig_path, resize_width, resize_height] = tk_img
@@ -95,6 +325,11 @@ def icon(name, error=None):
     return png(os.path.join("items", name), error=error, resize_to=64)
 
 
+def preload_icon(name):
+    """Start decoding a palette icon in the background."""
+    preload(os.path.join("items", name), resize_to=64)
+
+
 def get_app_icon():
     """On non-Windows, retrieve the application icon."""
     with open('../bee2.ico', 'rb') as f:
@@ -26,7 +26,7 @@ import sound
 import utils
 import tk_tools
 
-from typing import Callable, Union
+from typing import Callable, Union, List, Set
 
 LOGGER = utils.getLogger(__name__)
 
@@ -246,7 +246,10 @@ class Item:
     - group: Items with the same group name will be shown together.
     - attrs: a dictionary containing the attribute values for this item.
 
-    - button, win: Set later, the button and window TK objects for this item
+    - button, win: Set later, the button and window TK objects for this item.
+      The button is only present while the item is scrolled into view.
+    - win_x, win_y: The position of the item on the palette, or None if
+      its group is collapsed.
     """
     __slots__ = [
         'name',
@@ -332,14 +335,14 @@ class Item:
         )
 
     def set_pos(self, x=None, y=None):
-        """Place the item on the palette."""
+        """Set the position of the item on the palette.
+
+        The button is placed later by selWin.place_visible(), if the
+        position is scrolled into view.
+        """
         if x is None or y is None:
-            # Remove from the window.
-            self.button.place_forget()
             self.win_x = self.win_y = None
         else:
-            self.button.place(x=x, y=y)
-            self.button.lift()  # Force a particular stacking order for widgets
             self.win_x = x
             self.win_y = y
 
@@ -499,6 +502,14 @@ class selWin:
         # The maximum number of items that fits per row (set in flow_items)
         self.item_width = 1
 
+        # Buttons are only created for items which are scrolled into view.
+        # When scrolled out, they are returned here to be reused.
+        self.button_pool = []  # type: List[ttk.Button]
+        # The items which currently have a button.
+        self.shown_items = set()  # type: Set[Item]
+        # The total height of the palette, set in flow_items().
+        self.pal_height = 0
+
         if desc:
             self.desc_label = ttk.Label(
                 self.win,
@@ -541,7 +552,7 @@ class selWin:
             command=self.wid_canvas.yview,
         )
         self.wid_scroll.grid(row=0, column=1, sticky="NS")
-        self.wid_canvas['yscrollcommand'] = self.wid_scroll.set
+        self.wid_canvas['yscrollcommand'] = self.scroll_changed
 
         utils.add_mousewheel(self.wid_canvas, self.win)
 
@@ -715,18 +726,7 @@ class selWin:
 
         for ind, item in enumerate(self.item_list):  # type: int, Item
             if item == self.noneItem:
-                item.button = ttk.Button(
-                    self.pal_frame,
-                    image=item.icon,
-                )
                 item.context_lbl = '<None>'
-            else:
-                item.button = ttk.Button(
-                    self.pal_frame,
-                    text=item.shortName,
-                    image=item.icon,
-                    compound='top',
-                )
 
             group_key = item.group.casefold()
             self.grouped_items[group_key].append(item)
@@ -755,19 +755,6 @@ class selWin:
 
             item.win = self.win
 
-            @utils.bind_leftclick(item.button)
-            def click_item(event=None, *, _item=item):
-                """Handle clicking on the item.
-
-                If it's already selected, save and close the window.
-                """
-                # We need to capture the item in a default, since it's
-                # the same variable in different iterations
-                if _item is self.selected:
-                    self.save()
-                else:
-                    self.sel_item(_item)
-
         # Convert to a normal dictionary, after adding all items.
         self.grouped_items = dict(self.grouped_items)
 
@@ -1013,6 +1000,94 @@ class selWin:
                     return True
             return False
 
+    def scroll_changed(self, first, last):
+        """Called when the palette is scrolled or resized.
+
+        This updates the scrollbar, then shows the newly visible items.
+        """
+        self.wid_scroll.set(first, last)
+        self.place_visible()
+
+    def click_button(self, button: ttk.Button, event=None):
+        """Handle clicking on an item's button.
+
+        If it's already selected, save and close the window.
+        """
+        item = button.item  # type: Item
+        if item is self.selected:
+            self.save()
+        else:
+            self.sel_item(item)
+
+    def _show_item(self, item: Item):
+        """Give an item a button, taking one from the pool if possible."""
+        try:
+            button = self.button_pool.pop()
+        except IndexError:
+            button = ttk.Button(self.pal_frame)
+            utils.bind_leftclick(
+                button,
+                functools.partial(self.click_button, button),
+            )
+        if item == self.noneItem:
+            button.configure(text='', image=item.icon, compound='image')
+        else:
+            button.configure(
+                text=item.shortName,
+                image=item.icon,
+                compound='top',
+            )
+        button.state(('alternate',) if item is self.selected else ('!alternate',))
+        button.item = item
+        item.button = button
+        self.shown_items.add(item)
+
+    def _hide_item(self, item: Item):
+        """Remove an item's button, returning it to the pool."""
+        button = item.button
+        button.place_forget()
+        button.item = None
+        item.button = None
+        self.button_pool.append(button)
+        self.shown_items.discard(item)
+
+    def place_visible(self):
+        """Place buttons for the items which are scrolled into view.
+
+        Items which are no longer visible have their buttons recycled.
+        """
+        if not self.pal_height:
+            return
+        first, last = self.wid_canvas.yview()
+        # Include an extra row on each side, so scrolling is smoother.
+        top = first * self.pal_height - ITEM_HEIGHT
+        bottom = last * self.pal_height + ITEM_HEIGHT
+
+        visible = [
+            item for item in self.item_list
+            if item.win_y is not None and top <= item.win_y <= bottom
+        ]
+
+        for item in self.shown_items.difference(visible):
+            self._hide_item(item)
+
+        for item in visible:
+            if item.button is None:
+                self._show_item(item)
+            item.button.place(x=item.win_x, y=item.win_y)
+            item.button.lift()  # Force a particular stacking order for widgets
+
+        if self.suggested is not None and self.suggested.button is not None:
+            self.sugg_lbl.place(
+                x=self.suggested.win_x,
+                y=self.suggested.win_y - 20,
+            )
+            self.sugg_lbl['width'] = self.suggested.button.winfo_reqwidth()
+            self.suggested.button.lift()
+        else:
+            # Hide suggestion indicator if the item's not visible.
+            self.sugg_lbl.place_forget()
+
     def sel_item(self, item: Item, event=None):
 
         self.prop_name['text'] = item.longName
@@ -1035,9 +1110,11 @@ class selWin:
 
         self.prop_desc.set_text(item.desc)
 
-        self.selected.button.state(('!alternate',))
+        if self.selected.button is not None:
+            self.selected.button.state(('!alternate',))
         self.selected = item
-        item.button.state(('alternate',))
+        if item.button is not None:
+            item.button.state(('alternate',))
         self.scroll_to(item)
 
         if self.sampler:
@@ -1228,7 +1305,8 @@ class selWin:
     def flow_items(self, e=None):
         """Reposition all the items to fit in the current geometry.
 
-        Called on the <Configure> event.
+        Called on the <Configure> event. This only calculates the positions,
+        place_visible() then creates the buttons for items in view.
         """
         self.pal_frame.update_idletasks()
         self.pal_frame['width'] = self.wid_canvas.winfo_width()
@@ -1244,9 +1322,6 @@ class selWin:
         # The offset for the current group
         y_off = 0
 
-        # Hide suggestion indicator if the item's not visible.
-        self.sugg_lbl.place_forget()
-
         for group_key in self.group_order:
             items = self.grouped_items[group_key]
             group_wid = self.group_widgets[group_key]  # type: GroupHeader
@@ -1255,7 +1330,7 @@ class selWin:
                 y=y_off,
                 width=width * ITEM_WIDTH,
             )
-            group_wid.update_idletasks()
+            # The update_idletasks() call above calculated this.
             y_off += group_wid.winfo_reqheight()
 
             if not group_wid.visible:
@@ -1266,12 +1341,6 @@ class selWin:
 
             # Place each item
             for i, item in enumerate(items):  # type: int, Item
-                if item == self.suggested:
-                    self.sugg_lbl.place(
-                        x=(i % width) * ITEM_WIDTH + 1,
-                        y=(i // width) * ITEM_HEIGHT + y_off,
-                    )
-                    self.sugg_lbl['width'] = item.button.winfo_width()
                 item.set_pos(
                     x=(i % width) * ITEM_WIDTH + 1,
                     y=(i // width) * ITEM_HEIGHT + y_off + 20,
@@ -1286,7 +1355,8 @@ class selWin:
             width * ITEM_WIDTH,
             y_off,
         )
-        self.pal_frame['height'] = y_off
+        self.pal_frame['height'] = self.pal_height = y_off
+        self.place_visible()
 
     def scroll_to(self, item: Item):
         """Scroll to an item so it's visible."""
@@ -1300,7 +1370,9 @@ class selWin:
         bottom *= height
         top *= height
 
-        y = item.button.winfo_y()
+        if item.win_y is None:
+            return  # In a collapsed group.
+        y = item.win_y
 
         if bottom <= y - 8 and y + ICON_SIZE + 8 <= top:
             return  # Already in view
@@ -7,6 +7,7 @@ from functools import partial
 from operator import itemgetter
 from collections import defaultdict
 from enum import Enum
+import operator
 import string
 
 import sound as snd
@@ -16,15 +17,15 @@ import UI
 import utils
 import tk_tools
 
-from typing import Dict, List
+from typing import Dict, List, Tuple, Optional
 
 is_expanded = False
 wid = {}
 
 TAG_MODE = tk.StringVar(value='ALL')  # The combining mode for the vars
 TAG_MODES = {
-    'ALL': all,
-    'ANY': any,
+    'ALL': operator.and_,
+    'ANY': operator.or_,
 }
 
 # A list of all tags, mapped to their current state.
@@ -32,6 +33,18 @@ TAGS = {}  # type: Dict[str, bool]
 # A 'pretty' name for a tag, if it exists
 PRETTY_TAG = {}  # type: Dict[str, str]
 
+# For each tag, a bitset of the UI.pal_items indexes which have it.
+TAG_INDEX = {}  # type: Dict[Tuple[Section, str], int]
+# Bitset of the items which are hidden until 'UnlockDefault' is enabled.
+_locked_items = 0
+# Bitset of all the items.
+_all_items = 0
+# Set when an item's tags or UI.pal_items change, so the index needs to be
+# rebuilt.
+_index_dirty = True
+# The bitset last applied to the items.
+_visible_items = None  # type: Optional[int]
+
 
 TAG_REP_TRANSLATE = str.maketrans(
     # uppercase -> lowercase, remove whitespace
@@ -60,11 +73,46 @@ class Section(Enum):
 Section.index = [Section[key] for key in Section.__members__.keys()].index
 
 
+def invalidate_index():
+    """Mark the tag index as out of date.
+
+    This must be called whenever an item's filter tags or the picker
+    items change.
+    """
+    global _index_dirty
+    _index_dirty = True
+
+
+def build_index():
+    """Build the bitsets of which picker items have each tag."""
+    global _index_dirty, _locked_items, _all_items, _visible_items
+    TAG_INDEX.clear()
+    for tag in TAGS:
+        TAG_INDEX[tag] = 0
+
+    _locked_items = 0
+    for ind, item in enumerate(UI.pal_items):
+        bit = 1 << ind
+        if item.needs_unlock:
+            _locked_items |= bit
+        for tag in item.item.filter_tags:
+            TAG_INDEX[tag] = TAG_INDEX.get(tag, 0) | bit
+
+    _all_items = (1 << len(UI.pal_items)) - 1
+    _index_dirty = False
+    # Force the next filter to update everything.
+    _visible_items = None
+
+
 def filter_items():
     """Update items based on selected tags."""
+    global _visible_items
+    if _index_dirty:
+        build_index()
+
     style_unlocked = StyleVarPane.tk_vars['UnlockDefault'].get() == 1
 
-    # any() or all()
+    # and_ or or_
     func = TAG_MODES[TAG_MODE.get()]
 
     sel_tags = [
@@ -73,22 +121,35 @@ def filter_items():
         in TAGS.items()
         if enabled
     ]
-    no_tags = len(sel_tags) == 0
-
-    for item in UI.pal_items:
-        if item.needs_unlock and not style_unlocked:
-            item.visible = False
-            continue
-
-        if no_tags:
-            item.visible = True
-        else:
-            item_tags = item.item.filter_tags
-            item.visible = func(
-                tag in item_tags
-                for tag in
-                sel_tags
-            )
+
+    if sel_tags:
+        visible = TAG_INDEX.get(sel_tags[0], 0)
+        for tag in sel_tags[1:]:
+            visible = func(visible, TAG_INDEX.get(tag, 0))
+    else:
+        visible = _all_items
+
+    if not style_unlocked:
+        visible &= ~_locked_items
+
+    if visible == _visible_items:
+        return  # Nothing changed.
+
+    if _visible_items is None:
+        changed = _all_items
+    else:
+        changed = visible ^ _visible_items
+    _visible_items = visible
+
+    # Convert to strings once, so finding each changed item is cheap.
+    # These are reversed, so index 0 is the lowest bit.
+    bit_format = '0{}b'.format(len(UI.pal_items))
+    changed_bits = format(changed, bit_format)[::-1]
+    visible_bits = format(visible, bit_format)[::-1]
+    ind = changed_bits.find('1')
+    while ind != -1:
+        UI.pal_items[ind].visible = visible_bits[ind] == '1'
+        ind = changed_bits.find('1', ind + 1)
     UI.flow_picker()
 
 # When exiting settings, we need to hide/show WIP items.
@@ -149,6 +210,7 @@ def add_tag(section: Section, tag: str, pretty: str=None):
     TAGS[key] = False
     TAG_BY_SECTION[section].append(tag)
     PRETTY_TAG[key] = pretty
+    return key
 
 
 def init(frm):
@@ -1,5 +1,6 @@
 """Templates are sets of brushes which can be copied into the map."""
 import random
+from array import array
 from collections import defaultdict
 from collections.abc import Mapping
 from enum import Enum
@@ -12,7 +13,7 @@ import comp_consts as consts
 import utils
 
 from typing import (
-    Iterable, Union, Callable,
+    Iterable, Iterator, Union, Callable,
     NamedTuple, Tuple,
     Dict, List, Set,
 )
@@ -137,13 +138,177 @@ REALIGN_UVS = {
 del realign_solid
 
 
+class FaceStore:
+    """Compact storage for the faces of template brushes.
+
+    Each face is a row in several arrays, with materials stored as an index
+    into a shared list. This is much smaller than the Side objects, which
+    are only made when a brush is copied into the map.
+    """
+    # The number of values in each row of planes and uvs.
+    PLANE_SIZE = 9
+    UV_SIZE = 10
+
+    def __init__(self) -> None:
+        self.mat_names = []  # type: List[str]
+        self._mat_inds = {}  # type: Dict[str, int]
+        self.ids = array('l')
+        self.mats = array('L')
+        # The three points of each plane, then the U and V axes as
+        # x, y, z, offset, scale.
+        self.planes = array('d')
+        self.uvs = array('d')
+        self.rotations = array('d')
+        self.lightmaps = array('l')
+        self.smoothing = array('l')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, side: Side) -> int:
+        """Store a face, and return its index."""
+        try:
+            mat_ind = self._mat_inds[side.mat]
+        except KeyError:
+            mat_ind = self._mat_inds[side.mat] = len(self.mat_names)
+            self.mat_names.append(side.mat)
+
+        self.ids.append(side.id)
+        self.mats.append(mat_ind)
+        for point in side.planes:
+            self.planes.extend((point.x, point.y, point.z))
+        for axis in (side.uaxis, side.vaxis):
+            self.uvs.extend((axis.x, axis.y, axis.z, axis.offset, axis.scale))
+        self.rotations.append(side.ham_rot)
+        self.lightmaps.append(side.lightmap)
+        self.smoothing.append(side.smooth)
+        return len(self.ids) - 1
+
+    def side(self, ind: int, vmf: VMF, des_id: int=-1) -> Side:
+        """Make a Side object from the stored face."""
+        planes = self.planes[ind * self.PLANE_SIZE:(ind + 1) * self.PLANE_SIZE]
+        ux, uy, uz, u_off, u_scale, vx, vy, vz, v_off, v_scale = self.uvs[
+            ind * self.UV_SIZE:(ind + 1) * self.UV_SIZE
+        ]
+        return Side(
+            vmf,
+            planes=[planes[0:3], planes[3:6], planes[6:9]],
+            des_id=des_id,
+            mat=self.mat_names[self.mats[ind]],
+            rotation=self.rotations[ind],
+            uaxis=UVAxis(ux, uy, uz, u_off, u_scale),
+            vaxis=UVAxis(vx, vy, vz, v_off, v_scale),
+            smoothing=self.smoothing[ind],
+            lightmap=self.lightmaps[ind],
+        )
+
+
+class CompactSolid:
+    """A template brush, with its faces kept in a FaceStore.
+
+    copy() makes a normal Solid, like Solid.copy() does. Displacements
+    can't be stored, so those brushes are left as Solids.
+    """
+    __slots__ = [
+        'map',
+        'id',
+        'store',
+        'faces',
+        'visgroup_ids',
+        'hidden',
+        'group_id',
+        'vis_shown',
+        'vis_auto_shown',
+        'cordon_solid',
+        'editor_color',
+    ]
+
+    def __init__(self, solid: Solid, store: FaceStore) -> None:
+        self.map = solid.map
+        self.id = solid.id
+        self.store = store
+        first = len(store)
+        for side in solid.sides:
+            store.add(side)
+        self.faces = range(first, len(store))
+        self.visgroup_ids = solid.visgroup_ids
+        self.hidden = solid.hidden
+        self.group_id = solid.group_id
+        self.vis_shown = solid.vis_shown
+        self.vis_auto_shown = solid.vis_auto_shown
+        self.cordon_solid = solid.cordon_solid
+        self.editor_color = solid.editor_color
+
+    @classmethod
+    def compact(
+        cls,
+        solids: Iterable[Solid],
+        store: FaceStore,
+    ) -> List[Union['CompactSolid', Solid]]:
+        """Move the faces of these brushes into the store, if possible."""
+        return [
+            solid
+            if any(side.is_disp for side in solid.sides) else
+            cls(solid, store)
+            for solid in solids
+        ]
+
+    @property
+    def sides(self) -> List[Side]:
+        """Make Side objects for each face.
+
+        These are new objects each time, so changing them does nothing.
+        """
+        return [
+            self.store.side(ind, self.map, self.store.ids[ind])
+            for ind in self.faces
+        ]
+
+    def __iter__(self) -> Iterator[Side]:
+        return iter(self.sides)
+
+    def copy(
+        self,
+        des_id=-1,
+        map: VMF=None,
+        side_mapping: Dict[int, int]=srctools.EmptyMapping,
+        keep_vis=True,
+    ) -> Solid:
+        """Make a Solid with the same data, like Solid.copy()."""
+        store = self.store
+        sides = []
+        for ind in self.faces:
+            old_id = store.ids[ind]
+            side = store.side(
+                ind,
+                map or self.map,
+                # Side.copy() keeps the ID when moving to another map.
+                old_id if map is not None else -1,
+            )
+            side_mapping[old_id] = side.id
+            sides.append(side)
+
+        return Solid(
+            map or self.map,
+            des_id,
+            sides,
+            self.visgroup_ids if keep_vis else (),
+            self.hidden if keep_vis else False,
+            self.group_id,
+            self.vis_shown if keep_vis else True,
+            self.vis_auto_shown if keep_vis else True,
+            self.cordon_solid,
+            self.editor_color,
+        )
+
+
 class Template:
     """Represents a template before it's imported into a map."""
     def __init__(
         self,
         temp_id,
-        world: Dict[str, List[Solid]],
-        detail: Dict[str, List[Solid]],
+        world: Dict[str, List[Union[Solid, CompactSolid]]],
+        detail: Dict[str, List[Union[Solid, CompactSolid]]],
         overlays: Dict[str, List[Entity]],
         skip_faces: Iterable[str]=(),
         realign_faces: Iterable[str]=(),
@@ -181,7 +346,11 @@ class Template:
     def visgrouped(
         self,
         visgroups: Iterable[str]=(),
-    ) -> Tuple[List[Solid], List[Solid], List[Entity]]:
+    ) -> Tuple[
+        List[Union[Solid, CompactSolid]],
+        List[Union[Solid, CompactSolid]],
+        List[Entity],
+    ]:
         """Given some visgroups, return the matching data.
 
         This returns lists of the world brushes, detail brushes, and overlays.
@@ -189,8 +358,8 @@ class Template:
         visgroups = set(visgroups)
         visgroups.add('')
 
-        world_brushes = []  # type: List[Solid]
-        detail_brushes = []  # type: List[Solid]
+        world_brushes = []  # type: List[Union[Solid, CompactSolid]]
+        detail_brushes = []  # type: List[Union[Solid, CompactSolid]]
         overlays = []  # type: List[Entity]
 
         for group in visgroups:
@@ -318,19 +487,24 @@ def load_templates():
     overlay_ents = defaultdict(make_subdict)
     conf_ents = {}
 
+    # The templates are only ever copied, so store them compactly.
+    store = FaceStore()
+
     for ent in vmf.by_class['bee2_template_world']:
         world_ents[
             ent['template_id'].casefold()
         ][
             ent['visgroup'].casefold()
-        ].extend(ent.solids)
+        ].extend(CompactSolid.compact(ent.solids, store))
+        ent.solids.clear()
 
     for ent in vmf.by_class['bee2_template_detail']:
         detail_ents[
             ent['template_id'].casefold()
         ][
             ent['visgroup'].casefold()
-        ].extend(ent.solids)
+        ].extend(CompactSolid.compact(ent.solids, store))
+        ent.solids.clear()
 
     for ent in vmf.by_class['bee2_template_overlay']:
         overlay_ents[
@@ -414,6 +588,7 @@ def import_template(
     added - it's passed a list of names, and should return a list of ones to use.
     """
     import vbsp
+    import conditions
     if isinstance(temp_name, Template):
         template, temp_name = temp_name, temp_name.id
         chosen_groups = set()
@@ -469,6 +644,7 @@ def import_template(
             new_overlay['targetname'] = targetname + '-' + orig_target
 
         vbsp.VMF.add_ent(new_overlay)
+        conditions.index_overlay(new_overlay)
         new_over.append(new_overlay)
 
         # Don't let the overlays get retextured too!
@@ -627,7 +803,10 @@ def retexture_template(
             folded_mat = face.mat.casefold()
 
             norm = face.normal()
-            random.seed(rand_prefix + norm.join('_'))
+            # In legacy mode this is None, so the random module is seeded.
+            seed = vbsp.tex_seed(rand_prefix, norm)
+            if seed is None:
+                random.seed(rand_prefix + norm.join('_'))
 
             if orig_id in template.realign_faces:
                 try:
@@ -645,12 +824,12 @@ def retexture_template(
 
             if folded_mat in replace_tex:
                 # Replace_tex overrides everything.
-                mat = random.choice(replace_tex[folded_mat])
+                mat = vbsp.rand_choice(replace_tex[folded_mat], seed)
                 if mat[:1] == '$' and fixup is not None:
                     mat = fixup[mat]
                 if mat.startswith('<') or mat.endswith('>'):
                     # Lookup in the style data.
-                    mat = vbsp.get_tex(mat[1:-1])
+                    mat = vbsp.get_tex(mat[1:-1], seed)
                 face.mat = mat
                 continue
 
@@ -662,7 +841,7 @@ def retexture_template(
             if isinstance(tex_type, str):
                 # It's something like squarebeams or backpanels, just look
                 # it up
-                face.mat = vbsp.get_tex(tex_type)
+                face.mat = vbsp.get_tex(tex_type, seed)
 
                 if tex_type == 'special.goo_cheap':
                     if norm != (0, 0, 1):
@@ -711,11 +890,13 @@ def retexture_template(
                 # ones
                 if norm.z < -floor_tolerance:
                     face.mat = vbsp.get_tex(
-                        'special.bullseye_{}_floor'.format(tex_colour)
+                        'special.bullseye_{}_floor'.format(tex_colour),
+                        seed,
                     )
                 elif norm.z > floor_tolerance:
                     face.mat = vbsp.get_tex(
-                        'special.bullseye_{}_ceiling'.format(tex_colour)
+                        'special.bullseye_{}_ceiling'.format(tex_colour),
+                        seed,
                     )
                 else:
                     face.mat = ''  # Ensure next if statement triggers
@@ -723,7 +904,8 @@ def retexture_template(
                 # If those aren't defined, try the wall texture..
                 if face.mat == '':
                     face.mat = vbsp.get_tex(
-                        'special.bullseye_{}_wall'.format(tex_colour)
+                        'special.bullseye_{}_wall'.format(tex_colour),
+                        seed,
                     )
                 if face.mat != '':
                     continue  # Set to a bullseye texture,
@@ -733,7 +915,8 @@ def retexture_template(
                 # Don't use wall on faces similar to floor/ceiling:
                 if -floor_tolerance < norm.z < floor_tolerance:
                     face.mat = vbsp.get_tex(
-                        'special.{!s}_wall'.format(tex_colour)
+                        'special.{!s}_wall'.format(tex_colour),
+                        seed,
                     )
                 else:
                     face.mat = ''  # Ensure next if statement triggers
@@ -741,7 +924,8 @@ def retexture_template(
                 # Various fallbacks if not defined
                 if face.mat == '':
                     face.mat = vbsp.get_tex(
-                        'special.{!s}'.format(tex_colour)
+                        'special.{!s}'.format(tex_colour),
+                        seed,
                     )
                 if face.mat == '':
                     # No special texture - use a wall one.
@@ -775,21 +959,24 @@ def retexture_template(
                         face.mat = 'metal/black_wall_metal_002e'
             else:
                 face.mat = vbsp.get_tex(
-                    '{!s}.{!s}'.format(tex_colour, grid_size)
+                    '{!s}.{!s}'.format(tex_colour, grid_size),
+                    seed,
                 )
 
     for over in template_data.overlay[:]:
-        random.seed('TEMP_OVERLAY_' + over['basisorigin'])
+        seed = vbsp.tex_seed('TEMP_OVERLAY', over['basisorigin'])
+        if seed is None:
+            random.seed('TEMP_OVERLAY_' + over['basisorigin'])
         mat = over['material'].casefold()
         if mat in replace_tex:
-            mat = random.choice(replace_tex[mat])
+            mat = vbsp.rand_choice(replace_tex[mat], seed)
             if mat[:1] == '$':
                 mat = fixup[mat]
             if mat.startswith('<') or mat.endswith('>'):
                 # Lookup in the style data.
-                mat = vbsp.get_tex(mat[1:-1])
+                mat = vbsp.get_tex(mat[1:-1], seed)
         elif mat in vbsp.TEX_VALVE:
-            mat = vbsp.get_tex(vbsp.TEX_VALVE[mat])
+            mat = vbsp.get_tex(vbsp.TEX_VALVE[mat], seed)
         else:
             continue
         if mat == '':
@@ -799,3 +986,4 @@ def retexture_template(
             over.remove()
         else:
             over['material'] = mat
+            conditions.index_overlay(over)
@@ -0,0 +1,124 @@
+"""Run Valve's compile tools, logging their output as it is produced.
+
+The output is read by a thread for each of stdout and stderr, so neither pipe
+can fill up and block the tool. Complete lines are logged, and the
+"0...1...2..." progress markers the tools print are reported as percentages
+while each stage is running.
+"""
+import queue
+import re
+import subprocess
+import threading
+
+import utils
+
+from typing import Callable, Optional
+
+LOGGER = utils.getLogger(__name__)
+
+# The tools print '0...1...2...' up to 10 as a stage runs.
+PROGRESS_STEP = re.compile(rb'(\d+)\.\.\.')
+PROGRESS_END = re.compile(rb'\.\.\.10\b')
+
+LineCallback = Callable[[bytes], None]
+ProgressCallback = Callable[[str, int], None]
+
+
+def _read_pipe(pipe, name: str, events: queue.Queue) -> None:
+    """Read from a pipe, sending lines and progress to the queue.
+
+    This runs in a separate thread.
+    """
+    partial = b''
+    reported = 0  # The number of progress steps in this line we've sent.
+    with pipe:
+        while True:
+            data = pipe.read1(4096)
+            if not data:
+                break
+            partial += data
+            *lines, partial = partial.split(b'\n')
+            for line in lines:
+                line = line.rstrip(b'\r')
+                steps = PROGRESS_STEP.findall(line)
+                if steps and PROGRESS_END.search(line):
+                    events.put(('progress', _stage_name(line), 100))
+                elif len(steps) > reported:
+                    events.put(('progress', _stage_name(line), int(steps[-1]) * 10))
+                events.put(('line', name, line))
+                reported = 0
+
+            steps = PROGRESS_STEP.findall(partial)
+            if len(steps) > reported:
+                reported = len(steps)
+                events.put(('progress', _stage_name(partial), int(steps[-1]) * 10))
+    if partial:
+        events.put(('line', name, partial.rstrip(b'\r')))
+    events.put(('eof', name, None))
+
+
+def _stage_name(line: bytes) -> str:
+    """Get the name of the stage from a progress line."""
+    match = PROGRESS_STEP.search(line)
+    name = line[:match.start()] if match else line
+    return name.decode('ascii', 'replace').strip(' .:\t')
+
+
+def log_progress(logger) -> ProgressCallback:
+    """Make a progress callback which logs each step."""
+    def report(stage: str, percent: int) -> None:
+        logger.info('{}: {}%', stage or 'Progress', percent)
+    return report
+
+
+def run(
+    args: str,
+    logger=LOGGER,
+    on_line: Optional[LineCallback]=None,
+    on_progress: Optional[ProgressCallback]=None,
+) -> int:
+    """Run a compile tool, and return its exit code.
+
+    Lines from stdout are logged at INFO level, stderr at WARNING.
+    on_line is called with each line from stdout, and on_progress with the
+    name of the stage and the percentage complete.
+    """
+    proc = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        shell=True,
+    )
+    events = queue.Queue()  # type: queue.Queue
+    threads = [
+        threading.Thread(
+            target=_read_pipe,
+            args=(pipe, name, events),
+            daemon=True,
+        )
+        for pipe, name in [(proc.stdout, 'stdout'), (proc.stderr, 'stderr')]
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Handle everything in this thread, so the callbacks don't need to
+    # be thread-safe.
+    open_pipes = len(threads)
+    while open_pipes:
+        kind, name, value = events.get()
+        if kind == 'eof':
+            open_pipes -= 1
+        elif kind == 'progress':
+            if on_progress is not None:
+                on_progress(name, value)
+        elif name == 'stdout':
+            if value.strip():
+                logger.info(value.decode('ascii', 'replace'))
+            if on_line is not None:
+                on_line(value)
+        elif value.strip():
+            logger.warning(value.decode('ascii', 'replace'))
+
+    for thread in threads:
+        thread.join()
+    return proc.wait()
@@ -6,12 +6,17 @@ LOGGER = utils.init_logging('bee2/vbsp.log')
 import os
 import os.path
 import sys
-import subprocess
+import time
 import shutil
 import random
 import itertools
+import hashlib
+import multiprocessing
+import gc
+from functools import lru_cache
 from enum import Enum
 from collections import defaultdict, namedtuple, Counter
+from contextlib import contextmanager
 
 from srctools import Property, Vec, AtomicWriter, Entity
 from BEE2_config import ConfigFile
@@ -26,11 +31,13 @@ import conditions
 import connections
 import instance_traits
 import template_brush
+import tool_output
 import comp_consts as consts
+import compile_cache
 import conditions.globals
 
 from typing import (
-    Dict, Tuple, List
+    Dict, Tuple, List, Union, Optional, Set
 )
 
 COND_MOD_NAME = 'VBSP'
@@ -203,6 +210,11 @@ FIZZ_OPTIONS = [
 
 BEE2_config = None  # type: ConfigFile
 
+# The files read by load_settings() and their modification times.
+# If the compile server loaded settings in advance, this is used to check
+# they're still valid.
+SETTINGS_STAMP = None  # type: Optional[List[Tuple[str, Optional[int]]]]
+
 GAME_MODE = 'ERR'  # SP or COOP?
 # Are we in preview mode? (Spawn in entry door instead of elevator)
 IS_PREVIEW = 'ERR'  # type: bool
@@ -211,6 +223,11 @@ IS_PREVIEW = 'ERR'  # type: bool
 # This stops patterns from repeating in different maps, but keeps it the same
 # when recompiling.
 MAP_RAND_SEED = ''
+# MAP_RAND_SEED hashed to an integer, mixed into hash_seed().
+MAP_SEED_HASH = 0
+# If set, seed the random module per-face like older versions, to
+# reproduce those textures exactly.
+LEGACY_TEX_RANDOM = False
 
 # The actual map.
 VMF = None  # type: VLib.VMF
@@ -234,18 +251,160 @@ IND_ITEM_NAMES = set() # And both combined
 
 PRESET_CLUMPS = []  # Additional clumps set by conditions, for certain areas.
 
+# Keyvalues shared by many entities, which compact_map() merges.
+COMPACT_KEYVALUES = {
+    'classname',
+    'file',
+    'material',
+    'angles',
+    'spawnflags',
+}
+
+# Faces are split into cubes of this size to retexture in parallel.
+RETEXTURE_REGION = 1024
+# With fewer faces than this, starting the processes takes longer.
+RETEXTURE_MIN_FACES = 4000
+
 ##################
 # UTIL functions #
 ##################
 
-def get_tex(name):
-    if name in settings['textures']:
-        return random.choice(settings['textures'][name])
-    else:
-        raise Exception('No texture "' + name + '"!')
+_MASK_64 = (1 << 64) - 1
+
+
+def _mix64(val: int) -> int:
+    """Scramble the bits of a 64-bit integer (the SplitMix64 finaliser)."""
+    val = (val + 0x9E3779B97F4A7C15) & _MASK_64
+    val = ((val ^ (val >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    val = ((val ^ (val >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return val ^ (val >> 31)
+
+
+@lru_cache(maxsize=None)
+def hash_str(text: str) -> int:
+    """Hash a string to a 64-bit integer.
+
+    Unlike hash(), this is the same every time the compiler runs.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(text.encode('utf8'), digest_size=8).digest(),
+        'little',
+    )
+
+
+def hash_seed(*values: int) -> int:
+    """Combine integers with the map seed to produce a 64-bit seed value.
+
+    This is much cheaper than reseeding the random module.
+    """
+    seed = MAP_SEED_HASH
+    for val in values:
+        seed = _mix64(seed ^ (val & _MASK_64))
+    return seed
+
+
+class SeededRand:
+    """A deterministic random number generator, made by seeded_rand().
+
+    Each value is the hash of the seed and a counter, so these are cheap to
+    create and don't affect each other or the random module. This has the
+    same methods as the random module which conditions use, so either can
+    be passed around.
+    """
+    __slots__ = ['seed', 'counter']
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed
+        self.counter = 0
+
+    def getrandbits64(self) -> int:
+        """Produce the next 64-bit value."""
+        self.counter += 1
+        return _mix64(self.seed ^ _mix64(self.counter))
+
+    def random(self) -> float:
+        """Return a float in the range [0, 1)."""
+        return (self.getrandbits64() >> 11) / (1 << 53)
+
+    def randrange(self, start: int, stop: int=None, step: int=1) -> int:
+        """Pick an integer from range(start, stop, step)."""
+        if stop is None:
+            start, stop = 0, start
+        count = len(range(start, stop, step))
+        if count <= 0:
+            raise ValueError('Empty range for randrange()!')
+        return start + step * (self.getrandbits64() % count)
+
+    def randint(self, low: int, high: int) -> int:
+        """Pick an integer from low to high inclusive."""
+        return self.randrange(low, high + 1)
+
+    def uniform(self, low: float, high: float) -> float:
+        """Pick a float between low and high."""
+        return low + (high - low) * self.random()
+
+    def choice(self, seq):
+        """Pick an item from the sequence."""
+        if not seq:
+            raise IndexError('Cannot choose from an empty sequence!')
+        return seq[self.getrandbits64() % len(seq)]
+
+    def shuffle(self, seq: list) -> None:
+        """Shuffle the list in place."""
+        for i in reversed(range(1, len(seq))):
+            j = self.getrandbits64() % (i + 1)
+            seq[i], seq[j] = seq[j], seq[i]
+
+
+def seeded_rand(*values: int) -> SeededRand:
+    """Make a random generator from the map seed and these values.
+
+    The same values always produce the same sequence.
+    """
+    return SeededRand(hash_seed(*values))
+
+
+def rand_choice(seq, seed: int=None):
+    """Pick an item from the sequence.
+
+    If the seed is given, the same item is always picked for that seed.
+    Otherwise the random module is used.
+    """
+    if seed is None:
+        return random.choice(seq)
+    return seq[_mix64(seed) % len(seq)]
+
+
+def get_tex(name, seed: int=None):
+    """Pick one of the textures for the given slot.
+
+    If seed is set, the choice is fixed for that seed and slot.
+    """
+    try:
+        textures = settings['textures'][name]
+    except KeyError:
+        raise Exception('No texture "' + name + '"!') from None
+    if seed is None:
+        return random.choice(textures)
+    return textures[_mix64(seed ^ hash_str(name)) % len(textures)]
 
 
-def alter_mat(face, seed=None, texture_lock=True):
+def tex_seed(*values: Union[int, str, Vec]) -> Optional[int]:
+    """Make a seed for get_tex() or rand_choice() from these values.
+
+    Usually these are the position of the face or entity being textured.
+    If LEGACY_TEX_RANDOM is set this returns None instead, so the random
+    module is used like older versions.
+    """
+    if LEGACY_TEX_RANDOM:
+        return None
+    return hash_seed(*[
+        val if isinstance(val, int) else hash_str(str(val))
+        for val in values
+    ])
+
+
+def alter_mat(face, seed=None, texture_lock=True, orient: 'ORIENT'=None):
     """Randomise the texture used for a face, based on configured textures.
 
     This uses the TEX_VALVE dict to identify the kind of texture, but
@@ -254,31 +413,54 @@ def alter_mat(face, seed=None, texture_lock=True):
 
     If texture_lock is false, the offset of the texture will be reset to 0,0.
     That ensures embedface will have aligned textures.
+
+    seed should be a value from face_seed(). If a string (legacy mode), it's
+    used to reseed the random module. If orient is passed, it is used instead
+    of recalculating it from the face.
     """
-    mat = face.mat.casefold()
-    if seed:
+    info = consts.mat_info(face.mat)
+    mat = info.name
+    if isinstance(seed, str):
         random.seed(seed)
+        seed = None
 
     if mat in TEX_VALVE:  # should we convert it?
-        face.mat = get_tex(TEX_VALVE[mat])
+        face.mat = pick_face_mat(mat, orient, seed)
         return True
-    elif mat in consts.BlackPan or mat in consts.WhitePan:
-        orient = get_face_orient(face)
-        face.mat = get_tex(get_tile_type(mat, orient))
+    elif info.is_tile:
+        if orient is None:
+            orient = get_face_orient(face)
+        face.mat = pick_face_mat(mat, orient, seed)
 
         if not texture_lock:
             face.offset = 0
 
         return True
     elif mat in TEX_FIZZLER:
-        face.mat = settings['fizzler'][TEX_FIZZLER[mat]]
+        face.mat = pick_face_mat(mat, orient, seed)
     else:
         return False
 
 
+def pick_face_mat(mat: str, orient: Optional[ORIENT], seed: Optional[int]):
+    """Pick the material alter_mat() would use for a face.
+
+    mat must be casefolded, and orient is required for tile materials.
+    This returns None if the material isn't changed.
+    """
+    if mat in TEX_VALVE:
+        return get_tex(TEX_VALVE[mat], seed)
+    elif consts.mat_info(mat).is_tile:
+        return get_tex(get_tile_type(mat, orient), seed)
+    elif mat in TEX_FIZZLER:
+        return settings['fizzler'][TEX_FIZZLER[mat]]
+    else:
+        return None
+
+
 def get_tile_type(mat, orient):
     """Get the texture command for a texture."""
-    surf_type = 'white' if mat in consts.WhitePan else 'black'
+    surf_type = 'white' if consts.mat_info(mat).is_white else 'black'
     # We need to handle specially the 4x4 and 2x4 variants.
     # These are used in the embedface brushes, so they should
     # remain having small tile size. Wall textures have 4x4 and 2x2,
@@ -304,7 +486,7 @@ def get_tile_type(mat, orient):
 
 def load_settings():
     """Load in all our settings from vbsp_config."""
-    global BEE2_config
+    global BEE2_config, SETTINGS_STAMP
     try:
         with open("bee2/vbsp_config.cfg", encoding='utf8') as config:
             conf = Property.parse(config, 'bee2/vbsp_config.cfg')
@@ -441,9 +623,44 @@ def load_settings():
     else:
         BEE2_config = ConfigFile(None)
 
+    SETTINGS_STAMP = settings_stamp()
+
     LOGGER.info("Settings Loaded!")
 
 
+def load_settings_if_changed():
+    """Load settings, unless they're already loaded and unchanged.
+
+    The compile server loads these in advance.
+    """
+    if SETTINGS_STAMP is None or SETTINGS_STAMP != settings_stamp():
+        LOGGER.info("Loading settings...")
+        load_settings()
+    else:
+        LOGGER.info("Settings already loaded!")
+
+
+def settings_stamp() -> List[Tuple[str, Optional[int]]]:
+    """Get the modification times of the files load_settings() reads."""
+    files = [
+        'bee2/vbsp_config.cfg',
+        'bee2/instances.cfg',
+        template_brush.TEMPLATE_LOCATION,
+    ]
+    for conf in [BEE2_config, vbsp_options.ITEM_CONFIG]:
+        if conf is not None and conf.filename:
+            files.append(conf.filename)
+
+    stamp = []
+    for filename in files:
+        filename = os.path.abspath(filename)
+        try:
+            stamp.append((filename, os.stat(filename).st_mtime_ns))
+        except OSError:
+            stamp.append((filename, None))
+    return stamp
+
+
 def load_map(map_path):
     """Load in the VMF file."""
     global VMF
@@ -455,6 +672,40 @@ def load_map(map_path):
     LOGGER.info("Loading complete!")
 
 
+def compact_map():
+    """Reduce the memory used by the map.
+
+    The parser makes a new copy of every material and keyvalue name, so
+    identical ones are merged. Then the cyclic garbage collector is told to
+    stop scanning the loaded map, since it's never garbage.
+    """
+    intern = sys.intern
+    solids = list(VMF.brushes)
+    for ent in VMF.entities:
+        solids.extend(ent.solids)
+        keys = {
+            intern(key): (
+                intern(value)
+                if key in COMPACT_KEYVALUES else
+                value
+            )
+            for key, value in ent.keys.items()
+        }
+        ent.keys.clear()
+        ent.keys.update(keys)
+    for solid in solids:
+        for side in solid.sides:
+            side.mat = intern(side.mat)
+
+    gc.collect()
+    try:
+        gc.freeze()
+    except AttributeError:
+        # Python 3.6 - instead make collections less frequent.
+        threshold = gc.get_threshold()
+        gc.set_threshold(threshold[0] * 10, *threshold[1:])
+
+
 @conditions.meta_cond(priority=100)
 def add_voice():
     """Add voice lines to the map."""
@@ -549,48 +800,46 @@ def add_fizz_borders():
             min_origin[norm_dir] += 1
             min_origin[horiz_dir] += overlay_len/2
             min_origin[vert_dir] += 16
-            VLib.make_overlay(
+            conditions.index_overlay(VLib.make_overlay(
                 VMF,
                 normal=abs(vert),
                 origin=min_origin,
                 uax=horiz * overlay_len,
                 vax=norm * overlay_thickness,
-                material=random.choice(tex),
+                material=rand_choice(tex, tex_seed(min_origin)),
                 surfaces=min_faces,
                 u_repeat=u_rep,
                 v_repeat=v_rep,
                 swap=flip_uv,
-            )
+            ))
         if max_faces:
             max_origin = bbox_max.copy()
             max_origin[norm_dir] -= 1
             max_origin[horiz_dir] -= overlay_len/2
             max_origin[vert_dir] -= 16
-            VLib.make_overlay(
+            conditions.index_overlay(VLib.make_overlay(
                 VMF,
                 normal=-abs(vert),
                 origin=max_origin,
                 uax=horiz * overlay_len,
                 vax=norm * overlay_thickness,
-                material=random.choice(tex),
+                material=rand_choice(tex, tex_seed(max_origin)),
                 surfaces=max_faces,
                 u_repeat=u_rep,
                 v_repeat=v_rep,
                 swap=flip_uv,
-            )
+            ))
 
 
-@conditions.meta_cond(priority=-200, only_once=False)
-def fix_fizz_models(inst: Entity):
+# Fizzler model names end with this special string
+@conditions.meta_batch(priority=-200, targetname='_model(Start|End)')
+def fix_fizz_models(insts: List[Entity]):
     """Fix some bugs with fizzler model instances.
     This removes extra numbers from model instances, which prevents
     inputs from being read correctly.
     It also rotates fizzler models so they are both facing the same way.
     """
-    # Fizzler model names end with this special string
-    if ("_modelStart" in inst['targetname', ''] or
-            "_modelEnd" in inst['targetname', '']):
-
+    for inst in insts:
         # strip off the extra numbers on the end, so fizzler
         # models recieve inputs correctly (Valve bug!)
         if "_modelStart" in inst['targetname', '']:
@@ -611,10 +860,10 @@ def fix_fizz_models(inst: Entity):
             inst['angles'] = FIZZLER_ANGLE_FIX[inst['angles']]
 
 
-@conditions.meta_cond(priority=-100, only_once=False)
-def static_pan(inst: Entity):
+@conditions.meta_batch(priority=-100, instances='<ITEM_PANEL_CLEAR>')
+def static_pan(insts: List[Entity]):
     """Switches glass angled panels to static instances, if needed."""
-    if inst['file'].casefold() in instanceLocs.resolve('<ITEM_PANEL_CLEAR>'):
+    for inst in insts:
         # white/black are found via the func_brush
         make_static_pan(inst, "glass")
 
@@ -696,14 +945,13 @@ def res_faith_bullseye(inst: Entity, res: Property):
     color = None
 
     # Look for a world brush
-    if pos in conditions.SOLIDS:
-        solid = conditions.SOLIDS[pos]
-        if solid.normal == norm:
-            face = solid.face
-            color = solid.color
-            if make_bullseye_face(face, color):
-                # Use an alternate instance, without the decal ent.
-                inst['file'] = res.value
+    solid = conditions.SOLIDS.at_offset(inst, Vec(0, 0, -64), Vec(0, 0, -1))
+    if solid is not None:
+        face = solid.face
+        color = solid.color
+        if make_bullseye_face(face, color):
+            # Use an alternate instance, without the decal ent.
+            inst['file'] = res.value
 
     # Look for angled panels
     if face is None and pos in ANGLED_PAN_BRUSH:
@@ -763,11 +1011,12 @@ def make_bullseye_face(
     if orient is ORIENT.ceil: # We use the full 'ceiling' here, instead of 'ceil'.
         orient = 'ceiling'
 
-    mat = get_tex('special.bullseye_{!s}_{!s}'.format(color, orient))
+    seed = tex_seed(face.get_origin())
+    mat = get_tex('special.bullseye_{!s}_{!s}'.format(color, orient), seed)
 
     # Fallback to floor texture if using ceiling or wall
     if orient is not ORIENT.floor and mat == '':
-        mat = get_tex('special.bullseye_{}_floor'.format(color))
+        mat = get_tex('special.bullseye_{}_floor'.format(color), seed)
 
     if mat == '':
         return False
@@ -1520,6 +1769,16 @@ def mod_doorframe(inst: VLib.Entity, corr_id, corr_type, corr_name):
         inst['file'] = replace[0]
 
 
+def seed_random() -> None:
+    """Seed the random module with the map seed.
+
+    Not every texture is picked with a seed, so this is done before each
+    step of the conversion. Then those only depend on the map, not anything
+    done earlier.
+    """
+    random.seed(MAP_RAND_SEED)
+
+
 def calc_rand_seed():
     """Use the ambient light entities to create a map seed.
 
@@ -1653,15 +1912,16 @@ def fixup_goo_sides():
 
                 # We only want to alter black panel surfaces..
                 if block_type.is_goo and face.mat.casefold() in BLACK_PAN:
+                    seed = tex_seed(origin)
                     face.mat = ''
                     if norm.z != 0:
-                        face.mat = get_tex('special.goo_floor')
+                        face.mat = get_tex('special.goo_floor', seed)
 
                     if face.mat == '':  # goo_floor is invalid, or not used
-                        face.mat = get_tex('special.goo_wall')
+                        face.mat = get_tex('special.goo_wall', seed)
 
                     if face.mat == '':  # No overrides, use normal textures.
-                        face.mat = get_tex('black.4x4')
+                        face.mat = get_tex('black.4x4', seed)
 
                     if scale is not None:
                         # Allow altering the orientation of the texture.
@@ -1720,6 +1980,251 @@ def collapse_goo_trig():
     LOGGER.info('Done!')
 
 
+# Brush entities which can be combined, if they're otherwise identical and
+# have no outputs.
+MERGEABLE_BRUSH_ENTS = [
+    'func_brush',
+    'func_clip_vphysics',
+    'func_illusionary',
+    'func_noportal_volume',
+    'trigger_hurt',
+    'trigger_multiple',
+]
+
+
+def merge_brush_ents() -> int:
+    """Combine identical brush entities which are near each other.
+
+    This reduces the entity count, and the work VBSP and VVIS need to do.
+    Entities must have the same keyvalues. Named or parented entities are
+    skipped, since something else may refer to them. Entities with outputs
+    are also skipped, since a merged trigger would fire them once instead
+    of once per original entity.
+    This returns the number of entities removed.
+    """
+    cell_size = vbsp_options.get(int, 'brush_ent_merge_size')
+    if cell_size <= 0:
+        return 0
+
+    LOGGER.info('Merging brush entities...')
+    groups = defaultdict(list)  # type: Dict[tuple, List[VLib.Entity]]
+    for classname in MERGEABLE_BRUSH_ENTS:
+        for ent in sorted(VMF.by_class[classname], key=lambda e: e.id):
+            if ent in IGNORED_BRUSH_ENTS or not ent.solids:
+                continue
+            if ent['targetname', ''] or ent['parentname', '']:
+                continue
+            if ent.outputs:
+                continue
+            bbox_min, bbox_max = ent.get_bbox()
+            cell = (bbox_min + bbox_max) / 2 // cell_size
+            groups[
+                classname,
+                cell.as_tuple(),
+                frozenset(
+                    (key.casefold(), value)
+                    for key, value in ent.keys.items()
+                    if key.casefold() != 'origin'
+                ),
+            ].append(ent)
+
+    before = Counter()
+    after = Counter()
+    for (classname, *_), ents in groups.items():
+        before[classname] += len(ents)
+        after[classname] += 1
+        first, *rest = ents
+        for ent in rest:
+            first.solids.extend(ent.solids)
+            ent.remove()
+
+    for classname in sorted(before):
+        LOGGER.info(
+            '{}: {} -> {} entities',
+            classname,
+            before[classname],
+            after[classname],
+        )
+    removed = sum(before.values()) - sum(after.values())
+    LOGGER.info('Removed {} brush entities.', removed)
+    return removed
+
+
+class _WorldBox:
+    """An axis-aligned box world brush, used by simplify_world_brushes().
+
+    sides maps (axis, is_max) to the face on that side.
+    """
+    __slots__ = ['solid', 'min', 'max', 'sides']
+
+    def __init__(
+        self,
+        solid: VLib.Solid,
+        bbox_min: Vec,
+        bbox_max: Vec,
+        sides: Dict[Tuple[str, bool], VLib.Side],
+    ) -> None:
+        self.solid = solid
+        self.min = bbox_min
+        self.max = bbox_max
+        self.sides = sides
+
+    @classmethod
+    def from_solid(
+        cls,
+        solid: VLib.Solid,
+        non_solid: Set[str]=frozenset(),
+    ) -> Optional['_WorldBox']:
+        """Check if a brush is a simple opaque box, and return the box if so.
+
+        non_solid is a set of additional casefolded materials which make the
+        brush liquid or see-through.
+        """
+        if len(solid.sides) != 6:
+            return None
+        bbox_min, bbox_max = solid.get_bbox()
+        sides = {}
+        for side in solid.sides:
+            if side.is_disp or side in IGNORED_FACES:
+                return None
+            info = consts.mat_info(side.mat)
+            # Goo, glass and clips change the brush contents, so merging
+            # these with solid brushes would turn those into water or glass.
+            if (
+                info.is_goo or info.is_glass or info.is_grating or
+                info.name in non_solid or
+                (info.is_tool and info.name != consts.Tools.NODRAW)
+            ):
+                return None
+            norm = side.normal()
+            for axis in 'xyz':
+                if abs(norm[axis]) > 0.99:
+                    break
+            else:
+                return None
+            pos = side.planes[0][axis]
+            if pos == bbox_max[axis]:
+                sides[axis, True] = side
+            elif pos == bbox_min[axis]:
+                sides[axis, False] = side
+            else:
+                return None
+        if len(sides) != 6:
+            return None
+        return cls(solid, bbox_min, bbox_max, sides)
+
+
+def _face_key(side: VLib.Side) -> tuple:
+    """Faces with the same key look identical when merged."""
+    return (
+        side.mat.casefold(),
+        str(side.uaxis),
+        str(side.vaxis),
+        side.ham_rot,
+        side.lightmap,
+        side.smooth,
+    )
+
+
+def _merge_world_boxes(
+    boxes: List[_WorldBox],
+    axis: str,
+) -> Tuple[List[_WorldBox], Dict[str, Optional[List[str]]]]:
+    """Merge runs of boxes along one axis.
+
+    This returns the remaining boxes, and the face IDs which were replaced.
+    """
+    u, v = Vec.INV_AXIS[axis]
+    rows = defaultdict(list)  # type: Dict[tuple, List[_WorldBox]]
+    for box in boxes:
+        rows[box.min[u], box.min[v], box.max[u], box.max[v]].append(box)
+
+    merged = []  # type: List[_WorldBox]
+    id_map = {}  # type: Dict[str, Optional[List[str]]]
+    for row in rows.values():
+        row.sort(key=lambda box: box.min[axis])
+        cur = row[0]
+        for box in row[1:]:
+            if box.min[axis] != cur.max[axis] or any(
+                _face_key(cur.sides[side_axis, is_max]) !=
+                _face_key(box.sides[side_axis, is_max])
+                for side_axis in (u, v)
+                for is_max in (False, True)
+            ):
+                merged.append(cur)
+                cur = box
+                continue
+
+            # The touching faces are inside the new brush.
+            id_map[str(cur.sides[axis, True].id)] = None
+            id_map[str(box.sides[axis, False].id)] = None
+            for side_axis in (u, v):
+                for is_max in (False, True):
+                    id_map[str(box.sides[side_axis, is_max].id)] = [
+                        str(cur.sides[side_axis, is_max].id)
+                    ]
+            # The far face moves across, keeping its ID. The sides are
+            # planes, so they extend automatically.
+            cur.solid.sides.remove(cur.sides[axis, True])
+            cur.solid.sides.append(box.sides[axis, True])
+            cur.sides[axis, True] = box.sides[axis, True]
+            cur.max[axis] = box.max[axis]
+            VMF.remove_brush(box.solid)
+        merged.append(cur)
+    return merged, id_map
+
+
+# The texture slots for materials which aren't opaque and solid.
+NON_SOLID_TEX = [
+    'special.goo',
+    'special.goo_cheap',
+    'special.glass',
+    'special.grating',
+    'special.laserfield',
+]
+
+
+def simplify_world_brushes() -> int:
+    """Merge neighbouring world brushes into larger boxes.
+
+    PeTI maps have a brush for each voxel, which VBSP and VVIS need to
+    process. Boxes are merged along X, then Y, then Z when all the faces
+    left outside have the same material and alignment. This doesn't change
+    the collision or appearance. Overlays are moved to the replacement faces.
+    This returns the number of brush sides removed.
+    """
+    if not vbsp_options.get(bool, 'simplify_world_brushes'):
+        return 0
+    LOGGER.info('Simplifying world brushes...')
+
+    # The textures goo and glass have been changed to.
+    non_solid = {
+        mat.casefold()
+        for slot in NON_SOLID_TEX
+        for mat in settings['textures'].get(slot, ())
+    }
+    boxes = []
+    for solid in VMF.brushes:
+        box = _WorldBox.from_solid(solid, non_solid)
+        if box is not None:
+            boxes.append(box)
+    start_count = len(boxes)
+    start_sides = sum(len(box.solid.sides) for box in boxes)
+
+    for axis in 'xyz':
+        boxes, id_map = _merge_world_boxes(boxes, axis)
+        conditions.reallocate_overlays(id_map)
+
+    removed = start_sides - sum(len(box.solid.sides) for box in boxes)
+    LOGGER.info(
+        'Merged {} box brushes into {}, removing {} sides.',
+        start_count,
+        len(boxes),
+        removed,
+    )
+    return removed
+
+
 def remove_static_ind_toggles():
     """Remove indicator_toggle instances that don't have assigned overlays.
 
@@ -1828,6 +2333,70 @@ def fix_squarebeams(face, rotate, reset_offset: bool, scale: float):
     targ.scale = scale
 
 
+class FaceTable:
+    """Precomputed information about every world and detail brush face.
+
+    The retexturing passes need the origin and orientation of each face,
+    so these are calculated once and stored in parallel lists.
+    """
+    def __init__(self) -> None:
+        self.faces = []  # type: List[VLib.Side]
+        self.mats = []  # type: List[str]
+        self.origins = []  # type: List[Vec]
+        self.orients = []  # type: List[ORIENT]
+        # For each brush, the range of indexes holding its faces.
+        self.solid_ranges = []  # type: List[Tuple[VLib.Solid, int, int]]
+        # Solid -> (face, origin, orient) for each face.
+        self._cache = {}  # type: Dict[VLib.Solid, List[Tuple[VLib.Side, Vec, ORIENT]]]
+
+    def __len__(self) -> int:
+        return len(self.faces)
+
+    def update(self, vmf: VLib.VMF) -> None:
+        """Rebuild the table from the current world and detail brushes.
+
+        Brushes which were already present reuse their computed positions,
+        and removed ones are dropped. Materials are always re-read.
+        """
+        old_cache = self._cache
+        self._cache = cache = {}
+        self.faces = faces = []
+        self.mats = mats = []
+        self.origins = origins = []
+        self.orients = orients = []
+        self.solid_ranges = ranges = []
+
+        for solid in vmf.iter_wbrushes(world=True, detail=True):
+            try:
+                rows = old_cache[solid]
+            except KeyError:
+                rows = [
+                    (face, face.get_origin(), get_face_orient(face))
+                    for face in solid
+                ]
+            cache[solid] = rows
+            start = len(faces)
+            for face, origin, orient in rows:
+                faces.append(face)
+                mats.append(consts.mat_info(face.mat).name)
+                origins.append(origin)
+                orients.append(orient)
+            ranges.append((solid, start, len(faces)))
+
+    def indexes(self, mats: Optional[Set[str]]=None) -> List[int]:
+        """Return the indexes of non-ignored faces.
+
+        If mats is passed, only faces with those (casefolded) materials
+        are included.
+        """
+        return [
+            ind for ind, (face, mat) in
+            enumerate(zip(self.faces, self.mats))
+            if face not in IGNORED_FACES
+            if mats is None or mat in mats
+        ]
+
+
 def change_brush():
     """Alter all world/detail brush textures to use the configured ones."""
     LOGGER.info("Editing Brushes...")
@@ -1890,16 +2459,20 @@ def change_brush():
     # merged with other clips.
     glass_clip_ent = VMF.create_ent(classname='func_brush', solidbsp=1)
 
-    for solid in VMF.iter_wbrushes(world=True, detail=True):
+    face_table = FaceTable()
+    face_table.update(VMF)
+    all_faces = face_table.faces
+
+    for solid, start, end in face_table.solid_ranges:
         is_glass = False
-        for face in solid:
+        for face in all_faces[start:end]:
             highest_brush = max(
                 highest_brush,
                 face.planes[0].z,
                 face.planes[1].z,
                 face.planes[2].z,
             )
-            if face.mat in consts.Goo:
+            if consts.mat_info(face.mat).is_goo:
                 if make_goo_mist:
                     mist_solids.add(
                         solid.get_origin().as_tuple()
@@ -1912,9 +2485,10 @@ def change_brush():
                 face.mat = get_tex(
                     'special.goo' if
                     face.planes[0].z == best_goo
-                    else 'special.goo_cheap'
+                    else 'special.goo_cheap',
+                    tex_seed(face.get_origin()),
                 )
-            if face.mat == consts.Special.GLASS:
+            if consts.mat_info(face.mat).is_glass:
                 if glass_temp is not None:
                     glass_temp.apply(face, change_mat=False)
                 else:
@@ -1953,10 +2527,13 @@ def change_brush():
         add_glass_floorbeams(floorbeam_locs)
         LOGGER.info('Done!')
 
+    # Bottomless pits and floorbeams add and remove brushes.
+    face_table.update(VMF)
+
     if can_clump():
-        clump_walls()
+        clump_walls(face_table)
     else:
-        random_walls()
+        random_walls(face_table)
 
 
 def can_clump():
@@ -2086,47 +2663,196 @@ def add_glass_floorbeams(glass_locs):
 
 
 
-def face_seed(face):
+def face_seed(face, origin: Vec=None) -> Union[int, str]:
     """Create a seed unique to this brush face.
 
     This is the same regardless of side direction.
+    Normally this is an integer from hash_seed(), but if LEGACY_TEX_RANDOM
+    is set it's a string for random.seed().
+    If the origin of the face is already known, it can be passed in.
     """
-    origin = face.get_origin()
-    for axis in "xyz":
-        if origin[axis] % 128 < 2:
-            origin[axis] = (origin[axis] // 64) * 64
-        else:
-            origin[axis] = (origin[axis] // 128) * 128 + 64
-    return origin.join(' ')
+    if origin is None:
+        origin = face.get_origin()
+    x, y, z = [
+        (val // 64) * 64
+        if val % 128 < 2 else
+        (val // 128) * 128 + 64
+        for val in (origin.x, origin.y, origin.z)
+    ]
+    if LEGACY_TEX_RANDOM:
+        return Vec(x, y, z).join(' ')
+    return hash_seed(int(x), int(y), int(z))
 
 
-def random_walls():
+def random_walls(face_table: FaceTable):
     """The original wall style, with completely randomised walls."""
     rotate_edge = vbsp_options.get(bool, 'rotate_edge')
     texture_lock = vbsp_options.get(bool, 'tile_texture_lock')
     edge_off = vbsp_options.get(bool, 'reset_edge_off')
     edge_scale = vbsp_options.get(float, 'edge_scale')
 
-    for solid in VMF.iter_wbrushes(world=True, detail=True):
-        for face in solid:
-            if face in IGNORED_FACES:
+    faces = face_table.faces
+    origins = face_table.origins
+    orients = face_table.orients
+    # Faces to pass to alter_mat().
+    pending = []  # type: List[int]
+
+    for ind in face_table.indexes():
+        face = faces[ind]
+        origin = origins[ind]
+
+        if face.mat == consts.Special.SQUAREBEAMS:
+            fix_squarebeams(face, rotate_edge, edge_off, edge_scale)
+
+        # Conditions can define special clumps for items, we want to
+        # do those if needed.
+        for clump in PRESET_CLUMPS:
+            if clump.min_pos <= origin <= clump.max_pos:
+                face.mat = clump.tex[get_tile_type(
+                    face.mat.casefold(),
+                    orients[ind],
+                )]
+                break
+        else:  # No clump..
+            pending.append(ind)
+
+    retexture_faces(face_table, pending, texture_lock)
+
+
+def retexture_processes() -> int:
+    """The number of processes retexture_faces() uses.
+
+    Legacy random mode needs to reseed the random module in order, so it
+    always uses just this one.
+    """
+    if LEGACY_TEX_RANDOM:
+        return 1
+    if multiprocessing.current_process().daemon:
+        # The compile server runs us in a daemon process, which can't
+        # have children.
+        return 1
+    return max(1, vbsp_options.get(int, 'retexture_processes'))
+
+
+def _retexture_init(textures, fizzler, seed_hash: int) -> None:
+    """Set up a worker process for retexture_faces()."""
+    global MAP_SEED_HASH
+    settings['textures'] = textures
+    settings['fizzler'] = fizzler
+    MAP_SEED_HASH = seed_hash
+
+
+def _retexture_chunk(
+    rows: List[Tuple[str, ORIENT, int]],
+) -> List[Optional[str]]:
+    """Pick the materials for a group of faces, in a worker process."""
+    return [
+        pick_face_mat(mat, orient, seed)
+        for mat, orient, seed in rows
+    ]
+
+
+def retexture_faces(
+    face_table: FaceTable,
+    indexes: List[int],
+    texture_lock: bool,
+) -> None:
+    """Apply alter_mat() to these faces in the table.
+
+    If the retexture_processes option is set, the materials are picked by
+    several processes. The faces are split into regions of the map, and
+    the results are applied in the same order, so this gives the same
+    result either way.
+    """
+    faces = face_table.faces
+    mats = face_table.mats
+    origins = face_table.origins
+    orients = face_table.orients
+
+    processes = retexture_processes()
+    if processes < 2 or len(indexes) < RETEXTURE_MIN_FACES:
+        results = None
+    else:
+        chunks, results = _retexture_parallel(face_table, indexes, processes)
+
+    if results is None:
+        for ind in indexes:
+            alter_mat(
+                faces[ind],
+                face_seed(faces[ind], origins[ind]),
+                texture_lock,
+                orients[ind],
+            )
+        return
+
+    for chunk, new_mats in zip(chunks, results):
+        for ind, new_mat in zip(chunk, new_mats):
+            if new_mat is None:
                 continue
+            face = faces[ind]
+            mat = mats[ind]
+            face.mat = new_mat
+            if (
+                not texture_lock and
+                mat not in TEX_VALVE and
+                consts.mat_info(mat).is_tile
+            ):
+                face.offset = 0
 
-            if face.mat == consts.Special.SQUAREBEAMS:
-                fix_squarebeams(face, rotate_edge, edge_off, edge_scale)
-
-            # Conditions can define special clumps for items, we want to
-            # do those if needed.
-            origin = face.get_origin()
-            for clump in PRESET_CLUMPS:
-                if clump.min_pos <= origin <= clump.max_pos:
-                    face.mat = clump.tex[get_tile_type(
-                        face.mat.casefold(),
-                        get_face_orient(face),
-                    )]
-                    break
-            else:  # No clump..
-                alter_mat(face, face_seed(face), texture_lock)
+
+def _retexture_parallel(
+    face_table: FaceTable,
+    indexes: List[int],
+    processes: int,
+) -> Tuple[List[List[int]], Optional[List[List[Optional[str]]]]]:
+    """Pick materials for faces using a process pool.
+
+    This returns the indexes split into chunks, and the materials for
+    each. If the pool fails, the materials are None.
+    """
+    faces = face_table.faces
+    mats = face_table.mats
+    origins = face_table.origins
+    orients = face_table.orients
+
+    regions = defaultdict(list)  # type: Dict[Tuple[float, float, float], List[int]]
+    for ind in indexes:
+        regions[(origins[ind] // RETEXTURE_REGION).as_tuple()].append(ind)
+
+    # Combine regions into a few chunks for each process.
+    chunk_size = len(indexes) // (processes * 4) + 1
+    chunks = []  # type: List[List[int]]
+    for region in sorted(regions):
+        if not chunks or len(chunks[-1]) >= chunk_size:
+            chunks.append([])
+        chunks[-1].extend(regions[region])
+
+    LOGGER.info(
+        'Retexturing {} faces using {} processes...',
+        len(indexes),
+        processes,
+    )
+    ctx = multiprocessing.get_context('spawn')
+    try:
+        with ctx.Pool(
+            processes,
+            _retexture_init,
+            (settings['textures'], settings['fizzler'], MAP_SEED_HASH),
+        ) as pool:
+            results = pool.map(_retexture_chunk, [
+                [
+                    (mats[ind], orients[ind], face_seed(faces[ind], origins[ind]))
+                    for ind in chunk
+                ]
+                for chunk in chunks
+            ])
+    except Exception:
+        LOGGER.warning(
+            'Could not retexture in parallel, continuing normally!',
+            exc_info=True,
+        )
+        return chunks, None
+    return chunks, results
 
 
 Clump = namedtuple('Clump', [
@@ -2193,7 +2919,7 @@ def cond_force_clump(inst: Entity, res: Property):
     ))
 
 
-def clump_walls():
+def clump_walls(face_table: FaceTable):
     """A wall style where textures are used in small groups near each other.
 
     This replicates the Old Aperture maps, which are cobbled together
@@ -2213,13 +2939,19 @@ def clump_walls():
 
     # Possible locations for clumps - every face origin, not including
     # ignored faces or nodraw
-    panel_mats = set(consts.WhitePan).union(consts.BlackPan)
+    panel_mats = {
+        mat.value
+        for mat in itertools.chain(consts.WhitePan, consts.BlackPan)
+    }
+    faces = face_table.faces
+    mats = face_table.mats
+    origins = face_table.origins
+    orients = face_table.orients
+
     possible_locs = [
-        face.get_origin()
-        for face in
-        VMF.iter_wfaces(world=True, detail=True)
-        if face not in IGNORED_FACES
-        if face.mat.casefold() in panel_mats
+        origins[ind]
+        for ind in
+        face_table.indexes(panel_mats)
     ]
 
     clump_size = vbsp_options.get(int, "clump_size")
@@ -2238,62 +2970,89 @@ def clump_walls():
         len(PRESET_CLUMPS),
     )
 
-    random.seed(MAP_RAND_SEED)
+    if LEGACY_TEX_RANDOM:
+        random.seed(MAP_RAND_SEED)
+        rng = random
+    else:
+        rng = seeded_rand(hash_str('CLUMP_POS'))
 
     clumps = []
 
     for _ in range(clump_numb):
         # Picking out of the map origins helps ensure at least 1 texture is
         # modded by a clump
-        pos = random.choice(possible_locs) // 128 * 128  # type: Vec
+        pos = rng.choice(possible_locs) // 128 * 128  # type: Vec
 
         pos_min = Vec()
         pos_max = Vec()
         # Clumps are long strips mainly extended in one direction
         # In the other directions extend by 'width'. It can point any axis.
-        direction = random.choice('xyz')
+        direction = rng.choice('xyz')
         for axis in 'xyz':
             if axis == direction:
                 dist = clump_size
             else:
                 dist = clump_wid
-            pos_min[axis] = pos[axis] - random.randint(0, dist) * 128
-            pos_max[axis] = pos[axis] + random.randint(0, dist) * 128
-        cur_state = random.getstate()
-        random.seed('CLUMP_TEX_' + pos_min.join() + '_' + pos_max.join(' '))
+            pos_min[axis] = pos[axis] - rng.randint(0, dist) * 128
+            pos_max[axis] = pos[axis] + rng.randint(0, dist) * 128
+        if LEGACY_TEX_RANDOM:
+            cur_state = random.getstate()
+            random.seed('CLUMP_TEX_' + pos_min.join() + '_' + pos_max.join(' '))
+            clump_seed = None
+        else:
+            clump_seed = hash_seed(
+                hash_str('CLUMP_TEX'),
+                int(pos_min.x), int(pos_min.y), int(pos_min.z),
+                int(pos_max.x), int(pos_max.y), int(pos_max.z),
+            )
         clumps.append(Clump(
             pos_min,
             pos_max,
             # For each clump, every tile gets the same texture!
             {
-                (color + '.' + size): get_tex(color + '.' + size)
+                (color + '.' + size): get_tex(color + '.' + size, clump_seed)
                 for color in ('white', 'black')
                 for size in ('wall', 'floor', 'ceiling', '2x2', '4x4')
             }
         ))
-        random.setstate(cur_state)
+        if LEGACY_TEX_RANDOM:
+            random.setstate(cur_state)
+
+    # Faces to pass to alter_mat(). If that's done in parallel they're
+    # collected and done at the end. Otherwise the unseeded textures below
+    # would change in legacy mode.
+    pending = []  # type: List[int]
+    parallel = retexture_processes() > 1
+
+    def alter_face(ind: int) -> None:
+        if parallel:
+            pending.append(ind)
+        else:
+            alter_mat(
+                faces[ind],
+                face_seed(faces[ind], origins[ind]),
+                texture_lock,
+                orients[ind],
+            )
 
     # Now modify each texture!
-    for face in VMF.iter_wfaces(world=True, detail=True):
-        if face in IGNORED_FACES:
-            continue
-
-        mat = face.mat.casefold()
+    for ind in face_table.indexes():
+        face = faces[ind]
+        mat = mats[ind]
+        orient = orients[ind]
+        origin = origins[ind]
 
         if mat == consts.Special.SQUAREBEAMS:
             # Handle squarebeam transformations
-            alter_mat(face, face_seed(face), texture_lock)
+            alter_face(ind)
             fix_squarebeams(face, rotate_edge, edge_off, edge_scale)
             continue
 
         if mat not in panel_mats:
             # Don't clump non-wall textures
-            alter_mat(face, face_seed(face), texture_lock)
+            alter_face(ind)
             continue
 
-        orient = get_face_orient(face)
-
-        origin = face.get_origin()
         # Conditions can define special clumps for items, do those first
         # so they override the normal surfaces.
         # We want to do that regardless of the clump_floor and clump_ceil
@@ -2311,7 +3070,7 @@ def clump_walls():
                 (orient is ORIENT.floor and not clump_floor) or
                 (orient is ORIENT.ceiling and not clump_ceil)):
             # Don't clump if configured not to for this orientation
-            alter_mat(face, face_seed(face), texture_lock)
+            alter_face(ind)
             continue
 
         # Clump the texture!
@@ -2322,19 +3081,26 @@ def clump_walls():
         else:
             # Not in a clump!
             # Allow using special textures for these, to fill in gaps.
+            # Legacy mode continues the sequence seeded above.
+            if LEGACY_TEX_RANDOM:
+                gap_seed = None
+            else:
+                gap_seed = face_seed(face, origin)
             orig_mat = mat
             if mat in consts.WhitePan:
-                face.mat = get_tex("special.white_gap")
+                face.mat = get_tex("special.white_gap", gap_seed)
                 if not face.mat:
                     face.mat = orig_mat
-                    alter_mat(face, texture_lock=texture_lock)
+                    alter_mat(face, gap_seed, texture_lock, orient)
             elif mat in consts.BlackPan:
-                face.mat = get_tex("special.black_gap")
+                face.mat = get_tex("special.black_gap", gap_seed)
                 if not face.mat:
                     face.mat = orig_mat
-                    alter_mat(face, texture_lock=texture_lock)
+                    alter_mat(face, gap_seed, texture_lock, orient)
             else:
-                alter_mat(face, texture_lock=texture_lock)
+                alter_mat(face, gap_seed, texture_lock, orient)
+
+    retexture_faces(face_table, pending, texture_lock)
 
 
 def get_face_orient(face):
@@ -2350,20 +3116,21 @@ def get_face_orient(face):
     return ORIENT.wall
 
 
-def broken_antline_iter(dist, max_step, chance):
+def broken_antline_iter(dist, max_step, chance, rng=random):
     """Iterator used in set_antline_mat().
 
     This produces min,max pairs which fill the space from 0-dist.
     Their width is random, from 1-max_step.
     Neighbouring sections will be merged when they have the same type.
+    rng is the random module or a SeededRand to use.
     """
     last_val = next_val = 0
-    last_type = random.randrange(100) < chance
+    last_type = rng.randrange(100) < chance
 
     while True:
-        is_broken = (random.randrange(100) < chance)
+        is_broken = (rng.randrange(100) < chance)
 
-        next_val += random.randint(1, max_step)
+        next_val += rng.randint(1, max_step)
 
         if next_val >= dist:
             # We hit the end - make sure we don't overstep.
@@ -2406,7 +3173,14 @@ def set_antline_mat(
     broken and broken_floor are the textures used for the broken lights.
     """
     # Choose a random one
-    random.seed(over['origin'])
+    if LEGACY_TEX_RANDOM:
+        random.seed(over['origin'])
+        seed = None
+        rng = random
+    else:
+        seed = hash_seed(hash_str(over['origin']))
+        # broken_antline_iter() needs a full random sequence.
+        rng = SeededRand(seed)
 
     if broken_chance and any(broken):  # We can have `broken` antlines.
         bbox_min, bbox_max = VLib.overlay_bounds(over)
@@ -2416,7 +3190,7 @@ def set_antline_mat(
 
         # It's a corner or short antline - replace instead of adding more
         if length // 16 < broken_dist:
-            if random.randrange(100) < broken_chance:
+            if rng.randrange(100) < broken_chance:
                 mats = broken
                 floor_mats = broken_floor
         else:
@@ -2427,6 +3201,7 @@ def set_antline_mat(
                 length // 16,
                 broken_dist,
                 broken_chance,
+                rng,
             )
             for sect_min, sect_max, is_broken in broken_iter:
 
@@ -2440,6 +3215,7 @@ def set_antline_mat(
                 # Make a section - base it off the original, and shrink it
                 new_over = over.copy()
                 VMF.add_ent(new_over)
+                conditions.index_overlay(new_over)
                 # Make sure we don't restyle this twice.
                 IGNORED_OVERLAYS.add(new_over)
 
@@ -2465,7 +3241,7 @@ def set_antline_mat(
                 # Recurse to allow having values in the material value
                 set_antline_mat(new_over, tex, floor_tex, broken_chance=0)
             # Remove the original overlay
-            VMF.remove_ent(over)
+            conditions.OVERLAYS.remove(over)
 
     if any(floor_mats):  # Ensure there's actually a value
         # For P1 style, check to see if the antline is on the floor or
@@ -2473,7 +3249,7 @@ def set_antline_mat(
         if Vec.from_str(over['basisNormal']).z != 0:
             mats = floor_mats
 
-    mat = random.choice(mats).split('|')
+    mat = rand_choice(mats, seed).split('|')
     opts = []
 
     if len(mat) == 2:
@@ -2490,6 +3266,8 @@ def set_antline_mat(
         # If specified, remove the targetname so the overlay
         # becomes static.
         del over['targetname']
+    # Update the index for the new material.
+    conditions.index_overlay(over)
 
 
 def change_overlays():
@@ -2521,26 +3299,29 @@ def change_overlays():
     broken_chance = vbsp_options.get(float, 'broken_antline_chance')
     broken_dist = vbsp_options.get(int, 'broken_antline_distance')
 
-    for over in VMF.by_class['info_overlay']:
+    overlays = conditions.OVERLAYS
+    # Overlays added by us, or conditions are in IGNORED_OVERLAYS.
+    # These are styled aleady, don't touch them.
+
+    for over in (
+        overlays.named('exitdoor_stickman') +
+        overlays.named('exitdoor_arrow')
+    ):
         if over in IGNORED_OVERLAYS:
-            # Overlays added by us, or conditions. These are styled aleady,
-            # don't touch them.
             continue
+        if vbsp_options.get(bool, "remove_exit_signs"):
+            # Some styles have instance-based ones, remove the
+            # originals if needed to ensure it looks nice.
+            overlays.remove(over)
+        else:
+            # blank the targetname, so we don't get the
+            # useless info_overlay_accessors for these signs.
+            del over['targetname']
 
-        if (over['targetname'] == 'exitdoor_stickman' or
-                over['targetname'] == 'exitdoor_arrow'):
-            if vbsp_options.get(bool, "remove_exit_signs"):
-                # Some styles have instance-based ones, remove the
-                # originals if needed to ensure it looks nice.
-                VMF.remove_ent(over)
-                continue  # Break out, to make sure the instance isn't added
-            else:
-                # blank the targetname, so we don't get the
-                # useless info_overlay_accessors for these signs.
-                del over['targetname']
-
+    for over in overlays.with_mats(*consts.Signage):
+        if over in IGNORED_OVERLAYS:
+            continue
         case_mat = over['material'].casefold()
-
         if case_mat in consts.Signage:
             sign_type = TEX_VALVE[case_mat]
             if sign_inst is not None:
@@ -2558,7 +3339,8 @@ def change_overlays():
             # instances.
             del over['targetname']
 
-            over['material'] = get_tex(sign_type)
+            over['material'] = get_tex(sign_type, tex_seed(over['origin']))
+            conditions.index_overlay(over)
             if sign_size != 16:
                 # Resize the signage overlays
                 # These are the 4 vertex locations
@@ -2568,6 +3350,14 @@ def change_overlays():
                     val /= 16
                     val *= sign_size
                     over[prop] = val.join(' ')
+
+    for over in overlays.with_mats(
+        consts.Antlines.STRAIGHT,
+        consts.Antlines.CORNER,
+    ):
+        if over in IGNORED_OVERLAYS:
+            continue
+        case_mat = over['material'].casefold()
         if case_mat == consts.Antlines.STRAIGHT:
             set_antline_mat(
                 over,
@@ -2769,7 +3559,7 @@ def change_func_brush():
         for orient in ('floor', 'wall', 'ceiling')
     ))
 
-    if get_tex('special.edge_special') == '':
+    if settings['textures']['special.edge_special'] == ['']:
         edge_tex = 'special.edge'
         rotate_edge = vbsp_options.get(bool, 'rotate_edge')
         edge_off = vbsp_options.get(bool, 'reset_edge_off')
@@ -2780,8 +3570,8 @@ def change_func_brush():
         edge_off = vbsp_options.get(bool, 'reset_edge_off_special')
         edge_scale = vbsp_options.get(float, 'edge_scale_special')
 
-    # TODO: Merge nearby grating brushes
-    # Clips are shared every 512 grid spaces
+    # Nearby grating brushes and clips are combined later,
+    # by merge_brush_ents().
 
     # This needs to be a func_brush, otherwise the clip texture data will be
     # merged with other clips.
@@ -2824,7 +3614,7 @@ def change_func_brush():
                 continue
 
             if side.mat == consts.Special.SQUAREBEAMS:
-                side.mat = get_tex(edge_tex)
+                side.mat = get_tex(edge_tex, tex_seed(side.get_origin()))
                 fix_squarebeams(
                     side,
                     rotate_edge,
@@ -2969,12 +3759,13 @@ def set_special_mat(face, side_type):
     # or fallback to regular textures
     rep_texture = 'special.' + side_type
     orient = get_face_orient(face)
-    if orient is ORIENT.wall and get_tex(rep_texture + '_wall'):
-        face.mat = get_tex(rep_texture + '_wall')
-    elif get_tex(rep_texture):
-        face.mat = get_tex(rep_texture)
-    elif not alter_mat(face):
-        face.mat = get_tex(side_type + '.' + str(orient))
+    seed = tex_seed(face.get_origin())
+    if orient is ORIENT.wall and get_tex(rep_texture + '_wall', seed):
+        face.mat = get_tex(rep_texture + '_wall', seed)
+    elif get_tex(rep_texture, seed):
+        face.mat = get_tex(rep_texture, seed)
+    elif not alter_mat(face, seed, orient=orient):
+        face.mat = get_tex(side_type + '.' + str(orient), seed)
 
 
 def make_static_pan(ent, pan_type, is_bullseye=False):
@@ -3139,62 +3930,58 @@ def make_packlist(map_path):
     pack_triggers = settings['packtrigger']
 
     if pack_triggers:
-        def face_iter():
-            """Check all these locations for the target textures."""
-            # We need the iterator to allow breaking out of the loop.
-            for face in VMF.iter_wfaces():
-                yield face.mat.casefold()
-            for ent in (
-                VMF.by_class['func_brush'] |
-                VMF.by_class['func_door_rotating'] |
-                VMF.by_class['trigger_portal_cleanser']
-                    ):
-                for side in ent.sides():
-                    yield side.mat.casefold()
-
-            for overlay in VMF.by_class['info_overlay']:
-                # Check overlays too
-                yield overlay['material', ''].casefold()
-
-        for mat in face_iter():
+        # Collect each distinct material first, so only those need to be
+        # casefolded and checked.
+        used_mats = {face.mat for face in VMF.iter_wfaces()}
+        for ent in (
+            VMF.by_class['func_brush'] |
+            VMF.by_class['func_door_rotating'] |
+            VMF.by_class['trigger_portal_cleanser']
+                ):
+            used_mats.update(side.mat for side in ent.sides())
+        # Check overlays too
+        used_mats.update(
+            overlay['material', '']
+            for overlay in VMF.by_class['info_overlay']
+        )
+
+        for mat in {consts.mat_info(mat).name for mat in used_mats}:
             if mat in pack_triggers:
                 TO_PACK.update(pack_triggers[mat])
-                del pack_triggers[mat]
-                if not pack_triggers:
-                    break  # No more left
-
-    if not TO_PACK and not PACK_FILES:
-        # Nothing to pack - wipe the packfile!
-        open(map_path[:-4] + '.filelist.txt', 'w').close()
 
     LOGGER.info('Making Pack list...')
 
-    with open('bee2/pack_list.cfg') as f:
-        props = Property.parse(
-            f,
-            'bee2/pack_list.cfg'
-        ).find_key('PackList', [])
+    if TO_PACK:
+        with open('bee2/pack_list.cfg') as f:
+            props = Property.parse(
+                f,
+                'bee2/pack_list.cfg'
+            ).find_key('PackList', [])
+
+        for pack_id in TO_PACK:
+            try:
+                files = props[pack_id]
+            except IndexError:
+                LOGGER.warning('Packlist "{}" does not exist!', pack_id.upper())
+                continue
 
-    for pack_id in TO_PACK:
-        try:
-            files = props[pack_id]
-        except IndexError:
-            LOGGER.warning('Packlist "{}" does not exist!', pack_id.upper())
-            continue
+            PACK_FILES.update(
+                prop.value
+                for prop in
+                files
+            )
 
-        PACK_FILES.update(
-            prop.value
-            for prop in
-            files
-        )
+    lines = []
+    for file in sorted(PACK_FILES):
+        lines.append(file + '\n')
+        LOGGER.info('"{}"', file)
+    for dest, file in sorted(PACK_RENAME.items()):
+        lines.append('{}\t{}\n'.format(file, dest))
+        LOGGER.info('"{}" as "{}"', file, dest)
 
+    # If there's nothing to pack, this wipes the old list.
     with open(map_path[:-4] + '.filelist.txt', 'w') as f:
-        for file in sorted(PACK_FILES):
-            f.write(file + '\n')
-            LOGGER.info('"{}"', file)
-        for dest, file in sorted(PACK_RENAME.items()):
-            f.write('{}\t{}\n'.format(file, dest))
-            LOGGER.info('"{}" as "{}"', file, dest)
+        f.write(''.join(lines))
 
     LOGGER.info('Packlist written!')
 
@@ -3291,6 +4078,7 @@ def run_vbsp(vbsp_args, path, new_path=None):
     path is the original .vmf, new_path is the styled/ name.
     If new_path is passed VBSP will be run on the map in styled/, and we'll
     read through the output to find the entity counts.
+    The lines of VBSP's output with the entity counts are returned.
     """
 
     is_peti = new_path is not None
@@ -3342,31 +4130,38 @@ def run_vbsp(vbsp_args, path, new_path=None):
     # Use a special name for VBSP's output..
     vbsp_logger = utils.getLogger('valve.VBSP', alias='<Valve>')
 
+    # Only keep the lines we need, not the whole log.
+    counts = dict(DEFAULT_COUNTS)
+    kept_lines = []
+
+    def check_line(line: bytes):
+        """Parse the counts as VBSP prints them."""
+        if parse_count_line(line, counts) or b'MAX_MAP_' in line:
+            kept_lines.append(line)
+
     LOGGER.info("Calling original VBSP...")
     LOGGER.info("Arguments: {}", arg)
-    try:
-        output = subprocess.check_output(
-            arg,
-            stderr=subprocess.PIPE,
-            shell=True,
-        )
-    except subprocess.CalledProcessError as err:
-        # VBSP didn't suceed. Print the error log..
-        vbsp_logger.error(err.output.decode('ascii'))
+    code = tool_output.run(
+        arg,
+        vbsp_logger,
+        on_line=check_line,
+        on_progress=tool_output.log_progress(vbsp_logger),
+    )
+    output = b'\n'.join(kept_lines)
 
+    if code != 0:
+        # VBSP didn't suceed.
         if is_peti:  # Ignore Hammer maps
-            process_vbsp_fail(err.output)
+            process_vbsp_fail(output)
 
-        LOGGER.error("VBSP failed! ({})", err.returncode)
+        LOGGER.error("VBSP failed! ({})", code)
         # Propagate the fail code to Portal 2.
-        sys.exit(err.returncode)
+        sys.exit(code)
 
-    # Print output
-    vbsp_logger.info(output.decode('ascii'))
     LOGGER.info("VBSP Done!")
 
     if is_peti:  # Ignore Hammer maps
-        process_vbsp_log(output)
+        save_counts(counts)
 
     # Copy over the real files so vvis/vrad can read them
         for ext in (".bsp", ".log", ".prt"):
@@ -3376,52 +4171,68 @@ def run_vbsp(vbsp_args, path, new_path=None):
                     path.replace(".vmf", ext),
                 )
 
+    return output
+
+
+# The output is something like this:
+# nummapplanes:     (?? / 65536)
+# nummapbrushes:    (?? / 8192)
+# nummapbrushsides: (?? / 65536)
+# num_map_overlays: (?? / 512)
+# nummodels:        (?? / 1024)
+# num_entities:     (?? / 16384)
+VBSP_COUNTS = [
+    # VBSP values -> config names
+    (b'nummapbrushes:', 'brush'),
+    (b'num_map_overlays:', 'overlay'),
+    (b'num_entities:', 'entity'),
+]
+# The other options rarely hit the limits, so we don't track them.
 
-def process_vbsp_log(output: bytes):
-    """Read through VBSP's log, extracting entity counts.
+DEFAULT_COUNTS = {
+    'brush': ('0', '8192'),
+    'overlay': ('0', '512'),
+    'entity': ('0', '2048'),
+}
 
-    This is then passed back to the main BEE2 application for display.
+
+def parse_count_line(line: bytes, counts: Dict[str, Tuple[str, str]]) -> bool:
+    """If this line of VBSP's log is one of the counts, store it in counts.
+
+    This returns True if the line was a count.
     """
+    line = line.lstrip()
+    for name, conf in VBSP_COUNTS:
+        if not line.startswith(name):
+            continue
+        # Grab the value from ( onwards
+        fraction = line.split(b'(', 1)[1]
+        # Grab the two numbers, convert to ascii and strip
+        # whitespace.
+        count_num, count_max = fraction.split(b'/')
+        counts[conf] = (
+            count_num.strip(b' \t\n').decode('ascii'),
+            # Strip the ending ) off the max. We have the value, so
+            # we might as well tell the BEE2 if it changes..
+            count_max.strip(b') \t\n').decode('ascii')
+        )
+        return True
+    return False
 
-    # The output is something like this:
-    # nummapplanes:     (?? / 65536)
-    # nummapbrushes:    (?? / 8192)
-    # nummapbrushsides: (?? / 65536)
-    # num_map_overlays: (?? / 512)
-    # nummodels:        (?? / 1024)
-    # num_entities:     (?? / 16384)
-
-    desired_vals = [
-        # VBSP values -> config names
-        (b'nummapbrushes:', 'brush'),
-        (b'num_map_overlays:', 'overlay'),
-        (b'num_entities:', 'entity'),
-    ]
-    # The other options rarely hit the limits, so we don't track them.
 
-    counts = {
-        'brush': ('0', '8192'),
-        'overlay': ('0', '512'),
-        'entity': ('0', '2048'),
-    }
+def process_vbsp_log(output: bytes):
+    """Read through VBSP's log, extracting entity counts.
 
+    This is then passed back to the main BEE2 application for display.
+    """
+    counts = dict(DEFAULT_COUNTS)
     for line in output.splitlines():
-        line = line.lstrip()
-        for name, conf in desired_vals:
-            if not line.startswith(name):
-                continue
-            # Grab the value from ( onwards
-            fraction = line.split(b'(', 1)[1]
-            # Grab the two numbers, convert to ascii and strip
-            # whitespace.
-            count_num, count_max = fraction.split(b'/')
-            counts[conf] = (
-                count_num.strip(b' \t\n').decode('ascii'),
-                # Strip the ending ) off the max. We have the value, so
-                # we might as well tell the BEE2 if it changes..
-                count_max.strip(b') \t\n').decode('ascii')
-            )
+        parse_count_line(line, counts)
+    save_counts(counts)
+
 
+def save_counts(counts: Dict[str, Tuple[str, str]]):
+    """Pass the entity counts back to the main BEE2 application."""
     LOGGER.info('Retrieved counts: {}', counts)
     count_section = BEE2_config['Counts']
     for count_name, (value, limit) in counts.items():
@@ -3465,11 +4276,110 @@ def process_vbsp_fail(output: bytes):
     BEE2_config.save_check()
 
 
+class PhaseTimer:
+    """Records how long each step of the map conversion takes."""
+    def __init__(self) -> None:
+        self.times = []  # type: List[Tuple[str, float]]
+
+    @contextmanager
+    def __call__(self, name: str):
+        """Time the code inside the with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times.append((name, time.perf_counter() - start))
+
+
+def convert_map(path: str, new_path: str) -> List[Tuple[str, float]]:
+    """Load the PeTI map at path, restyle it and save it to new_path.
+
+    This returns the time taken by each step.
+    """
+    global MAP_RAND_SEED, MAP_SEED_HASH, LEGACY_TEX_RANDOM
+    timer = PhaseTimer()
+
+    with timer('load_settings'):
+        load_settings_if_changed()
+
+    with timer('load_map'):
+        load_map(path)
+    with timer('compact_map'):
+        compact_map()
+    with timer('set_traits'):
+        instance_traits.set_traits(VMF)
+
+    with timer('calc_connections'):
+        # Requires instance traits!
+        connections.calc_connections(
+            VMF,
+            settings['textures']['overlay.shapeframe'],
+            settings['style_vars']['enableshapesignageframe'],
+        )
+
+    with timer('map_info'):
+        MAP_RAND_SEED = calc_rand_seed()
+        MAP_SEED_HASH = hash_str(MAP_RAND_SEED)
+        LEGACY_TEX_RANDOM = vbsp_options.get(bool, 'legacy_tex_random')
+
+        all_inst = get_map_info()
+
+        brushLoc.POS.read_from_map(VMF, settings['has_attr'])
+
+    with timer('conditions'):
+        seed_random()
+        conditions.init(
+            seed=MAP_RAND_SEED,
+            inst_list=all_inst,
+            vmf_file=VMF,
+        )
+
+        alter_flip_panel()  # Must be done before conditions!
+        conditions.check_all()
+    with timer('extra_ents'):
+        seed_random()
+        add_extra_ents(mode=GAME_MODE)
+        change_ents()
+
+    with timer('change_brush'):
+        seed_random()
+        fixup_goo_sides()  # Must be done before change_brush()!
+        change_brush()
+    with timer('change_overlays'):
+        seed_random()
+        change_overlays()
+    with timer('change_brush_ents'):
+        seed_random()
+        change_trig()
+        collapse_goo_trig()
+        change_func_brush()
+    with timer('cleanup'):
+        remove_static_ind_toggles()
+        remove_barrier_ents()
+        fix_worldspawn()
+    with timer('merge_brush_ents'):
+        ents_removed = merge_brush_ents()
+    with timer('simplify_world'):
+        sides_removed = simplify_world_brushes()
+    LOGGER.info(
+        'Brush merging saved {} entities and {} brush sides.',
+        ents_removed,
+        sides_removed,
+    )
+
+    with timer('packlist'):
+        make_packlist(path)
+
+    with timer('save'):
+        save(new_path)
+
+    return timer.times
+
+
 def main():
     """Main program code.
 
     """
-    global MAP_RAND_SEED, IS_PREVIEW, GAME_MODE
     LOGGER.info("BEE{} VBSP hook initiallised.", utils.BEE_VERSION)
 
     conditions.import_conditions()  # Import all the conditions and
@@ -3478,6 +4388,8 @@ def main():
     if 'BEE2_WIKI_OPT_LOC' in os.environ:
         # Special override - generate docs for the BEE2 wiki.
         LOGGER.info('Writing Wiki text...')
+        # We need every module to document them.
+        conditions.import_conditions(lazy=False)
         with open(os.environ['BEE2_WIKI_OPT_LOC'], 'w') as f:
             vbsp_options.dump_info(f)
         with open(os.environ['BEE2_WIKI_COND_LOC'], 'w') as f:
@@ -3571,61 +4483,86 @@ def main():
             vbsp_args=old_args,
             path=path,
         )
+        # We always need to do this - VRAD can't easily determine if the map
+        # is a Hammer one.
+        make_vrad_config(is_peti=False)
     else:
         LOGGER.info("PeTI map detected!")
 
-        LOGGER.info("Loading settings...")
-        load_settings()
-
-        load_map(path)
-        instance_traits.set_traits(VMF)
-
-        # Requires instance traits!
-        connections.calc_connections(
-            VMF,
-            settings['textures']['overlay.shapeframe'],
-            settings['style_vars']['enableshapesignageframe'],
-        )
-
-        MAP_RAND_SEED = calc_rand_seed()
-
-        all_inst = get_map_info()
-
-        brushLoc.POS.read_from_map(VMF, settings['has_attr'])
-
-        conditions.init(
-            seed=MAP_RAND_SEED,
-            inst_list=all_inst,
-            vmf_file=VMF,
+        load_settings_if_changed()
+        cache = compile_cache.CompileCache(
+            'bee2/compile_cache/',
+            vbsp_options.get(int, 'compile_cache_size') * 2**20,
         )
+        cache_key = None
+        vbsp_output = None
+        if cache.enabled:
+            # The map seed is calculated from the map, so that's included.
+            cache_key = compile_cache.make_key(
+                [
+                    path,
+                    'bee2/vbsp_config.cfg',
+                    'bee2/instances.cfg',
+                    'bee2/pack_list.cfg',
+                    template_brush.TEMPLATE_LOCATION,
+                ],
+                [
+                    utils.BEE_VERSION,
+                    ' '.join(new_args),
+                    # The counts are written by us, after each compile.
+                    compile_cache.hash_config(BEE2_config, skip={'Counts'}),
+                    compile_cache.hash_config(vbsp_options.ITEM_CONFIG),
+                ],
+            )
+            vbsp_output = cache.restore(cache_key)
 
-        alter_flip_panel()  # Must be done before conditions!
-        conditions.check_all()
-        add_extra_ents(mode=GAME_MODE)
-
-        change_ents()
-        fixup_goo_sides()  # Must be done before change_brush()!
-        change_brush()
-        change_overlays()
-        change_trig()
-        collapse_goo_trig()
-        change_func_brush()
-        remove_static_ind_toggles()
-        remove_barrier_ents()
-        fix_worldspawn()
-
-        make_packlist(path)
-
-        save(new_path)
-        run_vbsp(
-            vbsp_args=new_args,
-            path=path,
-            new_path=new_path,
-        )
+        if vbsp_output is not None:
+            LOGGER.info('Map unchanged, using cached compile!')
+            process_vbsp_log(vbsp_output)
+        else:
+            phase_times = convert_map(path, new_path)
+            LOGGER.info('Conversion times: {}', ', '.join(
+                '{}={:.3f}s'.format(name, dur)
+                for name, dur in phase_times
+            ))
+
+            vbsp_output = run_vbsp(
+                vbsp_args=new_args,
+                path=path,
+                new_path=new_path,
+            )
+            make_vrad_config(is_peti=True)
+
+            if cache_key is not None:
+                cached_files = [
+                    new_path,
+                    path[:-4] + '.filelist.txt',
+                    'bee2/vrad_config.cfg',
+                ]
+                for ext in (".bsp", ".log", ".prt"):
+                    cached_files.append(new_path.replace(".vmf", ext))
+                    cached_files.append(path.replace(".vmf", ext))
+                try:
+                    inject_files = os.listdir('bee2/inject')
+                except OSError:
+                    # Something else removed it, we can't tell what to cache.
+                    LOGGER.warning(
+                        'Could not read bee2/inject/, not caching compile!',
+                        exc_info=True,
+                    )
+                else:
+                    cached_files += [
+                        os.path.join('bee2', 'inject', file)
+                        for file in inject_files
+                    ]
+                    cache.store(cache_key, cached_files, vbsp_output)
+
+        if vbsp_options.get(bool, 'compile_server'):
+            # Keep the compiler loaded for the next compile.
+            # Imported here, since it's not needed to compile.
+            import compile_server
+            compile_server.ensure_running()
 
-    # We always need to do this - VRAD can't easily determine if the map is
-    # a Hammer one.
-    make_vrad_config(is_peti=not is_hammer)
     LOGGER.info("BEE2 VBSP hook finished!")
 
 
@@ -1,7 +1,24 @@
 """If run as the main script, a module will be imported twice.
 
-This just redirects to stop that.
+This just redirects to stop that. If the compile server is running, the
+compile is sent there instead, which skips loading everything again.
 """
-import vbsp
+import sys
+import os.path
+import multiprocessing
 
-vbsp.main()
+# Processes used to retexture the map import this module again.
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+
+    # This is compile_server.SERVER_FILE, which only exists if the
+    # compile_server option has started one. Otherwise don't import it.
+    if os.path.isfile('bee2/compile_server.txt'):
+        import compile_server
+        code = compile_server.run_remote('vbsp', sys.argv)
+        if code is not None:
+            sys.exit(code)
+
+    import vbsp
+
+    vbsp.main()
@@ -292,6 +292,20 @@ DEFAULTS = [
     Opt('force_brush_reflect', False,
         """Force fast reflections on func_brushes.
         """),
+    Opt('simplify_world_brushes', False,
+        """Merge world brushes into larger boxes where it doesn't change
+        the map.
+
+        This reduces the number of brushes VBSP and VVIS need to handle.
+        """),
+    Opt('brush_ent_merge_size', 0,
+        """Combine identical brush entities within cubes of this size.
+
+        This applies to func_brush, func_clip_vphysics, func_illusionary,
+        func_noportal_volume, trigger_hurt and trigger_multiple entities
+        without a name, parent or outputs. 512 is a good size. This is
+        disabled (0) by default.
+        """),
 
     Opt('flip_sound_start', "World.a3JumpIntroRotatingPanelTravel",
         """Set the starting sound for Flip Panel brushes.
@@ -423,6 +437,21 @@ DEFAULTS = [
         """Number of blocks between beams.
         """),
 
+    Opt('legacy_tex_random', False,
+        """Reseed the random generator for each surface and condition like
+        older versions.
+
+        This is slower, but gives exactly the same textures and random
+        results as before. Otherwise textures are picked by hashing each
+        tile's position, and conditions each get a separate generator.
+        """),
+
+    Opt('retexture_processes', 0,
+        """Use this many processes to pick tile textures on large maps.
+
+        This has no effect if `legacy_tex_random` is enabled.
+        """),
+
     Opt('clump_wall_tex', False,
         """Use the clumping wall algorithm.
 
@@ -483,6 +512,20 @@ DEFAULTS = [
         """Location of the model changer instance (if used).
         """),
 
+    Opt('compile_cache_size', 256,
+        """The size of the compile cache, in megabytes.
+
+        If a map is compiled again without any changes, the results are
+        reused instead of compiling again. Set to 0 to disable.
+        """),
+
+    Opt('compile_server', False,
+        """Keep a compile server running after the first compile.
+
+        This holds the compiler and configs in memory, so later compiles
+        start faster. It quits after an hour without any compiles.
+        """),
+
     ######
     # The following are set by the BEE2.4 app automatically:
 
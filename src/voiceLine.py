@@ -1,7 +1,6 @@
 # coding=utf-8
 import itertools
 import os
-import random
 from collections import namedtuple
 from decimal import Decimal
 
@@ -528,24 +527,30 @@ def add_voice(
                 chosen = possible_quotes[0].lines
             else:
                 # Chose one of the quote blocks..
-                random.seed('{}-VOICE_QUOTE_{}'.format(
-                    map_seed,
-                    len(possible_quotes),
-                ))
-                chosen = random.choice(possible_quotes).lines
+                chosen = conditions.rand(
+                    '{}-VOICE_QUOTE_{}'.format(
+                        map_seed,
+                        len(possible_quotes),
+                    ),
+                    'voice_quote', len(possible_quotes),
+                ).choice(possible_quotes).lines
 
             # Join the IDs for
             # the voice lines to the map seed,
             # so each quote block will chose different lines.
-            random.seed(map_seed + '-VOICE_LINE_' + '|'.join(
+            line_ids = '|'.join(
                 prop['id', 'ID']
                 for prop in
                 chosen
-            ))
+            )
+            line_rand = conditions.rand(
+                map_seed + '-VOICE_LINE_' + line_ids,
+                'voice_line', line_ids,
+            )
 
             # Add one of the associated quotes
             add_quote(
-                random.choice(chosen),
+                line_rand.choice(chosen),
                 quote_targetname,
                 choreo_loc,
                 use_dings,
@@ -581,8 +586,8 @@ def add_voice(
             )
 
     LOGGER.info('{} Mid quotes', len(mid_quotes))
-    for mid_lines in mid_quotes:
-        line = random.choice(mid_lines)
+    for ind, mid_lines in enumerate(mid_quotes):
+        line = conditions.rand(None, 'voice_mid', ind).choice(mid_lines)
         mid_item, use_ding, mid_name = line
         add_quote(mid_item, mid_name, quote_loc, use_ding)
 
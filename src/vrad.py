@@ -1,7 +1,6 @@
 import os
 import os.path
 import shutil
-import subprocess
 import sys
 import logging
 from datetime import datetime
@@ -9,6 +8,7 @@ from io import BytesIO
 from zipfile import ZipFile
 
 import srctools
+import tool_output
 import utils
 from srctools import Property
 from srctools.bsp import BSP, BSP_LUMPS
@@ -888,13 +888,15 @@ def run_vrad(args):
             for x in args
         )
     )
+    # Use a special name for VRAD's output..
+    vrad_logger = utils.getLogger('valve.VRAD', alias='<Valve>')
+
     LOGGER.info("Calling original VRAD...")
     LOGGER.info(joined_args)
-    code = subprocess.call(
+    code = tool_output.run(
         joined_args,
-        stdout=None,
-        stderr=subprocess.PIPE,
-        shell=True,
+        vrad_logger,
+        on_progress=tool_output.log_progress(vrad_logger),
     )
     if code == 0:
         LOGGER.info("Done!")
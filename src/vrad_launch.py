@@ -0,0 +1,15 @@
+"""Launch the VRAD hook, using the compile server if it is running."""
+import sys
+import os.path
+
+# This is compile_server.SERVER_FILE, which only exists if the
+# compile_server option has started one. Otherwise don't import it.
+if os.path.isfile('bee2/compile_server.txt'):
+    import compile_server
+    code = compile_server.run_remote('vrad', sys.argv)
+    if code is not None:
+        sys.exit(code)
+
+import vrad
+
+vrad.main(sys.argv)
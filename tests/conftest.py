@@ -0,0 +1,14 @@
+"""Shared setup for the tests.
+
+Run with 'python -m pytest tests' from the repository root.
+"""
+import os
+import sys
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.normpath(SRC))
+
+# The compilers write logs relative to the working directory (the game's bin/
+# folder normally), as soon as they're imported. Keep those out of the tree.
+os.chdir(tempfile.mkdtemp(prefix='bee2_tests_'))
@@ -0,0 +1,118 @@
+"""Test the keys and pruning of the compile cache."""
+import os
+from configparser import ConfigParser
+
+import compile_cache
+from compile_cache import CompileCache, hash_config, make_key
+
+
+def make_config(text: str) -> ConfigParser:
+    conf = ConfigParser()
+    conf.read_string(text)
+    return conf
+
+
+def test_hash_config() -> None:
+    """Only the values matter, not the order or skipped sections."""
+    conf = make_config('[General]\na = 1\nb = 2\n[Screenshot]\ntype = AUTO\n')
+    assert hash_config(None) == ''
+    assert hash_config(conf) == hash_config(make_config(
+        '[Screenshot]\ntype = AUTO\n[General]\nb = 2\na = 1\n'
+    ))
+    assert hash_config(conf) != hash_config(make_config(
+        '[General]\na = 1\nb = 3\n[Screenshot]\ntype = AUTO\n'
+    ))
+    assert hash_config(conf, {'Screenshot'}) == hash_config(
+        make_config('[General]\na = 1\nb = 2\n'),
+    )
+    # Keys can't move between sections without changing the hash.
+    assert hash_config(make_config('[A]\nx = 1\n[B]\n')) != hash_config(
+        make_config('[A]\n[B]\nx = 1\n'),
+    )
+
+
+def test_make_key(tmpdir) -> None:
+    """The key depends on the file names, contents and extra values."""
+    first = str(tmpdir.join('first.vmf'))
+    second = str(tmpdir.join('second.vmf'))
+    missing = str(tmpdir.join('missing.vmf'))
+    with open(first, 'wb') as f:
+        f.write(b'versioninfo {}')
+    with open(second, 'wb') as f:
+        f.write(b'')
+
+    key = make_key([first, second], ['extra'])
+    assert key == make_key([first, second], ['extra'])
+    assert len(key) == 40
+    assert key != make_key([second, first], ['extra'])
+    assert key != make_key([first, second], ['other'])
+    assert key != make_key([first, second])
+    # Missing and empty files differ.
+    assert make_key([second]) != make_key([missing])
+    # The file boundaries are included, not just the concatenated data.
+    assert make_key([first], ['ab', 'c']) != make_key([first], ['a', 'bc'])
+
+    with open(second, 'wb') as f:
+        f.write(b'changed')
+    assert key != make_key([first, second], ['extra'])
+
+
+def make_entry(folder: str, key: str, size: int, used: float=None) -> None:
+    """Create a cache entry with a file of this size."""
+    entry = os.path.join(folder, key)
+    os.makedirs(entry)
+    with open(os.path.join(entry, '0'), 'wb') as f:
+        f.write(bytes(size))
+    if used is not None:
+        manifest = os.path.join(entry, compile_cache.MANIFEST)
+        with open(manifest, 'w'):
+            pass
+        os.utime(manifest, (used, used))
+
+
+def test_evict(tmpdir) -> None:
+    """The least recently used entries are removed first."""
+    folder = str(tmpdir)
+    make_entry(folder, 'old', 100, used=1000)
+    make_entry(folder, 'new', 100, used=3000)
+    make_entry(folder, 'middle', 100, used=2000)
+    with open(os.path.join(folder, 'not_an_entry.txt'), 'wb') as f:
+        f.write(bytes(500))
+
+    CompileCache(folder, 300).evict()
+    assert sorted(os.listdir(folder)) == [
+        'middle', 'new', 'not_an_entry.txt', 'old',
+    ]
+
+    CompileCache(folder, 250).evict()
+    assert sorted(os.listdir(folder)) == ['middle', 'new', 'not_an_entry.txt']
+
+    CompileCache(folder, 100).evict()
+    assert sorted(os.listdir(folder)) == ['new', 'not_an_entry.txt']
+
+
+def test_evict_incomplete(tmpdir) -> None:
+    """Entries without a manifest are removed before any others."""
+    folder = str(tmpdir)
+    make_entry(folder, 'old', 10, used=1000)
+    make_entry(folder, 'partial.tmp', 10)
+    CompileCache(folder, 15).evict()
+    assert os.listdir(folder) == ['old']
+
+    # A missing folder is fine.
+    CompileCache(str(tmpdir.join('missing')), 10).evict()
+
+
+def test_store_restore(tmpdir) -> None:
+    """Test a cache entry round trip."""
+    cache = CompileCache(str(tmpdir.join('cache')), 1 << 20)
+    source = str(tmpdir.join('map.bsp'))
+    with open(source, 'wb') as f:
+        f.write(b'bsp data')
+
+    assert cache.restore('key') is None
+    cache.store('key', [source, str(tmpdir.join('missing.log'))], b'output')
+    os.remove(source)
+    assert cache.restore('key') == b'output'
+    with open(source, 'rb') as f:
+        assert f.read() == b'bsp data'
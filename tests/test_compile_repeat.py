@@ -0,0 +1,152 @@
+"""Test that compiling the same map twice gives the same result.
+
+Each compile runs in a new process, like VBSP does, so the random module
+starts with a different state each time.
+"""
+import subprocess
+import sys
+
+import pytest
+from srctools import VMF, Vec
+
+import comp_consts as consts
+from conftest import SRC
+
+CONFIG = '''\
+"Textures"
+    {
+    "white"
+        {
+        "wall" "tile/white_wall_a"
+        "wall" "tile/white_wall_b"
+        "wall" "tile/white_wall_c"
+        "floor" "tile/white_floor_a"
+        "floor" "tile/white_floor_b"
+        }
+    "special"
+        {
+        "goo" "goo/fancy_a"
+        "goo" "goo/fancy_b"
+        "goo_cheap" "goo/cheap_a"
+        "goo_cheap" "goo/cheap_b"
+        "goo_cheap" "goo/cheap_c"
+        }
+    }
+"Options"
+    {
+    "BEE2_loc" "{app}"
+    "legacy_tex_random" "{legacy}"
+    }
+'''
+
+INSTANCES = '''\
+"AllInstances"
+    {
+    "item_entry_door"
+        {
+        "Instance" "instances/entry_corr.vmf"
+        }
+    "item_exit_door"
+        {
+        "Instance" "instances/exit_corr.vmf"
+        }
+    "item_indicator_panel"
+        {
+        "Instance" "instances/indicator_panel.vmf"
+        }
+    "item_indicator_panel_timer"
+        {
+        "Instance" "instances/indicator_panel_timer.vmf"
+        }
+    }
+"Connections"
+    {
+    "item_tbeam"
+        {
+        "input_activate" "Enable"
+        "input_deactivate" "Disable"
+        }
+    }
+'''
+
+COMPILE = '''\
+import sys
+sys.path.insert(0, sys.argv[1])
+import conditions
+import vbsp
+conditions.import_conditions()
+vbsp.convert_map('maps/test.vmf', sys.argv[2])
+'''
+
+
+def make_map() -> VMF:
+    """Make a room with tiles and goo at two heights."""
+    vmf = VMF()
+    for x in range(0, 512, 128):
+        for y in range(0, 512, 128):
+            z = 0 if x < 256 else 128
+            floor = vmf.make_prism(
+                Vec(x, y, z - 128),
+                Vec(x + 128, y + 128, z),
+                consts.Tools.NODRAW,
+            )
+            if (x + y) % 256:
+                floor.top.mat = consts.WhitePan.WHITE_FLOOR
+            else:
+                floor.top.mat = consts.Goo.REFLECTIVE
+            vmf.add_brush(floor.solid)
+
+            wall = vmf.make_prism(
+                Vec(x, -128, y),
+                Vec(x + 128, 0, y + 128),
+                consts.Tools.NODRAW,
+            )
+            wall.north.mat = consts.WhitePan.WHITE_1x1
+            vmf.add_brush(wall.solid)
+
+    # The room isn't sealed, so keep the corridors outside the grid. Otherwise
+    # the air is flood-filled everywhere.
+    for name, pos in [('entry', '-4096 0 0'), ('exit', '-4096 512 0')]:
+        vmf.create_ent(
+            classname='func_instance',
+            targetname=name,
+            file='instances/{}_corr.vmf'.format(name),
+            origin=pos,
+            angles='0 0 0',
+        ).fixup['no_player_start'] = '0'
+    return vmf
+
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_compile_twice(tmpdir, legacy: bool) -> None:
+    """Recompiling must give identical textures."""
+    tmpdir.mkdir('app')
+    tmpdir.mkdir('maps').mkdir('styled')
+    bee2 = tmpdir.mkdir('bee2')
+    bee2.join('vbsp_config.cfg').write(
+        CONFIG.replace(
+            '{app}', str(tmpdir.join('app')),
+        ).replace(
+            '{legacy}', str(int(legacy)),
+        )
+    )
+    bee2.join('instances.cfg').write(INSTANCES)
+    with open(str(bee2.join('templates.vmf')), 'w') as f:
+        VMF().export(f)
+    with open(str(tmpdir.join('maps', 'test.vmf')), 'w') as f:
+        make_map().export(f)
+
+    results = []
+    for name in ['first.vmf', 'second.vmf']:
+        subprocess.run(
+            [sys.executable, '-c', COMPILE, SRC, 'maps/styled/' + name],
+            cwd=str(tmpdir),
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        results.append(tmpdir.join('maps', 'styled', name).read())
+
+    first, second = results
+    assert 'goo/cheap_' in first
+    assert first == second
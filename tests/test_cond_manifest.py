@@ -0,0 +1,60 @@
+"""Test the manifest for importing conditions modules on demand."""
+import conditions
+
+
+def func_in(module: str):
+    """Make a function which appears to be from this module."""
+    def func():
+        pass
+    func.__module__ = module
+    return func
+
+
+def test_manifest(monkeypatch) -> None:
+    """Test the manifest for lazily importing conditions modules."""
+    flag_mod = func_in('conditions.modA')
+    res_mod = func_in('conditions.modB')
+    meta_mod = func_in('conditions.modB')
+    # Functions in the package itself are always available.
+    core = func_in('conditions')
+
+    monkeypatch.setattr(conditions, 'ALL_FLAGS', [
+        ('HasThing', ['IsThing'], flag_mod),
+        ('Core', [], core),
+    ])
+    monkeypatch.setattr(conditions, 'ALL_RESULTS', [
+        ('DoIt', ['Do'], res_mod),
+    ])
+    monkeypatch.setattr(conditions, 'ALL_SETUP', [
+        (('DoIt', 'Do'), res_mod),
+    ])
+    monkeypatch.setattr(conditions, 'ALL_META', [])
+
+    manifest = conditions.build_manifest()
+    assert manifest == 'modA:fhasthing:fisthing;modB:rdo:rdoit:sdo:sdoit'
+
+    lazy_names = {}
+    monkeypatch.setattr(conditions, '_LAZY_NAMES', lazy_names)
+    assert conditions.parse_manifest(manifest) == []
+    assert lazy_names == {
+        ('f', 'hasthing'): 'modA',
+        ('f', 'isthing'): 'modA',
+        ('r', 'do'): 'modB',
+        ('r', 'doit'): 'modB',
+        ('s', 'do'): 'modB',
+        ('s', 'doit'): 'modB',
+    }
+
+    # Modules with meta-conditions are always imported.
+    monkeypatch.setattr(conditions, 'ALL_META', [
+        ('meta', 0, meta_mod),
+    ])
+    manifest = conditions.build_manifest()
+    assert manifest == 'modA:fhasthing:fisthing;modB:*:rdo:rdoit:sdo:sdoit'
+    lazy_names.clear()
+    assert conditions.parse_manifest(manifest) == ['modB']
+    assert lazy_names == {
+        ('f', 'hasthing'): 'modA',
+        ('f', 'isthing'): 'modA',
+    }
+    assert conditions.parse_manifest('') == []
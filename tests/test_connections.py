@@ -0,0 +1,127 @@
+"""Test editing the item connection graph."""
+import pytest
+from srctools import Entity, Output, VMF
+
+import conditions
+import connections
+import instance_traits
+from connections import ConnType
+
+
+@pytest.fixture(autouse=True)
+def graph(monkeypatch) -> None:
+    """Start each test with no items."""
+    monkeypatch.setattr(connections, 'ITEMS', {})
+    monkeypatch.setattr(connections, '_CONN_PAIRS', {})
+    monkeypatch.setattr(conditions, 'CONNECTIONS', {
+        'item_tbeam': conditions.ItemConnections(
+            in_act=(None, 'Enable'),
+            in_deact=(None, 'Disable'),
+            out_act=(None, ''),
+            out_deact=(None, ''),
+        ),
+    })
+    monkeypatch.setattr(conditions, 'TBEAM_CONN_ACT', (None, 'Reverse'))
+    monkeypatch.setattr(conditions, 'TBEAM_CONN_DEACT', (None, 'Forward'))
+
+
+def make_item(vmf: VMF, name: str, *traits: str) -> connections.Item:
+    """Add an item to the map."""
+    inst = vmf.create_ent(classname='func_instance', targetname=name)
+    inst.fixup['$connectioncount'] = '0'
+    inst.fixup['$connectioncount_polarity'] = '0'
+    instance_traits.get(inst).update(traits)
+    item = connections.ITEMS[name] = connections.Item(inst)
+    return item
+
+
+def test_add_remove() -> None:
+    """Outputs between items update the connection and counts."""
+    vmf = VMF()
+    button = make_item(vmf, 'button')
+    door = make_item(vmf, 'door')
+
+    first = Output('OnPressed', 'door', 'Open')
+    second = Output('OnUnPressed', 'door', 'Close')
+    other = Output('OnPressed', 'some_ent', 'Trigger')
+    connections.add_output(button.inst, first)
+    connections.add_output(button.inst, second)
+    connections.add_output(button.inst, other)
+
+    assert button.inst.outputs == [first, second, other]
+    conn = button.connection_to(door)
+    assert conn.outputs == [first, second]
+    assert conn.type is ConnType.DEFAULT
+    assert button.output_items() == [door]
+    assert door.inputs == {conn}
+    assert door.inst.fixup.int('$connectioncount') == 1
+
+    connections.remove_output(button.inst, first)
+    assert button.connection_to(door) is conn
+    connections.remove_output(button.inst, second)
+    assert button.connection_to(door) is None
+    assert not door.inputs
+    assert door.inst.fixup.int('$connectioncount') == 0
+    assert button.inst.outputs == [other]
+
+
+def test_funnel_types() -> None:
+    """Connections to funnels are typed like calc_connections() does."""
+    vmf = VMF()
+    button = make_item(vmf, 'button')
+    lever = make_item(vmf, 'lever')
+    funnel = make_item(vmf, 'funnel', 'tbeam_emitter')
+
+    connections.add_output(button.inst, Output('OnPressed', 'funnel', 'Reverse'))
+    connections.add_output(lever.inst, Output('OnPressed', 'funnel', 'Enable'))
+
+    assert button.connection_to(funnel).type is ConnType.TBEAM_DIR
+    assert lever.connection_to(funnel).type is ConnType.TBEAM_IO
+    assert funnel.inst.fixup.int('$connectioncount') == 1
+    assert funnel.inst.fixup.int('$connectioncount_polarity') == 1
+
+
+def test_clear_outputs() -> None:
+    """Clearing outputs removes every connection from the item."""
+    vmf = VMF()
+    button = make_item(vmf, 'button')
+    door = make_item(vmf, 'door')
+    panel = make_item(vmf, 'panel')
+    connections.add_output(button.inst, Output('OnPressed', 'door', 'Open'))
+    connections.add_output(button.inst, Output('OnPressed', 'panel', 'Open'))
+    connections.add_output(door.inst, Output('OnOpen', 'panel', 'Open'))
+
+    connections.clear_outputs(button.inst)
+    assert button.inst.outputs == []
+    assert not button.outputs
+    assert not door.inputs
+    assert len(panel.inputs) == 1
+    assert panel.inst.fixup.int('$connectioncount') == 1
+
+    # Non-items just have their outputs removed.
+    ent = Entity(vmf, keys={'targetname': 'logic'})
+    ent.add_out(Output('OnTrigger', 'door', 'Open'))
+    connections.clear_outputs(ent)
+    assert ent.outputs == []
+
+
+def test_move_outputs() -> None:
+    """Moving outputs to another instance keeps the connections."""
+    vmf = VMF()
+    button = make_item(vmf, 'button')
+    door = make_item(vmf, 'door')
+    out = Output('OnPressed', 'door', 'Open')
+    connections.add_output(button.inst, out)
+
+    old_inst = button.inst
+    new_inst = vmf.create_ent(classname='func_instance', targetname='button')
+    connections.move_outputs(old_inst, new_inst)
+    assert old_inst.outputs == []
+    assert new_inst.outputs == [out]
+    assert connections.get_item(new_inst) is button
+    assert connections.get_item(old_inst) is None
+    assert door.inst.fixup.int('$connectioncount') == 1
+
+    connections.remove_output(new_inst, out)
+    assert new_inst.outputs == []
+    assert not door.inputs
@@ -0,0 +1,151 @@
+"""Test the conditions which check for goo."""
+from collections import defaultdict
+
+import pytest
+from srctools import Output, Property, Vec, VMF
+
+import conditions
+import connections
+import vbsp
+import comp_consts as consts
+from conditions import catwalks, vactubes
+
+
+@pytest.fixture
+def vmf(monkeypatch) -> VMF:
+    """Run with a blank map, and no goo or items."""
+    vmf = VMF()
+    monkeypatch.setattr(vbsp, 'VMF', vmf)
+    monkeypatch.setattr(conditions, 'VMF', vmf)
+    monkeypatch.setitem(vbsp.settings, 'has_attr', defaultdict(bool))
+    monkeypatch.setattr(connections, 'ITEMS', {})
+    monkeypatch.setattr(connections, '_CONN_PAIRS', {})
+    monkeypatch.setattr(vactubes, 'PUSH_TRIGS', {})
+    # The conditions import these by name, so they have to be cleared.
+    locs = [conditions.GOO_LOCS, conditions.GOO_FACE_LOC, conditions.SOLIDS]
+    for loc_dict in locs:
+        loc_dict.clear()
+    yield vmf
+    for loc_dict in locs:
+        loc_dict.clear()
+
+
+def add_goo(vmf: VMF, x: int, y: int, mat: str=consts.Goo.REFLECTIVE) -> None:
+    """Add a goo brush to the voxel at this position, like the PeTI does."""
+    goo = vmf.make_prism(
+        Vec(x, y, 0),
+        Vec(x + 128, y + 128, 96),
+        consts.Tools.NODRAW,
+    )
+    goo.top.mat = mat
+    vmf.add_brush(goo.solid)
+
+
+def add_marker(vmf: VMF, name: str, file: str, origin: Vec, angles: str):
+    """Add a marker item."""
+    inst = vmf.create_ent(
+        classname='func_instance',
+        targetname=name,
+        file=file,
+        origin=origin,
+        angles=angles,
+    )
+    connections.ITEMS[name] = connections.Item(inst)
+    return inst
+
+
+def instances(vmf: VMF, file: str):
+    """Return the instances with this filename."""
+    return [
+        inst
+        for inst in vmf.by_class['func_instance']
+        if inst['file'] == file
+    ]
+
+
+@pytest.mark.parametrize('mat', [consts.Goo.REFLECTIVE, consts.Goo.CHEAP])
+def test_goo_locs(vmf: VMF, mat: str) -> None:
+    """Goo brushes are recorded by their voxel position."""
+    add_goo(vmf, 128, 256, mat.upper())
+    conditions.build_solid_dict()
+
+    assert set(conditions.GOO_LOCS) == {(192, 320, 64)}
+    assert set(conditions.GOO_FACE_LOC) == {(192, 320, 96)}
+    assert vbsp.settings['has_attr']['goo']
+
+
+@pytest.mark.parametrize('support_goo', ['', 'instances/support_goo.vmf'])
+def test_catwalk_goo(vmf: VMF, support_goo: str) -> None:
+    """Catwalk markers in goo move up, and use the goo supports.
+
+    If there isn't a goo support, the floor one is used.
+    """
+    for x in [0, 128, 256]:
+        add_goo(vmf, x, 0)
+    conditions.build_solid_dict()
+
+    # Three markers in a line, all in the goo.
+    for x in [64, 192, 320]:
+        add_marker(
+            vmf,
+            'marker_{}'.format(x),
+            'instances/catwalk_marker.vmf',
+            Vec(x, 64, 64),
+            '0 0 0',
+        )
+    for start, end in [(64, 192), (192, 320)]:
+        [inst] = vmf.by_target['marker_{}'.format(start)]
+        connections.add_output(
+            inst,
+            Output('MARKER', 'marker_{}'.format(end), 'MARKER'),
+        )
+
+    catwalks.res_make_catwalk(Property('makeCatwalk', [
+        Property('markerInst', 'instances/catwalk_marker.vmf'),
+        Property('straight_128', 'instances/straight_128.vmf'),
+        Property('end', 'instances/end.vmf'),
+        Property('support_floor', 'instances/support_floor.vmf'),
+        Property('support_goo', support_goo),
+    ]))
+
+    [middle] = instances(vmf, 'instances/straight_128.vmf')
+    assert Vec.from_str(middle['origin']) == (192, 64, 192)
+    [support] = instances(vmf, support_goo or 'instances/support_floor.vmf')
+    assert Vec.from_str(support['origin']) == (192, 64, 192)
+    if support_goo:
+        assert not instances(vmf, 'instances/support_floor.vmf')
+
+
+@pytest.mark.parametrize('in_goo', [False, True])
+def test_vactube_goo(vmf: VMF, in_goo: bool) -> None:
+    """Vactubes ending in goo don't have the exit instance."""
+    if in_goo:
+        add_goo(vmf, 256, 0)
+    conditions.build_solid_dict()
+
+    group = vactubes.res_vactube_setup(Property('CustVactube', [
+        Property('group', 'test_goo'),
+        Property('Instance', [
+            Property('straight_inst', 'instances/vac_straight.vmf'),
+            Property('entry_inst', 'instances/vac_entry.vmf'),
+            Property('entry_floor_inst', 'instances/vac_entry_floor.vmf'),
+            Property('entry_ceil_inst', 'instances/vac_entry_ceil.vmf'),
+            Property('exit_inst', 'instances/vac_exit.vmf'),
+            Property('File', 'instances/vac_marker.vmf'),
+        ]),
+    ]))
+    # Both markers point east, into the goo.
+    start = add_marker(
+        vmf, 'start', 'instances/vac_marker.vmf',
+        Vec(-192, 64, 64), '0 180 0',
+    )
+    add_marker(
+        vmf, 'end', 'instances/vac_marker.vmf',
+        Vec(320, 64, 64), '0 180 0',
+    )
+    connections.add_output(start, Output('OnUse', 'end', 'Use'))
+
+    vactubes.res_make_vactubes(Property('CustVactube', group))
+
+    assert len(instances(vmf, 'instances/vac_entry.vmf')) == 1
+    assert len(instances(vmf, 'instances/vac_exit.vmf')) == (0 if in_goo else 1)
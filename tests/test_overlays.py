@@ -0,0 +1,99 @@
+"""Test looking up overlays with the OverlayIndex."""
+from srctools import VMF
+
+from conditions import OverlayIndex
+
+
+def make_overlay(vmf: VMF, mat: str, name: str='', sides: str='1'):
+    return vmf.create_ent(
+        classname='info_overlay',
+        material=mat,
+        targetname=name,
+        sides=sides,
+    )
+
+
+def test_overlay_lookup() -> None:
+    """Test looking up overlays by name and material."""
+    vmf = VMF()
+    first = make_overlay(vmf, 'signage/exit', 'sign', '1 2')
+    second = make_overlay(vmf, 'Signage/Exit', 'sign', '3')
+    other = make_overlay(vmf, 'signage/arrow', 'arrow', '2')
+    vmf.create_ent(classname='info_target', targetname='sign')
+
+    overlays = OverlayIndex()
+    overlays.build(vmf)
+
+    assert overlays.named('sign') == [first, second]
+    assert overlays.named('arrow') == [other]
+    assert overlays.named('missing') == []
+    assert overlays.with_mats('SIGNAGE/EXIT') == [first, second]
+    # Each is only produced once.
+    assert overlays.with_mats(
+        'signage/arrow', 'signage/exit', 'signage/Exit',
+    ) == [first, second, other]
+    assert overlays.by_side['2'] == {first, other}
+
+
+def test_overlay_order() -> None:
+    """Results are in ID order, not the order they were added."""
+    vmf = VMF()
+    overlays = OverlayIndex()
+    overlays.build(vmf)
+    ents = [make_overlay(vmf, 'mat', 'name') for _ in range(8)]
+    for ent in reversed(ents):
+        overlays.add(ent)
+    assert overlays.named('name') == ents
+    assert overlays.with_mats('mat') == ents
+
+
+def test_overlay_changes() -> None:
+    """Changed or removed overlays aren't returned."""
+    vmf = VMF()
+    first = make_overlay(vmf, 'signage/exit', 'sign')
+    second = make_overlay(vmf, 'signage/exit', 'sign')
+    overlays = OverlayIndex()
+    overlays.build(vmf)
+
+    second['material'] = 'signage/arrow'
+    second['targetname'] = 'arrow'
+    assert overlays.with_mats('signage/exit') == [first]
+    assert overlays.named('sign') == [first]
+    # Not indexed under the new values until it's added again.
+    assert overlays.with_mats('signage/arrow') == []
+    overlays.add(second)
+    assert overlays.with_mats('signage/arrow') == [second]
+    assert overlays.named('arrow') == [second]
+
+    overlays.remove(first)
+    assert first not in vmf.by_class['info_overlay']
+    assert overlays.with_mats('signage/exit') == []
+    assert overlays.named('sign') == []
+
+    # Removed from the map another way.
+    second.remove()
+    assert overlays.with_mats('signage/arrow') == []
+
+
+def test_remove_ant_toggle(monkeypatch) -> None:
+    """Everything with the indicator name is removed, not just overlays."""
+    import conditions
+
+    vmf = VMF()
+    overlay = make_overlay(vmf, 'signage/indicator_lights', 'ant')
+    target = vmf.create_ent(classname='info_target', targetname='ant')
+    other = make_overlay(vmf, 'signage/indicator_lights', 'other')
+    toggle = vmf.create_ent(classname='func_instance', targetname='toggle')
+    toggle.fixup['$indicator_name'] = 'ant'
+
+    overlays = OverlayIndex()
+    overlays.build(vmf)
+    monkeypatch.setattr(conditions, 'VMF', vmf)
+    monkeypatch.setattr(conditions, 'OVERLAYS', overlays)
+
+    conditions.remove_ant_toggle(toggle)
+    assert toggle not in vmf.entities
+    assert overlay not in vmf.entities
+    assert target not in vmf.entities
+    assert other in vmf.entities
+    assert overlays.named('ant') == []
@@ -0,0 +1,93 @@
+"""Test the seeded random values used to pick textures.
+
+These values decide the textures in every compiled map, so recompiling
+gives the same result. The expected values are pinned, so changes to them
+are noticed.
+"""
+import pytest
+
+import vbsp
+
+
+@pytest.fixture(autouse=True)
+def map_seed(monkeypatch):
+    """Start each test with no map seed."""
+    monkeypatch.setattr(vbsp, 'MAP_SEED_HASH', 0)
+
+
+def test_mix64() -> None:
+    """This is SplitMix64, so the first value matches its reference output."""
+    assert vbsp._mix64(0) == 0xe220a8397b1dcdaf
+    assert vbsp._mix64(1) == 0x910a2dec89025cc1
+    assert vbsp._mix64(0xFFFFFFFFFFFFFFFF) == 0xe4d971771b652c20
+
+
+def test_hash_str() -> None:
+    """hash_str() must not vary between runs, unlike hash()."""
+    assert vbsp.hash_str('') == 0xb4b2797457a0a6e4
+    assert vbsp.hash_str('special.white') == 0xaeb685c7994c17cc
+    assert vbsp.hash_str('0 0 64') == 0xd8b817efa36ba3ab
+
+
+def test_hash_seed(monkeypatch) -> None:
+    """Test combining values with the map seed."""
+    assert vbsp.hash_seed() == 0
+    assert vbsp.hash_seed(1, 2, 3) == 0xd0734750fde362b3
+    # Negative values are wrapped to 64 bits.
+    assert vbsp.hash_seed(-64, 128, 64) == 0x344e969f6bbecba1
+    assert vbsp.hash_seed(1, 2, 3) != vbsp.hash_seed(3, 2, 1)
+
+    monkeypatch.setattr(vbsp, 'MAP_SEED_HASH', vbsp.hash_str('map seed'))
+    assert vbsp.hash_seed() == vbsp.hash_str('map seed')
+    assert vbsp.hash_seed(1, 2, 3) == 0x10b86fd5fecbc724
+
+
+def test_seeded_rand() -> None:
+    """Test the sequences SeededRand produces."""
+    rand = vbsp.SeededRand(1234)
+    assert [rand.getrandbits64() for _ in range(3)] == [
+        0xe27b99a25d74237a,
+        0x348254677c2f08d0,
+        0x4087aa2819e4f1a1,
+    ]
+
+    rand = vbsp.SeededRand(1234)
+    assert rand.random() == 0.884698488368898
+    assert rand.randrange(10) == 6
+    assert rand.randrange(5, 50, 5) == 30
+    assert rand.randint(1, 6) == 6
+    assert rand.uniform(2.0, 4.0) == 2.2870123560804645
+    assert rand.choice('abcdef') == 'd'
+
+    items = list(range(10))
+    vbsp.SeededRand(99).shuffle(items)
+    assert items == [8, 2, 7, 9, 4, 5, 3, 1, 0, 6]
+
+    assert vbsp.seeded_rand(1, 2, 3).seed == vbsp.hash_seed(1, 2, 3)
+
+
+def test_seeded_rand_errors() -> None:
+    """Empty ranges and sequences raise the same errors as random."""
+    rand = vbsp.SeededRand(1)
+    with pytest.raises(ValueError):
+        rand.randrange(5, 5)
+    with pytest.raises(IndexError):
+        rand.choice([])
+
+
+def test_get_tex(monkeypatch) -> None:
+    """Seeded texture choices only depend on the seed and slot."""
+    monkeypatch.setitem(
+        vbsp.settings['textures'],
+        'special.white',
+        ['a', 'b', 'c', 'd', 'e'],
+    )
+    assert [
+        vbsp.get_tex('special.white', seed)
+        for seed in range(8)
+    ] == ['b', 'c', 'd', 'a', 'a', 'c', 'd', 'c']
+    assert vbsp.get_tex('special.white', vbsp.hash_seed(0, 0, 64)) == 'b'
+    assert vbsp.rand_choice(['a', 'b', 'c'], 5) == 'c'
+
+    with pytest.raises(Exception):
+        vbsp.get_tex('special.missing', 1)
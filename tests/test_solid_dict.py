@@ -0,0 +1,106 @@
+"""Test the grid index and queries of SolidDict."""
+from srctools import VMF, Vec, Vec_tuple
+
+import template_brush
+from conditions import SolidDict, solidGroup
+
+
+def make_group(vmf: VMF, pos: Vec, normal: Vec) -> solidGroup:
+    """Make a 128 block with a face at pos.
+
+    Like face.normal(), normal points into the block.
+    """
+    block = pos + 64 * normal
+    prism = vmf.make_prism(block - 64, block + 64)
+    [face] = [
+        face for face in prism.solid
+        if face.normal() == normal
+    ]
+    return solidGroup(
+        face=face,
+        solid=prism.solid,
+        normal=normal,
+        color=template_brush.MAT_TYPES.white,
+    )
+
+
+def test_solid_dict_index() -> None:
+    """Test that the grid cells match the dict after changes."""
+    vmf = VMF()
+    solids = SolidDict()
+    floor = Vec(0, 0, -1)
+    groups = {
+        pos: make_group(vmf, Vec(pos), floor)
+        for pos in [(64, 64, 0), (192, 64, 0), (64, 64, 128), (64, 192, 0)]
+    }
+    for pos, group in groups.items():
+        solids[pos] = group
+    assert all(
+        isinstance(key, Vec_tuple)
+        for keys in solids._cells.values()
+        for key in keys
+    )
+
+    def cell_keys():
+        return {key for keys in solids._cells.values() for key in keys}
+
+    assert cell_keys() == set(solids)
+    del solids[64, 64, 0]
+    assert cell_keys() == set(solids)
+    assert solids.pop((192, 64, 0)) is groups[192, 64, 0]
+    assert solids.pop((192, 64, 0), None) is None
+    assert cell_keys() == set(solids) == {(64, 64, 128), (64, 192, 0)}
+    # Empty cells are removed.
+    assert (0, 0, 0) not in solids._cells
+
+    solids.remove_face(groups[64, 192, 0], nodraw=True)
+    assert groups[64, 192, 0].face.mat == 'tools/toolsnodraw'
+    assert cell_keys() == set(solids) == {(64, 64, 128)}
+
+    solids.clear()
+    assert not solids._cells
+
+
+def test_solid_dict_queries() -> None:
+    """Test neighbours(), in_box() and at_offset()."""
+    vmf = VMF()
+    solids = SolidDict()
+    floor = Vec(0, 0, -1)
+    for x in range(3):
+        for y in range(3):
+            pos = Vec(128 * x + 64, 128 * y + 64, 0)
+            solids[pos.as_tuple()] = make_group(vmf, pos, floor)
+    wall = make_group(vmf, Vec(0, 192, 64), Vec(-1, 0, 0))
+    solids[0, 192, 64] = wall
+    center = solids[192, 192, 0]
+    corner = solids[64, 64, 0]
+
+    assert {
+        group.face.get_origin().as_tuple()
+        for group in solids.neighbours(center)
+    } == {(64, 192, 0), (320, 192, 0), (192, 64, 0), (192, 320, 0)}
+    assert len(solids.neighbours(corner)) == 2
+    # Only faces pointing the same way.
+    assert solids[64, 192, 0] in solids.neighbours(corner)
+    assert wall not in solids.neighbours(solids[64, 192, 0])
+
+    # The corners can be in either order.
+    in_box = list(solids.in_box(Vec(200, 200, 0), Vec(0, 0, 64)))
+    assert len(in_box) == 5
+    assert wall in in_box
+    floors = list(solids.in_box(Vec(0, 0, 0), Vec(200, 200, 64), floor))
+    assert len(floors) == 4
+    assert wall not in floors
+    assert center in floors
+
+    inst = vmf.create_ent(
+        classname='func_instance',
+        origin='192 192 64',
+        angles='0 90 0',
+    )
+    assert solids.at_offset(inst, Vec(0, 0, -64)) is center
+    assert solids.at_offset(inst, Vec(0, 0, -64), floor) is center
+    assert solids.at_offset(inst, Vec(0, 0, -64), Vec(1, 0, 0)) is None
+    # 128 forward is rotated to +y.
+    assert solids.at_offset(inst, Vec(128, 0, -64)) is solids[192, 320, 0]
+    assert solids.at_offset(inst, Vec(0, 0, 64)) is None
@@ -0,0 +1,104 @@
+"""Test storing template brushes compactly."""
+import io
+
+from srctools import Property, Vec, VMF, UVAxis
+
+import template_brush
+from template_brush import CompactSolid, FaceStore
+
+
+def make_template_vmf() -> VMF:
+    """Make a template file with a few brushes."""
+    vmf = VMF(preserve_ids=True)
+    for z, mat in [
+        (0, 'tile/white_wall_tile003a'),
+        (64, 'glass/glasswindow007a_less_shiny'),
+    ]:
+        prism = vmf.make_prism(Vec(0, 0, z), Vec(64, 32, z + 48), mat)
+        prism.top.uaxis = UVAxis(0.5, 0.5, 0, offset=12.5, scale=0.125)
+        prism.top.ham_rot = 45
+        prism.top.lightmap = 8
+        prism.top.smooth = 3
+        prism.solid.visgroup_ids.add(2)
+        prism.solid.group_id = 7
+        vmf.create_ent(
+            classname='bee2_template_world',
+            template_id='TEST',
+            visgroup='',
+        ).solids.append(prism.solid)
+    return vmf
+
+
+def export(solid) -> str:
+    """Write a brush to a string."""
+    buf = io.StringIO()
+    solid.export(buf)
+    return buf.getvalue()
+
+
+def test_copy_matches() -> None:
+    """Copying a compact brush gives the same brush as the original."""
+    store = FaceStore()
+    # Parse it like load_templates() does, so values have the same types.
+    buf = io.StringIO()
+    make_template_vmf().export(buf)
+    vmf = VMF.parse(
+        Property.parse(buf.getvalue().splitlines()),
+        preserve_ids=True,
+    )
+    originals = [
+        solid
+        for ent in vmf.entities
+        for solid in ent.solids
+    ]
+    compacted = CompactSolid.compact(originals, store)
+    assert len(store) == 12
+    assert len(store.mat_names) == 2
+
+    for keep_vis in [False, True]:
+        orig_map = VMF()
+        orig_map.face_id.update({1, 5})
+        comp_map = VMF()
+        comp_map.face_id.update({1, 5})
+        orig_ids = {}
+        comp_ids = {}
+        for orig, comp in zip(originals, compacted):
+            assert isinstance(comp, CompactSolid)
+            assert export(orig.copy(
+                map=orig_map,
+                side_mapping=orig_ids,
+                keep_vis=keep_vis,
+            )) == export(comp.copy(
+                map=comp_map,
+                side_mapping=comp_ids,
+                keep_vis=keep_vis,
+            ))
+            assert [side.id for side in comp.sides] == [side.id for side in orig.sides]
+        assert orig_ids == comp_ids
+
+
+def test_load(tmpdir, monkeypatch) -> None:
+    """Templates loaded from the file store their brushes compactly."""
+    path = str(tmpdir.join('templates.vmf'))
+    with open(path, 'w') as f:
+        make_template_vmf().export(f)
+    monkeypatch.setattr(template_brush, 'TEMPLATE_LOCATION', path)
+    monkeypatch.setattr(template_brush, 'TEMPLATES', {})
+
+    template_brush.load_templates()
+    world, detail, overlays = template_brush.get_template('test').visgrouped()
+    assert len(world) == 2
+    assert not detail
+    assert all(isinstance(brush, CompactSolid) for brush in world)
+
+    # The lower brush was made first.
+    lower = min(world, key=lambda brush: brush.id)
+    top = [
+        side
+        for side in lower.copy(map=VMF())
+        if side.normal() == (0, 0, -1)
+    ]
+    assert len(top) == 1
+    assert top[0].mat == 'tile/white_wall_tile003a'
+    assert top[0].uaxis.offset == 12.5
+    assert top[0].ham_rot == 45
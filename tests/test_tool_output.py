@@ -0,0 +1,110 @@
+"""Test reading the output and progress of the compile tools."""
+import queue
+
+import pytest
+
+import tool_output
+from tool_output import PROGRESS_END, PROGRESS_STEP, _read_pipe, _stage_name
+
+
+class FakePipe:
+    """Produces the given chunks of data, like a pipe being written to."""
+    def __init__(self, *chunks: bytes) -> None:
+        self.chunks = list(chunks)
+        self.closed = False
+
+    def read1(self, size: int) -> bytes:
+        return self.chunks.pop(0) if self.chunks else b''
+
+    def __enter__(self) -> 'FakePipe':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.closed = True
+
+
+def read_events(*chunks: bytes) -> list:
+    """Read the chunks, and return all the events produced."""
+    events = queue.Queue()
+    pipe = FakePipe(*chunks)
+    _read_pipe(pipe, 'stdout', events)
+    assert pipe.closed
+    result = []
+    while not events.empty():
+        result.append(events.get_nowait())
+    return result
+
+
+def test_patterns() -> None:
+    """Test the progress regexes."""
+    line = b'Building Faces...0...1...2...3'
+    assert PROGRESS_STEP.findall(line) == [b'0', b'1', b'2']
+    assert PROGRESS_END.search(line) is None
+    assert PROGRESS_END.search(b'0...1...2...3...4...5...6...7...8...9...10')
+    # 100 doesn't end the stage.
+    assert PROGRESS_END.search(b'...100') is None
+
+
+@pytest.mark.parametrize('line, name', [
+    (b'Building Faces...0...1...2', 'Building Faces'),
+    (b'BuildVisLeafs: 0...1...2', 'BuildVisLeafs'),
+    (b'   PortalFlow...\t0...', 'PortalFlow'),
+    (b'0...1...2...', ''),
+    (b'No progress here.', 'No progress here'),
+])
+def test_stage_name(line: bytes, name: str) -> None:
+    assert _stage_name(line) == name
+
+
+def test_read_lines() -> None:
+    """Lines are split across chunks, and partial lines are flushed at the end."""
+    assert read_events(b'first li', b'ne\r\nsecond\n', b'last') == [
+        ('line', 'stdout', b'first line'),
+        ('line', 'stdout', b'second'),
+        ('line', 'stdout', b'last'),
+        ('eof', 'stdout', None),
+    ]
+    assert read_events() == [('eof', 'stdout', None)]
+
+
+def test_read_progress() -> None:
+    """Progress is reported as it's printed, not once the line ends."""
+    assert read_events(
+        b'Starting\nBuildFaces...0...',
+        b'1...2...3',
+        b'...4...5...6...7...8...9...10\n',
+        b'Done\n',
+    ) == [
+        ('line', 'stdout', b'Starting'),
+        ('progress', 'BuildFaces', 0),
+        ('progress', 'BuildFaces', 20),
+        ('progress', 'BuildFaces', 100),
+        ('line', 'stdout', b'BuildFaces...0...1...2...3...4...5...6...7...8...9...10'),
+        ('line', 'stdout', b'Done'),
+        ('eof', 'stdout', None),
+    ]
+
+
+def test_read_progress_whole_line() -> None:
+    """Unfinished stages printed in one go report their last step."""
+    assert read_events(b'Vis...0...1...2...3...4\nOther...0...1...2...\n') == [
+        ('progress', 'Vis', 30),
+        ('line', 'stdout', b'Vis...0...1...2...3...4'),
+        ('progress', 'Other', 20),
+        ('line', 'stdout', b'Other...0...1...2...'),
+        ('eof', 'stdout', None),
+    ]
+
+
+def test_log_progress() -> None:
+    """Test the default progress callback."""
+    messages = []
+
+    class Logger:
+        def info(self, msg: str, *args) -> None:
+            messages.append(msg.format(*args))
+
+    report = tool_output.log_progress(Logger())
+    report('BuildFaces', 50)
+    report('', 100)
+    assert messages == ['BuildFaces: 50%', 'Progress: 100%']
@@ -0,0 +1,61 @@
+"""Test merging world brushes together."""
+import pytest
+from srctools import Vec, VMF
+
+import conditions
+import vbsp
+import vbsp_options
+import comp_consts as consts
+
+
+@pytest.fixture
+def vmf(monkeypatch) -> VMF:
+    """Run with a blank map, and merging enabled."""
+    vmf = VMF()
+    monkeypatch.setattr(vbsp, 'VMF', vmf)
+    monkeypatch.setattr(conditions, 'VMF', vmf)
+    monkeypatch.setitem(vbsp_options.SETTINGS, 'simplify_world_brushes', True)
+    monkeypatch.setitem(vbsp.settings['textures'], 'special.goo', ['goo/style'])
+    return vmf
+
+
+def make_block(vmf: VMF, z: int, top_mat: str=consts.Tools.NODRAW):
+    """Add a 64-unit nodraw block at this height, with the given top."""
+    solid = vmf.make_prism(
+        Vec(0, 0, z),
+        Vec(64, 64, z + 64),
+        consts.Tools.NODRAW,
+    ).solid
+    for side in solid.sides:
+        # Normals point into the brush.
+        if side.normal() == (0, 0, -1):
+            side.mat = top_mat
+    vmf.add_brush(solid)
+    return solid
+
+
+def test_merge_stack(vmf: VMF) -> None:
+    """Solid blocks stacked on each other are merged."""
+    make_block(vmf, 0)
+    make_block(vmf, 64)
+    assert vbsp.simplify_world_brushes() == 6
+    [solid] = vmf.brushes
+    assert solid.get_bbox() == (Vec(0, 0, 0), Vec(64, 64, 128))
+
+
+@pytest.mark.parametrize('mat', [
+    consts.Goo.REFLECTIVE,
+    consts.Goo.CHEAP,
+    consts.Special.GLASS,
+    'GOO/Style',
+    'tools/toolsplayerclip',
+])
+def test_no_merge_liquid(vmf: VMF, mat: str) -> None:
+    """Goo or glass must not be merged into the solid block below it.
+
+    That would turn the solid block into water.
+    """
+    make_block(vmf, 0)
+    make_block(vmf, 64, mat)
+    assert vbsp.simplify_world_brushes() == 0
+    assert len(vmf.brushes) == 2